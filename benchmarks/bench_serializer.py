@@ -0,0 +1,67 @@
+"""
+Benchmark the JSON serialisation backends.
+
+Times serialising one large FeatureCollection with each installed backend:
+
+    python benchmarks/bench_serializer.py --features 200000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from im2geojson import serializer
+from im2geojson.geojson_parser import GeoJSONParser
+
+
+def build_feature_collection(feature_count):
+    parser = GeoJSONParser()
+    for i in range(feature_count):
+        properties = {
+            'datetime': f'2023-05-05 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}',
+            'filename': f'IMG_{i:07d}.jpg',
+        }
+        parser.add_feature('benchmark', -8.631053 + i * 1e-6, 115.095269 + i * 1e-6, properties, 'parent')
+    return parser.feature_collection('benchmark')
+
+def time_backend(backend, feature_collection, repeat):
+    json_serializer = serializer.get_serializer(backend)
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, 'benchmark.geojson')
+        best = None
+        for _ in range(repeat):
+            start = perf_counter()
+            json_serializer.dump(feature_collection, file_path)
+            elapsed = perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        size = os.path.getsize(file_path)
+    return best, size
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialisation backends')
+    parser.add_argument('--features', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parsed_args = parser.parse_args(args)
+
+    feature_collection = build_feature_collection(parsed_args.features)
+    backends = [serializer.JSON_BACKEND]
+    if serializer.orjson is not None:
+        backends.append(serializer.ORJSON_BACKEND)
+
+    results = {}
+    for backend in backends:
+        results[backend] = time_backend(backend, feature_collection, parsed_args.repeat)
+        elapsed, size = results[backend]
+        print(f'{backend:>8}: {elapsed:.3f} seconds, {size} bytes')
+
+    if serializer.ORJSON_BACKEND in results:
+        speedup = results[serializer.JSON_BACKEND][0] / results[serializer.ORJSON_BACKEND][0]
+        print(f'orjson is {speedup:.1f}x faster')
+
+
+if __name__ == '__main__':
+    main()
@@ -62,6 +62,7 @@ Output
             "properties": 
             {
                 "datetime": "2023-05-05 06:19:24", 
+                "datetime_iso": "2023-05-05T06:19:24.477000+08:00", 
                 "filename": "EXIF.jpg"
             }
         }
@@ -69,12 +70,28 @@ Output
     "properties": 
     {
         "parent": "parent"
-    }
+    },
+    "bbox": [115.095269, -8.631053, 115.095269, -8.631053]
 }
 ```
 <br>
 
 
+Images in Memory
+----------------
+
+Images from uploads or object store streams can be processed without temporary files.
+Pass `(name, bytes or file-like)` pairs, where the folder in each name is the collection title:
+
+```python
+>>> im2geojson = ImageToGeoJSON(input_directory=input_directory)
+>>> im2geojson.start_images([('my_images/EXIF.jpg', image_bytes), ('my_images/IMAGE.jpg', stream)])
+```
+
+Only the start of each stream, up to the end of the EXIF metadata, is read unless images are saved.
+<br>
+
+
 Errors
 ------
 
@@ -88,6 +105,20 @@ Errors
  'my_images/CORRUPTED_EXIF.jpg': 'ValueError: Invalid GPS Reference X, Expecting N, S, E or W',
  'my_images/NO_EXIF.jpg': "'No metadata.'"}
 ```
+
+Errors are written to `errors.jsonl` in `output_directory` as they occur, one JSON object per line,
+and only the count of each error class is kept in memory. `error_dictionary` reads the file back,
+so for large runs use the counts, or read `errors_path` line by line:
+
+```python
+>>> im2geojson.error_counts
+```
+```s
+{'ValueError': 2, 'NoGPSError': 1, 'AttributeError': 1, 'NoExifError': 1}
+```
+
+Images without EXIF metadata or without a GPS coordinate are rejected from their first few KB,
+before the rest of the file is read, as `NoExifError` or `NoGPSError`.
 <br>
 <br>
 
@@ -103,7 +134,16 @@ import logging
 logging.getLogger('im2geojson').addHandler(logging.NullHandler())
 
 
-from im2geojson.im2geojson import ImageToGeoJSON
-
 __all__ = ['ImageToGeoJSON']
 
+
+def __getattr__(name):
+    # Import ImageToGeoJSON, and with it exif and geojson, on first use
+    if name == 'ImageToGeoJSON':
+        from im2geojson.im2geojson import ImageToGeoJSON
+        return ImageToGeoJSON
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
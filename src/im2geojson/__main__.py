@@ -8,4 +8,5 @@ import sys
 from im2geojson import logging_config
 from im2geojson import cli
 
+logging_config.configure()
 cli.main(sys.argv[1:])
@@ -0,0 +1,124 @@
+"""
+Tune the number of images in flight while they are processed.
+
+An `AIMDController` grows its limit by a fixed step while throughput keeps
+up, and cuts it by a fraction when throughput drops, as TCP congestion
+control does. Separate controllers tune reading (I/O-bound) and parsing
+(CPU-bound), so slow network storage gets many reads in flight without
+oversubscribing the CPU with parsers.
+"""
+import os
+import time
+
+AUTO_CONCURRENCY = 'auto'
+
+DEFAULT_INCREASE = 1
+DEFAULT_DECREASE = 0.5
+DEFAULT_TOLERANCE = 0.05
+MIN_WINDOW = 8
+
+MAX_READERS = 64
+MAX_PARSERS = max(2, 2 * (os.cpu_count() or 1))
+# Images read and waiting for a parser, as a multiple of the reader limit
+READ_AHEAD_FACTOR = 2
+
+
+class AIMDController(object):
+    """
+    Create an AIMDController object.
+
+    Additive increase, multiplicative decrease of a concurrency limit from
+    measured throughput. Each window of completions, about two rounds of
+    `limit`, the throughput is compared with the best since the last
+    decrease: if it held within `tolerance` the limit grows by `increase`,
+    otherwise it is multiplied by `decrease` and the best is reset.
+    """
+
+    def __init__(self,
+                 initial=1,
+                 minimum=1,
+                 maximum=MAX_READERS,
+                 increase=DEFAULT_INCREASE,
+                 decrease=DEFAULT_DECREASE,
+                 tolerance=DEFAULT_TOLERANCE,
+                 clock=time.monotonic):
+        """
+        Initialise AIMDController object.
+
+        Parameters
+        ----------
+        initial : int, default 1
+            The initial limit.
+        minimum : int, default 1
+            The smallest limit.
+        maximum : int, default 64
+            The largest limit.
+        increase : int, default 1
+            The step the limit grows by while throughput holds.
+        decrease : float, default 0.5
+            The factor the limit is cut by when throughput drops.
+        tolerance : float, default 0.05
+            The fraction throughput may drop by and still count as holding.
+        clock : callable, default time.monotonic
+            Returns the time in seconds.
+        """
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError('ValueError: Expecting 1 <= minimum <= initial <= maximum')
+        self._limit = initial
+        self._minimum = minimum
+        self._maximum = maximum
+        self._increase = increase
+        self._decrease = decrease
+        self._tolerance = tolerance
+        self._clock = clock
+
+        self._throughput = None
+        self._best_throughput = None
+        self._window_start = clock()
+        self._window_count = 0
+        self._count = 0
+        self._latency = 0.0
+
+    @property
+    def limit(self):
+        """int: Return the number of items to keep in flight."""
+        return self._limit
+
+    @property
+    def maximum(self):
+        """int: Return the largest limit."""
+        return self._maximum
+
+    @property
+    def throughput(self):
+        """float: Return the items per second in the last window, or None before the first."""
+        return self._throughput
+
+    @property
+    def mean_latency(self):
+        """float: Return the mean seconds per item, or None before the first."""
+        return self._latency / self._count if self._count else None
+
+    def record(self, latency):
+        """
+        Record an item completed in `latency` seconds, adjusting the limit
+        at the end of each window.
+        """
+        self._count += 1
+        self._latency += latency
+        self._window_count += 1
+        if self._window_count < max(MIN_WINDOW, 2 * self._limit):
+            return
+
+        now = self._clock()
+        elapsed = now - self._window_start
+        throughput = self._window_count / max(elapsed, 1e-9)
+        if self._best_throughput is None or throughput >= self._best_throughput * (1 - self._tolerance):
+            self._limit = min(self._maximum, self._limit + self._increase)
+            self._best_throughput = max(throughput, self._best_throughput or 0.0)
+        else:
+            self._limit = max(self._minimum, int(self._limit * self._decrease))
+            self._best_throughput = None
+        self._throughput = throughput
+        self._window_start = now
+        self._window_count = 0
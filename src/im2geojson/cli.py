@@ -1,10 +1,35 @@
 """
 Command Line Interface for im2geojson.
+
+Only argparse is imported up front, so `--help` and argument errors return
+quickly. The image processing modules are imported once arguments are parsed.
 """
 
 import argparse
 
-from im2geojson.im2geojson import ImageToGeoJSON
+# Choices, as `serializer.BACKENDS` and `exporters.EXPORTERS`
+JSON_BACKENDS = ('auto', 'orjson', 'json')
+EXPORT_FORMATS = ('gpkg', 'parquet')
+AUTO_CONCURRENCY = 'auto'
+# As `scheduling.SCHEDULES`
+SCHEDULES = ('listing', 'locality')
+# As `im2geojson.LAYOUTS`
+LAYOUTS = ('folder', 'tree')
+# As `property_plan.PROPERTIES`
+PROPERTIES = ('altitude', 'direction', 'gps_timestamp', 'make', 'model', 'orientation', 'focal_length', 'iso', 'lens_model')
+
+
+def concurrency(value):
+    """int or str: Parse a `--concurrency` value, a positive int or 'auto'."""
+    if value == AUTO_CONCURRENCY:
+        return value
+    try:
+        workers = int(value)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        raise argparse.ArgumentTypeError(f"invalid concurrency: '{value}', Expecting a positive int or {AUTO_CONCURRENCY}")
+    return workers
 
 
 def create_parser():
@@ -45,6 +70,116 @@ def create_parser():
         help='Save thumbnail images', 
         action='store_true'
         )
+    parser.add_argument(
+        '-z', 
+        '--tile_zoom', 
+        help='Save z/x/y tiles and a tile index at zoom level TILE_ZOOM', 
+        type=int
+        )
+    parser.add_argument(
+        '-c', 
+        '--cluster_zooms', 
+        help='Save clusters of points at each zoom level in CLUSTER_ZOOMS', 
+        type=int,
+        nargs='+'
+        )
+    parser.add_argument(
+        '--json_backend', 
+        help='Set the JSON serialisation backend, default json, auto uses orjson when installed', 
+        type=str,
+        choices=JSON_BACKENDS
+        )
+    parser.add_argument(
+        '-e', 
+        '--export_formats', 
+        help='Also export all features in each format: gpkg (GeoPackage), parquet (GeoParquet)', 
+        type=str,
+        nargs='+',
+        choices=EXPORT_FORMATS
+        )
+    parser.add_argument(
+        '-p', 
+        '--props', 
+        dest='properties', 
+        help='Also read each of the properties PROPS from each image', 
+        type=str,
+        nargs='+',
+        choices=PROPERTIES
+        )
+    parser.add_argument(
+        '-j', 
+        '--concurrency', 
+        help='Set the number of images processed at once, or auto to tune it from the measured throughput', 
+        type=concurrency
+        )
+    parser.add_argument(
+        '--schedule', 
+        help='Set the order images are processed in, locality orders them by folder and inode and processes each folder as one batch', 
+        type=str,
+        choices=SCHEDULES
+        )
+    parser.add_argument(
+        '--chunk_size', 
+        help='Set the number of images each worker task processes, to cut the per-image overhead for small images', 
+        type=int
+        )
+    parser.add_argument(
+        '--read_size', 
+        help='Set the bytes read at a time from each file while reading its metadata', 
+        type=int
+        )
+    parser.add_argument(
+        '--prefetch', 
+        help='Advise the OS to load the next PREFETCH queued files ahead of reading, and drop each from the page cache once read', 
+        type=int
+        )
+    parser.add_argument(
+        '--xmp', 
+        help='Read the GPS data of images without it in EXIF from their XMP packet or .xmp sidecar file', 
+        action='store_true'
+        )
+    parser.add_argument(
+        '--sync', 
+        help='Keep a manifest in output_directory, skip unchanged images and delete the outputs of images removed', 
+        action='store_true'
+        )
+    parser.add_argument(
+        '--layout', 
+        help='Set how images are grouped into collections, tree titles each by its relative path and reads every folder below input_directory', 
+        type=str,
+        choices=LAYOUTS
+        )
+    parser.add_argument(
+        '--rollups', 
+        help='Also save a collection of all the images below each folder with subfolders, with --layout tree', 
+        action='store_true'
+        )
+    parser.add_argument(
+        '--file_timeout', 
+        help='Set the seconds each image may take, slower images are recorded as errors and abandoned', 
+        type=float
+        )
+    parser.add_argument(
+        '--run_timeout', 
+        help='Set the seconds the whole run may take, images not processed by then are recorded as errors', 
+        type=float
+        )
+    parser.add_argument(
+        '-w', 
+        '--watch', 
+        help='Keep watching input_directory and process new or changed images as they arrive', 
+        action='store_true'
+        )
+    parser.add_argument(
+        '--interval', 
+        help='Set the maximum seconds between polls in watch mode', 
+        type=float
+        )
+    parser.add_argument(
+        '--ndjson', 
+        help='Append features to the NDJSON file NDJSON in watch mode, instead of rewriting collections', 
+        type=str
+        )
     return parser
 
 def parse_args_to_dict(args):
@@ -65,15 +200,30 @@ def main(args=None):
     """
     Process images
 
-    Process images from CLI, print summery and results.
+    Process images from CLI, print summery and a bounded summary of errors.
+    With `--watch`, keep processing new images until interrupted.
     """
     parsed_args_dict = parse_args_to_dict(args)
+    watch = parsed_args_dict.pop('watch', False)
+    watch_args = {}
+    if 'interval' in parsed_args_dict:
+        watch_args['interval'] = parsed_args_dict.pop('interval')
+    if 'ndjson' in parsed_args_dict:
+        watch_args['ndjson_path'] = parsed_args_dict.pop('ndjson')
+
+    from im2geojson.im2geojson import ImageToGeoJSON
     im2geo = ImageToGeoJSON(**parsed_args_dict)
-    im2geo.start()
-    print(im2geo.summary)
+    if watch:
+        from im2geojson.watcher import Watcher
+        watcher = Watcher(im2geo, **watch_args)
+        print('Watching... press Ctrl+C to stop')
+        watcher.run()
+        print(watcher.summary)
+    else:
+        im2geo.start()
+        print(im2geo.summary)
     if im2geo.has_errors:
-        import pprint
-        pprint.pp(im2geo.error_dictionary)
+        print(im2geo.error_summary)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,106 @@
+"""
+Aggregate GeoJSON Features into clusters by Web Mercator (z/x/y) tile.
+"""
+import geojson
+
+from .tiles import check_zoom, lat_long_to_tile
+
+DATETIME_KEY = 'datetime'
+
+
+class _Cluster(object):
+    """A running aggregate of the points in one tile."""
+
+    __slots__ = ('count', 'sum_lat', 'sum_long', 'datetime_start', 'datetime_end')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_long = 0.0
+        self.datetime_start = None
+        self.datetime_end = None
+
+    def add(self, lat, long, datetime_str):
+        self.count += 1
+        self.sum_lat += lat
+        self.sum_long += long
+        if datetime_str is not None:
+            if self.datetime_start is None or datetime_str < self.datetime_start:
+                self.datetime_start = datetime_str
+            if self.datetime_end is None or datetime_str > self.datetime_end:
+                self.datetime_end = datetime_str
+
+
+class ClusterIndex(object):
+    """
+    Create a ClusterIndex object.
+
+    Incrementally aggregates points into one cluster per tile at each zoom level.
+    """
+
+    def __init__(self, zooms):
+        """
+        Initialise ClusterIndex object.
+
+        Parameters
+        ----------
+        zooms : list of int
+            The zoom levels to cluster at, between 0 and 24.
+
+        Raises
+        ------
+        ValueError
+            If a zoom level is out of range.
+        """
+        for zoom in zooms:
+            check_zoom(zoom)
+        self._clusters_dict = {zoom: {} for zoom in sorted(set(zooms))}
+
+    @property
+    def zooms(self):
+        """list of int: Return the zoom levels."""
+        return list(self._clusters_dict)
+
+    def add(self, lat, long, properties={}):
+        """
+        Add a point to its cluster at every zoom level.
+
+        Parameters
+        ----------
+        lat : float
+            The latitude of the point.
+        long : float
+            The longitude of the point.
+        properties : dict
+            The point properties, `datetime` is aggregated.
+        """
+        datetime_str = properties.get(DATETIME_KEY)
+        for zoom, clusters in self._clusters_dict.items():
+            tile = lat_long_to_tile(lat, long, zoom)
+            cluster = clusters.get(tile)
+            if cluster is None:
+                cluster = clusters[tile] = _Cluster()
+            cluster.add(lat, long, datetime_str)
+
+    def iter_features(self, zoom):
+        """
+        Return an iterator of cluster `Feature`s at `zoom`, in tile order.
+
+        Each cluster is a `Point` at the mean position of its points, with
+        `point_count`, `datetime_start` and `datetime_end` properties.
+        """
+        clusters = self._clusters_dict[zoom]
+        for x, y in sorted(clusters):
+            cluster = clusters[(x, y)]
+            point = geojson.Point((
+                round(cluster.sum_long / cluster.count, 6),
+                round(cluster.sum_lat / cluster.count, 6),
+            ))
+            properties = {
+                'cluster': True,
+                'point_count': cluster.count,
+                'datetime_start': cluster.datetime_start,
+                'datetime_end': cluster.datetime_end,
+                'tile': [zoom, x, y],
+            }
+            yield geojson.Feature(geometry=point, properties=properties)
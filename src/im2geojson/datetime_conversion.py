@@ -0,0 +1,87 @@
+"""
+Convert EXIF datetime, sub-second and offset strings.
+
+EXIF datetimes are fixed width, 'YYYY:MM:DD HH:MM:SS', so they are parsed
+by slicing rather than `datetime.strptime`, which is slower and takes a
+module lock shared by all threads. Strings of any other shape fall back to
+`strptime`, so the accepted values and error messages are unchanged.
+"""
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+DATETIME_FORMAT = '%Y:%m:%d %H:%M:%S'
+DATETIME_CACHE_SIZE = 4096
+MAX_SUBSEC_DIGITS = 6
+MAX_OFFSET_HOURS = 23
+MAX_OFFSET_MINUTES = 59
+
+
+def parse_datetime(datetime_str):
+    """
+    Parse an EXIF datetime string.
+
+    Parameters
+    ----------
+    datetime_str : str
+        The datetime, 'YYYY:MM:DD HH:MM:SS'.
+
+    Returns
+    -------
+    datetime
+        The naive datetime.
+
+    Raises
+    ------
+    ValueError
+        If `datetime_str` does not match the format or is out of range, as `strptime`.
+    """
+    if (len(datetime_str) == 19
+            and datetime_str[4] == ':' and datetime_str[7] == ':' and datetime_str[10] == ' '
+            and datetime_str[13] == ':' and datetime_str[16] == ':'):
+        fields = (datetime_str[0:4], datetime_str[5:7], datetime_str[8:10],
+                  datetime_str[11:13], datetime_str[14:16], datetime_str[17:19])
+        if all(field.isascii() and field.isdigit() for field in fields):
+            try:
+                return datetime(*map(int, fields))
+            except ValueError:
+                pass
+    return datetime.strptime(datetime_str, DATETIME_FORMAT)
+
+# Burst mode photos share timestamps to the second
+parse_datetime_cached = lru_cache(maxsize=DATETIME_CACHE_SIZE)(parse_datetime)
+
+def parse_subsec(subsec_str):
+    """
+    Parse an EXIF sub-second string, the digits of the fraction of a second.
+
+    Returns
+    -------
+    int or None
+        The microseconds, or None if `subsec_str` is missing or invalid.
+    """
+    if not subsec_str:
+        return None
+    digits = subsec_str.strip()
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+    return int(digits[:MAX_SUBSEC_DIGITS].ljust(MAX_SUBSEC_DIGITS, '0'))
+
+@lru_cache(maxsize=None)
+def parse_offset(offset_str):
+    """
+    Parse an EXIF offset string, '+HH:MM' or '-HH:MM' from UTC.
+
+    Returns
+    -------
+    timezone or None
+        The offset, or None if `offset_str` is missing or invalid.
+    """
+    if not offset_str or len(offset_str) != 6 or offset_str[0] not in '+-' or offset_str[3] != ':':
+        return None
+    hours, minutes = offset_str[1:3], offset_str[4:6]
+    if not (hours.isascii() and hours.isdigit() and minutes.isascii() and minutes.isdigit()):
+        return None
+    if int(hours) > MAX_OFFSET_HOURS or int(minutes) > MAX_OFFSET_MINUTES:
+        return None
+    sign = -1 if offset_str[0] == '-' else 1
+    return timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
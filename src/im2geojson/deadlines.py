@@ -0,0 +1,257 @@
+"""
+Time limits for each image and for a whole run.
+
+A worker thread stuck on a pathological image or a hung network read cannot
+be interrupted, but the run need not wait for it. `Deadlines` records when
+each image starts processing, tells the scheduler how long it may wait for
+the next completion, and reports the images past their time limit, so they
+can be recorded as errors and abandoned while the rest of the run continues.
+
+A `WorkerPool` then replaces the threads of an abandoned worker, moving the
+work not yet started to fresh ones, so the rest of the run keeps every
+worker. A stuck thread still holds its memory and file handle until its read
+returns, but as a daemon thread it does not keep the process from exiting.
+"""
+import os
+import queue
+import threading
+import time
+import concurrent.futures
+
+# As `ThreadPoolExecutor`
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised for an image not processed within its time limit."""
+
+
+class Deadlines(object):
+    """
+    Create a Deadlines object.
+
+    Tracks the start of each image by key, its file path, from the first time
+    it is `run` until it is `discard`ed or expired. Without time limits every
+    method is a no-op and `timeout` returns None, waiting indefinitely.
+    """
+
+    def __init__(self, file_timeout=None, run_timeout=None, clock=time.monotonic):
+        """
+        Initialise Deadlines object.
+
+        Parameters
+        ----------
+        file_timeout : float, optional
+            The seconds each image may take from when processing starts.
+        run_timeout : float, optional
+            The seconds the whole run may take, from now.
+        clock : callable, default time.monotonic
+            Returns the time in seconds.
+        """
+        for timeout in (file_timeout, run_timeout):
+            if timeout is not None and timeout <= 0:
+                raise ValueError(f'ValueError: Invalid timeout {timeout}, Expecting a positive number of seconds')
+        self._file_timeout = file_timeout
+        self._run_timeout = run_timeout
+        self._clock = clock
+        self._run_deadline = None if run_timeout is None else clock() + run_timeout
+        self._lock = threading.Lock()
+        self._started = {}
+        self._expired = False
+
+    @property
+    def expired_any(self):
+        """bool: Return True if any image has expired, leaving its worker busy."""
+        return self._expired
+
+    def run(self, key, fn, *args):
+        """Record the start of `key`, unless already started, and return `fn(*args)`."""
+        if self._file_timeout is not None:
+            with self._lock:
+                self._started.setdefault(key, self._clock())
+        return fn(*args)
+
+    def discard(self, key):
+        """Stop tracking `key`, once its result is collected."""
+        if self._file_timeout is not None:
+            with self._lock:
+                self._started.pop(key, None)
+
+    def timeout(self):
+        """float or None: Return the seconds until the next deadline, or None without time limits."""
+        now = self._clock()
+        deadlines = [] if self._run_deadline is None else [self._run_deadline]
+        if self._file_timeout is not None:
+            # An image submitted but not yet started expires no sooner than `file_timeout` from now
+            with self._lock:
+                deadlines.append(min([now, *self._started.values()]) + self._file_timeout)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    def expired(self, keys, waiting=()):
+        """
+        Find the images of `keys` past their time limit, and stop tracking them.
+
+        Parameters
+        ----------
+        keys : iterable of str
+            The keys of the images in flight.
+        waiting : iterable of str, optional
+            The keys of the images not yet submitted, only read once the run
+            deadline has passed.
+
+        Returns
+        -------
+        list of (str, DeadlineExceeded)
+            Each expired key and the error to record for it. After the run
+            deadline every key has expired, started or not.
+        """
+        now = self._clock()
+        if self._run_deadline is not None and now >= self._run_deadline:
+            error = f'TimeoutError: Run not completed within {self._run_timeout} seconds'
+            expired = [(key, DeadlineExceeded(error)) for key in [*keys, *waiting]]
+        elif self._file_timeout is not None:
+            error = f'TimeoutError: Not processed within {self._file_timeout} seconds'
+            with self._lock:
+                expired = [(key, DeadlineExceeded(error)) for key in keys
+                           if now - self._started.get(key, now) >= self._file_timeout]
+        else:
+            return []
+        with self._lock:
+            for key, _ in expired:
+                self._started.pop(key, None)
+        self._expired = self._expired or bool(expired)
+        return expired
+
+
+class WorkerPool(object):
+    """
+    Create a WorkerPool object.
+
+    A pool of worker threads, like a `ThreadPoolExecutor`, that can be
+    replaced when a worker is abandoned. Its threads are daemon threads not
+    joined by `concurrent.futures` at exit, so a worker stuck on a hung read
+    cannot keep the process from exiting.
+    """
+
+    def __init__(self, max_workers=None):
+        """
+        Initialise WorkerPool object.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The number of worker threads, default as `ThreadPoolExecutor`.
+
+        Raises
+        ------
+        ValueError
+            If `max_workers` is not positive.
+        """
+        if max_workers is not None and max_workers <= 0:
+            raise ValueError(f'ValueError: Invalid max_workers {max_workers}, Expecting a positive number')
+        self._max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self._replaced = 0
+        self._workers = _Workers()
+
+    @property
+    def replaced(self):
+        """int: Return the number of times the workers were replaced."""
+        return self._replaced
+
+    def submit(self, fn, *args):
+        """Future: Submit `fn(*args)` to the workers."""
+        future = concurrent.futures.Future()
+        with self._lock:
+            self._tasks[future] = (fn, args)
+        future.add_done_callback(self._forget)
+        self._workers.put((future, fn, args), self._max_workers)
+        return future
+
+    def replace(self):
+        """
+        Replace the workers, moving the work not yet started to new ones.
+
+        The old workers are stopped without waiting: the healthy ones finish
+        their work, the abandoned ones are left to return or not.
+
+        Returns
+        -------
+        dict
+            The new future for each future of work moved.
+        """
+        old_workers = self._workers
+        self._workers = _Workers()
+        self._replaced += 1
+        moved = {}
+        with self._lock:
+            tasks = list(self._tasks.items())
+        for future, (fn, args) in tasks:
+            if not future.cancelled() and future.cancel():
+                moved[future] = self.submit(fn, *args)
+        old_workers.stop()
+        return moved
+
+    def shutdown(self, wait=True):
+        """Stop the workers, cancelling the work not yet started, and wait for the rest if `wait`."""
+        with self._lock:
+            futures = list(self._tasks)
+        for future in futures:
+            future.cancel()
+        self._workers.stop(wait)
+
+    def _forget(self, future):
+        with self._lock:
+            self._tasks.pop(future, None)
+
+
+class _Workers(object):
+    # Daemon threads running the (future, fn, args) work put on their queue, until stopped
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._threads = []
+
+    def put(self, work, max_workers):
+        # Start a thread for the work unless one is idle, up to `max_workers`, as `ThreadPoolExecutor`
+        self._queue.put(work)
+        if not self._idle.acquire(blocking=False) and len(self._threads) < max_workers:
+            thread = threading.Thread(target=_Workers._work, args=(self._queue, self._idle), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, wait=False):
+        # Stop each thread once the work before it is done
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    @staticmethod
+    def _work(work_queue, idle):
+        while True:
+            work = work_queue.get()
+            if work is None:
+                return
+            future, fn, args = work
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            del work, future
+            idle.release()
+
+
+def failed_future(exception):
+    """Future: Return a completed future that raises `exception`."""
+    future = concurrent.futures.Future()
+    future.set_exception(exception)
+    return future
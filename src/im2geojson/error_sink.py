@@ -0,0 +1,123 @@
+"""
+Collect image errors without holding them all in memory.
+
+Each error is appended to a JSON Lines file as it occurs, one
+`{"file": ..., "class": ..., "error": ...}` object per line. Only the count
+of each error class and the first few errors are kept in memory, so a run
+over millions of failing images costs a few kilobytes and a bounded summary.
+"""
+import collections
+import json
+import os
+import threading
+
+ERRORS_FILENAME = 'errors.jsonl'
+DEFAULT_MAX_SAMPLES = 10
+
+
+class ErrorSink(object):
+    """
+    Create an ErrorSink object.
+
+    Removes the errors of an earlier run at `path`, so a run without errors
+    leaves no file, then writes errors to `path` as they are added. The file
+    is reopened to append if errors are added after `close`.
+    """
+
+    def __init__(self, path, max_samples=DEFAULT_MAX_SAMPLES):
+        """
+        Initialise ErrorSink object.
+
+        Parameters
+        ----------
+        path : str
+            The path to the JSON Lines file.
+        max_samples : int, default 10
+            The number of errors kept in memory for the summary.
+        """
+        self._path = path
+        self._max_samples = max_samples
+        self._lock = threading.Lock()
+        self._file = None
+        self._count = 0
+        self._counts = collections.Counter()
+        self._samples = []
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def path(self):
+        """str: Return the path to the JSON Lines file."""
+        return self._path
+
+    @property
+    def count(self):
+        """int: Return the number of errors added."""
+        return self._count
+
+    @property
+    def counts(self):
+        """dict: Return the number of errors of each class, most common first."""
+        return dict(self._counts.most_common())
+
+    @property
+    def samples(self):
+        """list of (str, str): Return the first `max_samples` errors added."""
+        return list(self._samples)
+
+    def add(self, key, exception_string, error_class='Error'):
+        """
+        Add the error `exception_string`, of class `error_class`, for `key`.
+        """
+        line = json.dumps({'file': key, 'class': error_class, 'error': exception_string}) + '\n'
+        with self._lock:
+            if self._file is None:
+                # Line buffered, so errors reach the file as they occur
+                self._file = open(self._path, 'a', buffering=1)
+            self._file.write(line)
+            self._count += 1
+            self._counts[error_class] += 1
+            if len(self._samples) < self._max_samples:
+                self._samples.append((key, exception_string))
+
+    def close(self):
+        """Close the file, if open."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def read(self):
+        """
+        Read the errors back from the file.
+
+        Returns
+        -------
+        dict
+            The latest error string for each key.
+        """
+        if not self._count:
+            return {}
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            with open(self._path, 'r') as f:
+                return {error['file']: error['error'] for error in map(json.loads, f)}
+
+    def summary(self):
+        """
+        Return a summary of the errors, bounded by `max_samples`.
+
+        Returns
+        -------
+        str
+            The first errors, the count of each class and the path to the file.
+        """
+        lines = [f'{key}: {exception_string}' for key, exception_string in self._samples]
+        if self._count > len(self._samples):
+            lines.append(f'... and {self._count - len(self._samples)} more')
+        lines.append(', '.join(f'{error_class}: {count}' for error_class, count in self._counts.most_common()))
+        lines.append(f'All errors saved to {os.path.normpath(self._path)}')
+        return '\n'.join(lines)
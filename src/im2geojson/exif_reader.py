@@ -1,18 +1,134 @@
 """
 Read Exchangeable Image File Format (EXIF) metadata from an image.
+
+Concurrency
+-----------
+`read_exif` is safe to call from many threads at once. Each call builds its
+own `exif.Image`, so no image state is shared between threads. The one
+process-wide resource touched is the `warnings` filter list, which
+`warnings.catch_warnings` swaps in and out while stripping metadata and which
+is not thread-safe. `_STRIP_LOCK` serialises that section; everything else
+(file reads, parsing, thumbnails) runs in parallel.
+
+Streams
+-------
+Unless the stripped image is requested, only the start of a JPEG is read: the
+segments up to the end of the EXIF APP1 segment, which hold the GPS data,
+datetime and thumbnail. Other formats are memory mapped when the stream is a
+file, else read only until their metadata is located whole.
+
+Prefilter
+---------
+Images are first checked with `prefilter.prefilter`, from their first few KB,
+for EXIF metadata with a GPS coordinate. Those without are rejected with a
+`NoExifError` or `NoGPSError`, subclasses of the `KeyError` and
+`AttributeError` the full parse would raise, before the rest of the file is
+read or parsed.
+
+Page Cache
+----------
+Metadata-only runs touch the first `read_size` bytes of each file, but the
+OS readahead may pull in megabytes of pixel data, or too little on high
+latency storage. Where `os.posix_fadvise` is available, a `Prefetcher`
+advises the kernel to load the header range of the next few queued files
+(`POSIX_FADV_WILLNEED`), and `read_exif` with `drop_cache` advises it to
+drop each file once read (`POSIX_FADV_DONTNEED`), keeping the page cache
+free of data never used. Elsewhere both are no-ops.
+
+Formats
+-------
+JPEGs are read by `exif.Image`. Other formats are recognised from their magic
+bytes by the readers of `FORMATS`, and their TIFF structured metadata located
+with `formats` and parsed by `TiffReader`: TIFF and DNG, HEIF and HEIC, PNG
+and WebP. Files are memory mapped, so only the pages holding the container
+headers and the metadata are read. Each format returns the same coordinate
+and props as a JPEG, and raises the same errors, and the thumbnail of IFD1
+if any. Only JPEGs are stripped, so requesting the stripped image of another
+format raises a ValueError. Register further formats with `register_format`.
+
+Thumbnails
+----------
+Thumbnails are located from the `JPEGInterchangeFormat` and
+`JPEGInterchangeFormatLength` entries of IFD1 and returned as a `memoryview`
+slice of the bytes already read, or of the memory mapped file, so no copy is
+made until it is written. A JPEG thumbnail that cannot be located this way
+is read by `exif.Image`, which raises a `RuntimeError` if there is none.
+
+XMP
+---
+With `xmp` set, images the EXIF path rejects for missing metadata, a
+`KeyError` or `AttributeError`, are read again for the GPS coordinate and
+datetime of XMP: from the XMP APP1 segment of a JPEG, then from a `.xmp`
+sidecar file beside it. Images with EXIF GPS data never touch XMP.
 """
 from exif import Image
-from datetime import datetime
+import collections
+import mmap
+import os
 import warnings 
 import threading
 import logging
 
 from .dms_conversion import dms_to_decimal
+from .datetime_conversion import parse_datetime_cached, parse_subsec, parse_offset
+from .property_plan import compile_plan
+from .prefilter import prefilter, PREFILTER_SIZE, GPS_TAGS, NoExifError, NoGPSError
+from .ifd_reader import TiffReader, find_exif_segment, find_thumbnail, EXIF_IFD_POINTER, GPS_IFD_POINTER
+from . import formats
+from . import xmp_reader
 
 log = logging.getLogger('im2geojson')
 
+_STRIP_LOCK = threading.Lock()
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_SOS = b'\xff\xda'
+JPEG_APP1 = b'\xff\xe1'
+READ_CHUNK_SIZE = 64 * 1024
+DEFAULT_PREFETCH_DEPTH = 8
+HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+DATETIME_ORIGINAL = 0x9003
+OFFSET_TIME_ORIGINAL = 0x9011
+SUBSEC_TIME_ORIGINAL = 0x9291
+DATETIME_TAGS = (DATETIME_ORIGINAL, SUBSEC_TIME_ORIGINAL, OFFSET_TIME_ORIGINAL)
+
+ImageFormat = collections.namedtuple('ImageFormat', ['name', 'match', 'find_tiff'])
+FORMATS = []
+
+
+def register_format(name, match, find_tiff):
+    """
+    Register a reader for an image format with TIFF structured metadata.
+
+    Parameters
+    ----------
+    name : str
+        The format name.
+    match : callable
+        Returns True if the first `PREFILTER_SIZE` bytes of a file, or fewer
+        for a shorter file, are of the format.
+    find_tiff : callable
+        Returns the (start, end) slice of the whole file, as a bytes-like
+        object, holding the TIFF metadata, or None if there is none.
+    """
+    FORMATS.append(ImageFormat(name, match, find_tiff))
+
+def find_format(head):
+    """ImageFormat or None: Return the first registered format matching `head`, or None."""
+    for image_format in FORMATS:
+        if image_format.match(head):
+            return image_format
+    return None
+
+register_format('tiff', formats.is_tiff, formats.find_tiff)
+register_format('heif', formats.is_heif, formats.find_heif_exif)
+register_format('png', formats.is_png, formats.find_png_exif)
+register_format('webp', formats.is_webp, formats.find_webp_exif)
+
 
-def read_exif(filepath, get_image=False, get_thumbnail=False):
+def read_exif(filepath, get_image=False, get_thumbnail=False, properties=None,
+              read_size=READ_CHUNK_SIZE, drop_cache=False, xmp=False):
     """
     Read exif metadata from image file at `filepath`.
     
@@ -20,80 +136,464 @@ def read_exif(filepath, get_image=False, get_thumbnail=False):
     ----------
     filepath : str
         The path to the image file.
+    properties : list of str or ExtractionPlan, optional
+        Extra properties to read, see `property_plan.PROPERTIES`.
+    read_size : int, default 65536
+        The bytes read at a time while reading the metadata.
+    drop_cache : bool, default False
+        Advise the OS to drop the file from the page cache once read.
+    xmp : bool, default False
+        Fall back to the XMP packet or sidecar file of an image without EXIF
+        GPS data, see `read_xmp`.
 
     Returns
     -------
     (lat, long) : tuple of float
         The decimal latitude, longitude coordinate as a float.
     props : dictionary
-        Dictionary containing the date the image was captured.
+        Dictionary containing the date the image was captured, and as ISO 8601
+        with sub-seconds and offset from UTC when recorded, and any of
+        `properties` found.
     image_b : bytes
         The image stripped of exif metadata.
-    thumb_b : bytes
-        The thumbnail.
+    thumb_b : memoryview or bytes
+        The thumbnail, a view of the image read, see Thumbnails.
     
     Raises
     ------
     KeyError
-        If `image_file` has no metadata.
+        If `image_file` has no metadata, `NoExifError` if found by the prefilter.
     AttributeError
-        If `image_file` has missing metadata.
+        If `image_file` has missing metadata, `NoGPSError` if found by the prefilter.
     ValueError
-        If `image_file` has invalid metadata.
+        If `image_file` has invalid metadata, or `get_image` is set for an
+        image other than a JPEG.
     FileNotFoundError
         If no file found at `filepath.
     """
     try:
         with open(filepath, 'rb') as image_file:
-            image = Image(image_file)
-            if not image.has_exif:
-                raise KeyError('KeyError: No metadata.')
-
-            # coord
-            try:
-                dms_lat = (*image.gps_latitude, image.gps_latitude_ref)
-                dms_long = (*image.gps_longitude, image.gps_longitude_ref)
-            except AttributeError as e:
-                raise AttributeError(f'AttributeError: {e}') from e
-            else:
-                try:
-                    lat = dms_to_decimal(*dms_lat)
-                    long = dms_to_decimal(*dms_long)
-                except ValueError as e:
-                    raise e
-            
-            # datetime
             try:
-                datetime_str = image.datetime_original
-            except AttributeError as e:
-                raise AttributeError(f'AttributeError: {e}') from e
-            else:
-                try:
-                    datetime_object = datetime.strptime(datetime_str, '%Y:%m:%d %H:%M:%S')
-                except ValueError as e:
-                    raise ValueError(f'ValueError: {e}') from e
-
-            # props 
-            props = { 
-                "datetime": str(datetime_object),
-                }
-
-            # delete exif data
-            if get_image:
-                with threading.RLock():
-                    # Catch warning that not all data has been deleted:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter('ignore')
-                        image.delete_all()
-                
-            # files
-            image_b = image.get_file() if get_image else None
-
-            # TODO - try
-            thumb_b = image.get_thumbnail() if get_thumbnail else None
-
-            return (lat, long), props, image_b, thumb_b
-        
+                head = image_file.read(PREFILTER_SIZE)
+                image_format = find_format(head)
+                if image_format is not None:
+                    return _read_format(image_format, _map_file(image_file, head), get_image, get_thumbnail, properties)
+                image_b = _read_image_bytes(image_file, get_image, read_size, head)
+            finally:
+                if drop_cache:
+                    _fadvise(image_file.fileno(), 0, 0, 'POSIX_FADV_DONTNEED')
+        return _parse_exif_bytes(image_b, get_image, get_thumbnail, properties)
 
     except FileNotFoundError as e:
-        log.exception(f'FileNotFoundError: No such file or directory: {filepath}')
\ No newline at end of file
+        log.exception(f'FileNotFoundError: No such file or directory: {filepath}')
+    except (KeyError, AttributeError) as e:
+        if not xmp:
+            raise
+        return read_xmp(e, filepath=filepath)
+
+def read_exif_bytes(image_b, get_image=False, get_thumbnail=False, properties=None, xmp=False):
+    """
+    Read exif metadata from the image bytes `image_b`.
+
+    Parameters
+    ----------
+    image_b : bytes-like
+        The image file contents.
+
+    Returns
+    -------
+    As `read_exif`.
+
+    Raises
+    ------
+    As `read_exif`, except FileNotFoundError.
+    """
+    try:
+        prefilter(image_b)
+        return _parse_exif_bytes(image_b, get_image, get_thumbnail, properties)
+    except (KeyError, AttributeError) as e:
+        if not xmp:
+            raise
+        return read_xmp(e, image_b=image_b)
+
+def read_xmp(error, filepath=None, image_b=None):
+    """
+    Read the GPS coordinate and datetime of an image from XMP, after the EXIF path failed with `error`.
+
+    The XMP packet is read from `image_b` if it holds one, else from the
+    JPEG file at `filepath`, then from the sidecar files of `filepath`, see
+    `xmp_reader.sidecar_paths`. The first with a coordinate and datetime is used.
+
+    Parameters
+    ----------
+    error : Exception
+        The error of the EXIF path, raised if no XMP is found.
+    filepath : str, optional
+        The path to the image file.
+    image_b : bytes-like, optional
+        The image, or its start up to the end of its metadata.
+
+    Returns
+    -------
+    As `read_exif`, with only the datetime props, and no image or thumbnail.
+
+    Raises
+    ------
+    Exception
+        `error`, if no XMP packet has both a coordinate and datetime.
+    ValueError
+        If the XMP coordinate or datetime is invalid.
+    """
+    for chunks in _iter_xmp_sources(filepath, image_b):
+        values = xmp_reader.parse_xmp(chunks)
+        datetime_value = next((values[name] for name in xmp_reader.DATETIME_NAMES if name in values), None)
+        if xmp_reader.GPS_LATITUDE not in values or xmp_reader.GPS_LONGITUDE not in values or datetime_value is None:
+            continue
+        lat = dms_to_decimal(*xmp_reader.xmp_coordinate(values[xmp_reader.GPS_LATITUDE]))
+        long = dms_to_decimal(*xmp_reader.xmp_coordinate(values[xmp_reader.GPS_LONGITUDE]))
+        return (lat, long), _datetime_props(*xmp_reader.xmp_datetime(datetime_value)), None, None
+    raise error
+
+def _iter_xmp_sources(filepath=None, image_b=None):
+    # Yield the chunks of each XMP packet found, embedded first, read only as needed
+    segment = None if image_b is None else xmp_reader.find_xmp_segment(image_b)
+    if segment is not None:
+        yield [bytes(image_b[slice(*segment)])]
+    elif filepath is not None and os.path.isfile(filepath):
+        with open(filepath, 'rb') as image_file:
+            packet = xmp_reader.read_jpeg_xmp(image_file)
+        if packet is not None:
+            yield [packet]
+    if filepath is not None:
+        for sidecar_path in xmp_reader.sidecar_paths(filepath):
+            if os.path.isfile(sidecar_path):
+                yield xmp_reader.iter_file_chunks(sidecar_path)
+
+def _parse_exif_bytes(image_b, get_image=False, get_thumbnail=False, properties=None):
+    """Read exif metadata from the image bytes `image_b`, as `read_exif_bytes` without the prefilter."""
+    image_format = find_format(image_b)
+    if image_format is not None:
+        return _read_format(image_format, image_b, get_image, get_thumbnail, properties)
+    if not isinstance(image_b, bytes):
+        image_b = bytes(image_b)
+    thumb_b = _thumbnail_view(image_b, find_exif_segment(image_b)) if get_thumbnail else None
+    # exif reads the thumbnail only if it is not found in IFD1
+    coord, props, stripped_b, exif_thumb_b = _read_exif_image(Image(image_b), get_image,
+                                                              get_thumbnail and thumb_b is None)
+    if properties:
+        props.update(compile_plan(properties).extract(image_b))
+    return coord, props, stripped_b, exif_thumb_b if thumb_b is None else thumb_b
+
+def read_exif_stream(stream, get_image=False, get_thumbnail=False, properties=None, read_size=READ_CHUNK_SIZE):
+    """
+    Read exif metadata from the binary file-like object `stream`.
+
+    Only the start of a JPEG is read, unless `get_image` is set. Other formats
+    are memory mapped if `stream` is a file read from its start, else read up
+    to the end of their metadata.
+
+    Parameters
+    ----------
+    stream : file-like
+        The binary stream of the image file, read from its current position.
+
+    Returns
+    -------
+    As `read_exif`.
+
+    Raises
+    ------
+    As `read_exif`, except FileNotFoundError.
+    """
+    return _parse_exif_bytes(_read_image_bytes(stream, get_image, read_size), get_image, get_thumbnail, properties)
+
+def _read_file_bytes(image_file, get_image=False, read_size=READ_CHUNK_SIZE, drop_cache=False):
+    """bytes: Read `image_file` as `_read_image_bytes`, then drop it from the page cache if `drop_cache`."""
+    try:
+        return _read_image_bytes(image_file, get_image, read_size)
+    finally:
+        if drop_cache:
+            _fadvise(image_file.fileno(), 0, 0, 'POSIX_FADV_DONTNEED')
+
+def _read_image_bytes(stream, get_image=False, read_size=READ_CHUNK_SIZE, head=None):
+    """
+    bytes or mmap: Read all of a JPEG `stream` if `get_image` is set, else
+    only its metadata, after checking its first `PREFILTER_SIZE` bytes, or
+    `head` if already read, with the prefilter. Other formats are read as
+    `_read_format_prefix`.
+    """
+    if head is None:
+        head = stream.read(PREFILTER_SIZE)
+    prefilter(head)
+    image_format = find_format(head)
+    if image_format is not None:
+        return _read_format_prefix(stream, image_format, head, read_size)
+    return head + stream.read() if get_image else _read_metadata_prefix(stream, head, read_size)
+
+def _read_format_prefix(stream, image_format, head=b'', read_size=READ_CHUNK_SIZE):
+    """
+    mmap or bytes: Map the file `stream` if read from its start, else read
+    `stream`, after the bytes `head` already read, until the metadata located
+    by `image_format` is whole, or to the end of the stream.
+    """
+    try:
+        if stream.tell() == len(head):
+            return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        pass
+
+    data = bytearray(head)
+    while True:
+        location = image_format.find_tiff(data)
+        # A slice ending at the end of `data` may be cut short
+        if location is not None and location[1] < len(data):
+            return bytes(data[:location[1]])
+        chunk = stream.read(max(read_size, len(data)))
+        if not chunk:
+            return bytes(data)
+        data.extend(chunk)
+
+def _read_metadata_prefix(stream, head=b'', read_size=READ_CHUNK_SIZE):
+    """
+    bytes: Read the start of a JPEG `stream`, after the bytes `head` already
+    read, up to the first marker after the APP1 segment, or all of a stream
+    that isn't a JPEG or has no APP1 segment before the image data.
+    """
+    data = bytearray(head)
+
+    def fill(size):
+        # Read until `data` holds `size` bytes, return False at end of stream
+        while len(data) < size:
+            chunk = stream.read(max(size - len(data), read_size))
+            if not chunk:
+                return False
+            data.extend(chunk)
+        return True
+
+    if fill(2) and data[:2] == JPEG_SOI:
+        cursor = 2
+        while fill(cursor + 4) and data[cursor] == 0xFF:
+            marker = data[cursor:cursor + 2]
+            if marker == JPEG_SOS:
+                return bytes(data[:cursor])
+            length = int.from_bytes(data[cursor + 2:cursor + 4], 'big')
+            if marker == JPEG_APP1:
+                # exif reads on from the declared end of APP1 to the next marker
+                end = cursor + 2 + length
+                while fill(end + 1):
+                    index = data.find(b'\xff', end)
+                    if index >= 0:
+                        return bytes(data[:index + 1])
+                    end = len(data)
+                return bytes(data)
+            cursor += 2 + length
+
+    data.extend(stream.read())
+    return bytes(data)
+
+def _map_file(image_file, head):
+    """mmap or bytes: Map `image_file` read-only, or read the rest after `head` if it cannot be mapped."""
+    try:
+        return mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return head + image_file.read()
+
+def _read_format(image_format, data, get_image=False, get_thumbnail=False, properties=None):
+    """
+    Read exif metadata from `data`, a whole file of `image_format`, as `read_exif`.
+
+    Only JPEGs are stripped of metadata, so `get_image` raises a ValueError
+    once the metadata is read.
+
+    The map of a memory mapped file is not closed here, but when the last
+    view of it is released, which may be held by the traceback of an error.
+    """
+    location = image_format.find_tiff(data)
+    if location is None:
+        raise NoExifError('KeyError: No metadata.')
+    coord, props = _read_tiff_metadata(data, *location)
+    if get_image:
+        raise ValueError(f'ValueError: Cannot save {image_format.name} images stripped of metadata, Expecting JPEG')
+    if properties:
+        props.update(compile_plan(properties).extract_tiff(data, *location))
+    thumb_b = _thumbnail_view(data, location) if get_thumbnail else None
+    return coord, props, None, thumb_b
+
+def _thumbnail_view(data, location):
+    """
+    memoryview or None: Return the IFD1 thumbnail of the TIFF metadata at
+    `location`, a (start, end) slice of `data`, as a view of `data`, or None
+    if there is none.
+    """
+    if location is None:
+        return None
+    thumbnail = find_thumbnail(data, *location)
+    if thumbnail is None:
+        return None
+    start, end = thumbnail
+    return memoryview(data)[start:end]
+
+def _read_tiff_metadata(data, start, end):
+    """
+    Read the coordinate and datetime props from the TIFF metadata at
+    `data[start:end]`, raising the errors of `_read_exif_image`.
+    """
+    reader = TiffReader(data, start, end)
+    ifd0 = reader.entries(reader.ifd0_offset, {EXIF_IFD_POINTER, GPS_IFD_POINTER})
+
+    # coord
+    gps = _sub_ifd_entries(reader, ifd0, GPS_IFD_POINTER, {tag for tag, _ in GPS_TAGS})
+    for tag, attribute in GPS_TAGS:
+        if tag not in gps:
+            raise NoGPSError(f'AttributeError: image does not have attribute {attribute}')
+    lat = dms_to_decimal(*_dms(reader.value(gps[0x0002])), reader.value(gps[0x0001]))
+    long = dms_to_decimal(*_dms(reader.value(gps[0x0004])), reader.value(gps[0x0003]))
+
+    # datetime
+    exif = _sub_ifd_entries(reader, ifd0, EXIF_IFD_POINTER, set(DATETIME_TAGS))
+    if DATETIME_ORIGINAL not in exif:
+        raise AttributeError('AttributeError: image does not have attribute datetime_original')
+    datetime_str, subsec, offset = [reader.value(exif[tag]) if tag in exif else None for tag in DATETIME_TAGS]
+    return (lat, long), _datetime_props(datetime_str, subsec, offset)
+
+def _sub_ifd_entries(reader, ifd0, pointer_tag, tags):
+    # Return the entries of `tags` in the sub-IFD pointed to from IFD0, or none
+    if pointer_tag not in ifd0:
+        return {}
+    offset, = reader.value(ifd0[pointer_tag])
+    return reader.entries(offset, tags)
+
+def _dms(rationals):
+    # Return the degrees, minutes and seconds of three rationals as floats
+    if len(rationals) != 3 or any(denominator == 0 for _, denominator in rationals):
+        raise ValueError(f'ValueError: Invalid GPS coordinate {rationals}')
+    return [numerator / denominator for numerator, denominator in rationals]
+
+def _fadvise(fd, offset, length, advice):
+    # Advise the OS on the page cache of `fd`, where supported
+    if HAS_FADVISE:
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice))
+        except OSError:
+            pass
+
+def advise_willneed(filepath, size=READ_CHUNK_SIZE):
+    """
+    Advise the OS to load the first `size` bytes of `filepath`, or all of it if
+    `size` is 0, into the page cache ahead of reading.
+    """
+    if not HAS_FADVISE:
+        return
+    try:
+        fd = os.open(filepath, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        _fadvise(fd, 0, size, 'POSIX_FADV_WILLNEED')
+    finally:
+        os.close(fd)
+
+
+class Prefetcher(object):
+    """
+    Create a Prefetcher object.
+
+    Keeps the header range of the next `depth` files of a queue advised into
+    the page cache: the first on creation, and one more as each is `advance`d.
+    """
+
+    def __init__(self, filepaths, depth=DEFAULT_PREFETCH_DEPTH, size=READ_CHUNK_SIZE):
+        """
+        Initialise Prefetcher object.
+
+        Parameters
+        ----------
+        filepaths : list of str
+            The paths of the files, in the order they will be read.
+        depth : int, default 8
+            The number of files to keep advised ahead of reading.
+        size : int, default 65536
+            The bytes to advise from the start of each file, 0 for all.
+        """
+        self._filepaths = filepaths
+        self._size = size
+        self._lock = threading.Lock()
+        self._next = 0
+        for _ in range(depth):
+            self.advance()
+
+    def advance(self):
+        """Advise the next file in the queue, as one more is started."""
+        with self._lock:
+            if self._next >= len(self._filepaths):
+                return
+            filepath = self._filepaths[self._next]
+            self._next += 1
+        advise_willneed(filepath, self._size)
+
+
+def _read_exif_image(image, get_image=False, get_thumbnail=False):
+    """
+    Read exif metadata from `image`, an `exif.Image`, as `read_exif`.
+    """
+    if not image.has_exif:
+        raise KeyError('KeyError: No metadata.')
+
+    # coord
+    try:
+        dms_lat = (*image.gps_latitude, image.gps_latitude_ref)
+        dms_long = (*image.gps_longitude, image.gps_longitude_ref)
+    except AttributeError as e:
+        raise AttributeError(f'AttributeError: {e}') from e
+    else:
+        try:
+            lat = dms_to_decimal(*dms_lat)
+            long = dms_to_decimal(*dms_long)
+        except ValueError as e:
+            raise e
+    
+    # datetime
+    try:
+        datetime_str = image.datetime_original
+    except AttributeError as e:
+        raise AttributeError(f'AttributeError: {e}') from e
+
+    # props 
+    props = _datetime_props(datetime_str, image.get('subsec_time_original'), image.get('offset_time_original'))
+
+    # delete exif data
+    if get_image:
+        with _STRIP_LOCK:
+            # Catch warning that not all data has been deleted:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                image.delete_all()
+        
+    # files
+    image_b = image.get_file() if get_image else None
+
+    # TODO - try
+    thumb_b = image.get_thumbnail() if get_thumbnail else None
+
+    return (lat, long), props, image_b, thumb_b
+
+def _datetime_props(datetime_str, subsec=None, offset=None):
+    """
+    dict: Return the datetime props, and the ISO 8601 datetime with the
+    sub-seconds `subsec` and UTC offset `offset`, when recorded.
+    """
+    try:
+        datetime_object = parse_datetime_cached(datetime_str)
+    except ValueError as e:
+        raise ValueError(f'ValueError: {e}') from e
+
+    props = { 
+        "datetime": str(datetime_object),
+        }
+
+    # sub-second and offset, when recorded
+    microsecond = parse_subsec(subsec)
+    tzinfo = parse_offset(offset)
+    if microsecond is not None or tzinfo is not None:
+        props["datetime_iso"] = datetime_object.replace(microsecond=microsecond or 0, tzinfo=tzinfo).isoformat()
+    return props
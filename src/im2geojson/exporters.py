@@ -0,0 +1,340 @@
+"""
+Export GPS data to indexed binary formats alongside GeoJSON.
+
+Exporters accept features as they are processed and write them in batches.
+`GeoPackageExporter` needs only the standard library; `GeoParquetExporter`
+needs `pyarrow`.
+"""
+import os
+import json
+import struct
+import sqlite3
+
+GPKG_FORMAT = 'gpkg'
+PARQUET_FORMAT = 'parquet'
+EXPORT_FILENAME = 'features'
+DEFAULT_BATCH_SIZE = 1000
+
+WGS84_SRS_ID = 4326
+GPKG_APPLICATION_ID = 0x47504B47
+GPKG_USER_VERSION = 10300
+FEATURES_TABLE = 'features'
+GEOMETRY_COLUMN = 'geom'
+
+
+def point_wkb(lat, long):
+    """bytes: Return the little-endian Well-Known Binary of a point."""
+    return struct.pack('<BIdd', 1, 1, long, lat)
+
+
+class Exporter(object):
+    """
+    Create an Exporter object.
+
+    The base class of exporters, buffering features and flushing them every
+    `batch_size` features and on `close`.
+    """
+
+    extension = None
+
+    def __init__(self, file_path, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Initialise Exporter object.
+
+        Parameters
+        ----------
+        file_path : str
+            The path to the export file, replaced if it exists.
+        batch_size : int, default 1000
+            The number of features to buffer before writing.
+        """
+        self._file_path = file_path
+        self._batch_size = batch_size
+        self._batch = []
+        self._count = 0
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+        return False
+
+    @property
+    def file_path(self):
+        """str: Return the path to the export file."""
+        return self._file_path
+
+    @property
+    def count(self):
+        """int: Return the number of features added."""
+        return self._count
+
+    def add_feature(self, collection_title, lat, long, properties={}, collection_parent=None):
+        """
+        Add a feature to the export.
+
+        Parameters
+        ----------
+        collection_title : str
+            The collection title.
+        lat : float
+            The latitude of the feature.
+        long : float
+            The longitude of the feature.
+        properties : dict
+            The feature properties.
+        collection_parent : str
+            The collection parent.
+        """
+        self._batch.append((collection_title, collection_parent, lat, long, properties))
+        self._count += 1
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered features."""
+        if self._batch:
+            self._write_batch(self._batch)
+            self._batch = []
+
+    def close(self):
+        """Write the buffered features and close the export file."""
+        self.flush()
+
+    def _write_batch(self, batch):
+        raise NotImplementedError           # pragma: no cover
+
+
+class GeoPackageExporter(Exporter):
+    """
+    Create a GeoPackageExporter object.
+
+    Writes an OGC GeoPackage (SQLite) with a `features` point table and an
+    R-tree spatial index, using only the standard library `sqlite3` module.
+    """
+
+    extension = 'gpkg'
+
+    def __init__(self, file_path, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(file_path, batch_size)
+        self._bbox = None
+        self._connection = sqlite3.connect(file_path)
+        self._create_tables()
+
+    def _create_tables(self):
+        c = self._connection
+        c.execute(f'PRAGMA application_id = {GPKG_APPLICATION_ID}')
+        c.execute(f'PRAGMA user_version = {GPKG_USER_VERSION}')
+        c.executescript(f'''
+            CREATE TABLE gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL,
+                srs_id INTEGER PRIMARY KEY,
+                organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL,
+                definition TEXT NOT NULL,
+                description TEXT
+            );
+            CREATE TABLE gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY,
+                data_type TEXT NOT NULL,
+                identifier TEXT UNIQUE,
+                description TEXT DEFAULT '',
+                last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE,
+                srs_id INTEGER REFERENCES gpkg_spatial_ref_sys(srs_id)
+            );
+            CREATE TABLE gpkg_geometry_columns (
+                table_name TEXT NOT NULL,
+                column_name TEXT NOT NULL,
+                geometry_type_name TEXT NOT NULL,
+                srs_id INTEGER NOT NULL,
+                z TINYINT NOT NULL,
+                m TINYINT NOT NULL,
+                CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name)
+            );
+            CREATE TABLE gpkg_extensions (
+                table_name TEXT,
+                column_name TEXT,
+                extension_name TEXT NOT NULL,
+                definition TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                CONSTRAINT ge_tce UNIQUE (table_name, column_name, extension_name)
+            );
+            CREATE TABLE {FEATURES_TABLE} (
+                fid INTEGER PRIMARY KEY AUTOINCREMENT,
+                {GEOMETRY_COLUMN} BLOB,
+                collection TEXT,
+                parent TEXT,
+                datetime TEXT,
+                filename TEXT,
+                properties TEXT
+            );
+            CREATE INDEX {FEATURES_TABLE}_collection ON {FEATURES_TABLE} (collection);
+            CREATE VIRTUAL TABLE rtree_{FEATURES_TABLE}_{GEOMETRY_COLUMN}
+                USING rtree(id, minx, maxx, miny, maxy);
+        ''')
+        c.executemany('INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)', [
+            ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', 'undefined cartesian coordinate reference system'),
+            ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', 'undefined geographic coordinate reference system'),
+            ('WGS 84 geodetic', WGS84_SRS_ID, 'EPSG', 4326,
+             'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,'
+             'AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,'
+             'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,AUTHORITY["EPSG","9122"]],'
+             'AUTHORITY["EPSG","4326"]]',
+             'longitude/latitude coordinates in decimal degrees on the WGS 84 spheroid'),
+        ])
+        c.execute('INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) VALUES (?, ?, ?, ?)',
+                  (FEATURES_TABLE, 'features', FEATURES_TABLE, WGS84_SRS_ID))
+        c.execute('INSERT INTO gpkg_geometry_columns VALUES (?, ?, ?, ?, ?, ?)',
+                  (FEATURES_TABLE, GEOMETRY_COLUMN, 'POINT', WGS84_SRS_ID, 0, 0))
+        c.execute('INSERT INTO gpkg_extensions VALUES (?, ?, ?, ?, ?)',
+                  (FEATURES_TABLE, GEOMETRY_COLUMN, 'gpkg_rtree_index',
+                   'http://www.geopackage.org/spec120/#extension_rtree', 'write-only'))
+        c.commit()
+
+    @staticmethod
+    def geometry_blob(lat, long):
+        """bytes: Return a GeoPackage binary point, little-endian without an envelope."""
+        return b'GP' + struct.pack('<BBi', 0, 1, WGS84_SRS_ID) + point_wkb(lat, long)
+
+    def _write_batch(self, batch):
+        first_fid = self._count - len(batch) + 1
+        features = []
+        rtree = []
+        for fid, (title, parent, lat, long, properties) in enumerate(batch, first_fid):
+            features.append((
+                fid,
+                GeoPackageExporter.geometry_blob(lat, long),
+                title,
+                parent,
+                properties.get('datetime'),
+                properties.get('filename'),
+                json.dumps(properties),
+            ))
+            rtree.append((fid, long, long, lat, lat))
+            self._extend_bbox(lat, long)
+        with self._connection:
+            self._connection.executemany(
+                f'INSERT INTO {FEATURES_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?)', features)
+            self._connection.executemany(
+                f'INSERT INTO rtree_{FEATURES_TABLE}_{GEOMETRY_COLUMN} VALUES (?, ?, ?, ?, ?)', rtree)
+
+    def _extend_bbox(self, lat, long):
+        if self._bbox is None:
+            self._bbox = [long, lat, long, lat]
+        else:
+            self._bbox = [min(self._bbox[0], long), min(self._bbox[1], lat),
+                          max(self._bbox[2], long), max(self._bbox[3], lat)]
+
+    def close(self):
+        """Write the buffered features, record the extent and close the GeoPackage."""
+        if self._connection is None:
+            return
+        self.flush()
+        if self._bbox is not None:
+            with self._connection:
+                self._connection.execute(
+                    'UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, max_y = ? WHERE table_name = ?',
+                    (*self._bbox, FEATURES_TABLE))
+        self._connection.close()
+        self._connection = None
+
+
+class GeoParquetExporter(Exporter):
+    """
+    Create a GeoParquetExporter object.
+
+    Writes a GeoParquet file with WKB point geometries, one row group per
+    batch. Requires `pyarrow`.
+    """
+
+    extension = 'parquet'
+
+    def __init__(self, file_path, batch_size=DEFAULT_BATCH_SIZE):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError('ImportError: GeoParquet export requires pyarrow') from e
+        super().__init__(file_path, batch_size)
+        self._pa = pyarrow
+        geo_metadata = {
+            'version': '1.0.0',
+            'primary_column': 'geometry',
+            'columns': {
+                'geometry': {
+                    'encoding': 'WKB',
+                    'geometry_types': ['Point'],
+                },
+            },
+        }
+        self._schema = pyarrow.schema([
+            ('collection', pyarrow.string()),
+            ('parent', pyarrow.string()),
+            ('datetime', pyarrow.string()),
+            ('filename', pyarrow.string()),
+            ('properties', pyarrow.string()),
+            ('geometry', pyarrow.binary()),
+        ], metadata={'geo': json.dumps(geo_metadata)})
+        self._writer = pyarrow.parquet.ParquetWriter(file_path, self._schema)
+
+    def _write_batch(self, batch):
+        columns = {name: [] for name in self._schema.names}
+        for title, parent, lat, long, properties in batch:
+            columns['collection'].append(title)
+            columns['parent'].append(parent)
+            columns['datetime'].append(properties.get('datetime'))
+            columns['filename'].append(properties.get('filename'))
+            columns['properties'].append(json.dumps(properties))
+            columns['geometry'].append(point_wkb(lat, long))
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self):
+        """Write the buffered features and close the GeoParquet file."""
+        if self._writer is None:
+            return
+        self.flush()
+        self._writer.close()
+        self._writer = None
+
+
+EXPORTERS = {
+    GPKG_FORMAT: GeoPackageExporter,
+    PARQUET_FORMAT: GeoParquetExporter,
+}
+
+
+def get_exporter(export_format, directory, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Return an exporter writing `export_format` to `directory`.
+
+    Parameters
+    ----------
+    export_format : {'gpkg', 'parquet'}
+        The export format.
+    directory : str
+        The directory to write the export file `features.<export_format>` to.
+    batch_size : int, default 1000
+        The number of features to buffer before writing.
+
+    Returns
+    -------
+    Exporter
+        The exporter.
+
+    Raises
+    ------
+    ValueError
+        If `export_format` is unknown.
+    ImportError
+        If the library `export_format` needs is not installed.
+    """
+    try:
+        exporter_class = EXPORTERS[export_format]
+    except KeyError:
+        raise ValueError(f'ValueError: Invalid export format {export_format}, Expecting one of {", ".join(EXPORTERS)}')
+    file_path = os.path.join(directory, f'{EXPORT_FILENAME}.{exporter_class.extension}')
+    return exporter_class(file_path, batch_size)
@@ -0,0 +1,211 @@
+"""
+Locate the TIFF structured EXIF metadata in image container formats.
+
+Each format is recognised from its magic bytes, and its metadata found by
+walking only box or chunk headers:
+
+* TIFF and DNG files are TIFF metadata throughout.
+* HEIF, HEIC and AVIF (ISOBMFF) store it as an 'Exif' item, located through
+  the 'iinf' and 'iloc' boxes of the 'meta' box.
+* PNG stores it in an 'eXIf' chunk, WebP in an 'EXIF' chunk.
+
+The `find_*` functions take the whole file as a bytes-like object, such as an
+`mmap`, so only the pages holding the headers walked are read from disk.
+"""
+import struct
+
+from .ifd_reader import EXIF_HEADER
+
+TIFF_MAGICS = (b'II*\x00', b'MM\x00*')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+RIFF = b'RIFF'
+WEBP = b'WEBP'
+FTYP = b'ftyp'
+HEIF_BRANDS = (b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1', b'avif', b'avis')
+EXIF_ITEM_TYPE = b'Exif'
+
+
+def is_tiff(head):
+    """bool: Return True if `head` starts a TIFF or DNG file."""
+    return bytes(head[:4]) in TIFF_MAGICS
+
+def is_png(head):
+    """bool: Return True if `head` starts a PNG file."""
+    return bytes(head[:8]) == PNG_SIGNATURE
+
+def is_webp(head):
+    """bool: Return True if `head` starts a WebP file."""
+    return bytes(head[:4]) == RIFF and bytes(head[8:12]) == WEBP
+
+def is_heif(head):
+    """bool: Return True if `head` starts a HEIF, HEIC or AVIF file."""
+    if bytes(head[4:8]) != FTYP:
+        return False
+    size, = struct.unpack_from('>L', head, 0)
+    brands = bytes(head[8:min(size, len(head))])
+    # The major brand, then compatible brands after the minor version
+    return any(brands[index:index + 4] in HEIF_BRANDS for index in [0, *range(8, len(brands), 4)])
+
+
+def find_tiff(data):
+    """(start, end) : Return the slice of `data` holding TIFF metadata, all of it."""
+    return 0, len(data)
+
+def find_png_exif(data):
+    """
+    Find the 'eXIf' chunk of PNG `data`.
+
+    Returns
+    -------
+    (start, end) : tuple of int or None
+        The slice of `data` holding the TIFF metadata, or None if not found.
+    """
+    cursor = len(PNG_SIGNATURE)
+    size = len(data)
+    while cursor + 8 <= size:
+        length, chunk_type = struct.unpack_from('>L4s', data, cursor)
+        if chunk_type == b'eXIf':
+            return _skip_exif_header(data, cursor + 8, min(cursor + 8 + length, size))
+        if chunk_type == b'IEND':
+            break
+        cursor += 12 + length
+    return None
+
+def find_webp_exif(data):
+    """
+    Find the 'EXIF' chunk of WebP `data`.
+
+    Returns
+    -------
+    (start, end) : tuple of int or None
+        The slice of `data` holding the TIFF metadata, or None if not found.
+    """
+    cursor = 12
+    size = len(data)
+    while cursor + 8 <= size:
+        fourcc, length = struct.unpack_from('<4sL', data, cursor)
+        if fourcc == b'EXIF':
+            return _skip_exif_header(data, cursor + 8, min(cursor + 8 + length, size))
+        # Chunks are padded to an even length
+        cursor += 8 + length + (length & 1)
+    return None
+
+def find_heif_exif(data):
+    """
+    Find the 'Exif' item of HEIF `data`.
+
+    Returns
+    -------
+    (start, end) : tuple of int or None
+        The slice of `data` holding the TIFF metadata, or None if not found.
+    """
+    try:
+        meta = _find_box(data, b'meta', 0, len(data))
+        if meta is None:
+            return None
+        # 'meta' is a full box, its children follow the version and flags
+        meta_start, meta_end = meta[0] + 4, meta[1]
+        iinf = _find_box(data, b'iinf', meta_start, meta_end)
+        iloc = _find_box(data, b'iloc', meta_start, meta_end)
+        if iinf is None or iloc is None:
+            return None
+        item_id = _exif_item_id(data, *iinf)
+        if item_id is None:
+            return None
+        location = _item_location(data, *iloc, item_id)
+        if location is None:
+            return None
+        start, length = location
+        # The item starts with the offset to the TIFF header after it
+        tiff_offset, = struct.unpack_from('>L', data, start)
+        return start + 4 + tiff_offset, min(start + length, len(data))
+    except struct.error:
+        return None
+
+
+def _skip_exif_header(data, start, end):
+    # Some writers precede the TIFF metadata with the JPEG EXIF header
+    if bytes(data[start:start + len(EXIF_HEADER)]) == EXIF_HEADER:
+        start += len(EXIF_HEADER)
+    return start, end
+
+def _iter_boxes(data, start, end):
+    # Yield (type, content start, box end) of each ISOBMFF box in `data[start:end]`
+    cursor = start
+    while cursor + 8 <= end:
+        size, box_type = struct.unpack_from('>L4s', data, cursor)
+        header = 8
+        if size == 1:
+            size, = struct.unpack_from('>Q', data, cursor + 8)
+            header = 16
+        elif size == 0:
+            size = end - cursor
+        if size < header:
+            return
+        yield box_type, cursor + header, min(cursor + size, end)
+        cursor += size
+
+def _find_box(data, box_type, start, end):
+    # Return (content start, end) of the first box of `box_type`, or None
+    for found_type, content_start, box_end in _iter_boxes(data, start, end):
+        if found_type == box_type:
+            return content_start, box_end
+    return None
+
+def _exif_item_id(data, start, end):
+    # Return the ID of the 'Exif' item listed in the 'iinf' box, or None
+    version = data[start]
+    cursor = start + 4 + (2 if version == 0 else 4)
+    for box_type, content_start, box_end in _iter_boxes(data, cursor, end):
+        if box_type != b'infe':
+            continue
+        infe_version = data[content_start]
+        if infe_version < 2:
+            continue
+        if infe_version == 2:
+            item_id, _, item_type = struct.unpack_from('>HH4s', data, content_start + 4)
+        else:
+            item_id, _, item_type = struct.unpack_from('>LH4s', data, content_start + 4)
+        if item_type == EXIF_ITEM_TYPE:
+            return item_id
+    return None
+
+def _item_location(data, start, end, item_id):
+    # Return (offset, length) of the first extent of `item_id` in the 'iloc' box, or None
+    version = data[start]
+    sizes = struct.unpack_from('>BB', data, start + 4)
+    offset_size, length_size = sizes[0] >> 4, sizes[0] & 0x0F
+    base_offset_size, index_size = sizes[1] >> 4, (sizes[1] & 0x0F) if version in (1, 2) else 0
+    cursor = start + 6
+    if version < 2:
+        item_count, = struct.unpack_from('>H', data, cursor)
+        cursor += 2
+    else:
+        item_count, = struct.unpack_from('>L', data, cursor)
+        cursor += 4
+
+    def read_uint(size):
+        nonlocal cursor
+        value = int.from_bytes(bytes(data[cursor:cursor + size]), 'big') if size else 0
+        cursor += size
+        return value
+
+    for _ in range(item_count):
+        found_id = read_uint(2 if version < 2 else 4)
+        construction_method = read_uint(2) & 0x0F if version in (1, 2) else 0
+        read_uint(2)
+        base_offset = read_uint(base_offset_size)
+        extent_count = read_uint(2)
+        extents = []
+        for _ in range(extent_count):
+            read_uint(index_size)
+            extents.append((read_uint(offset_size), read_uint(length_size)))
+        if found_id == item_id:
+            # Only items stored by file offset are supported
+            if construction_method != 0 or not extents:
+                return None
+            offset, length = extents[0]
+            return base_offset + offset, length
+        if cursor > end:
+            return None
+    return None
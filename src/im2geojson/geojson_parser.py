@@ -1,23 +1,233 @@
 """
 Parse GPS data to GeoJSON Features
 """
+from array import array
+
 import geojson
 
+from .tiles import TileIndex, extend_bbox, check_zoom
+from .clusters import ClusterIndex
+
+
+class _PackedStrColumn(object):
+    """A column of str values packed into one UTF-8 buffer."""
+
+    __slots__ = ('_data', '_offsets')
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        return self._data[self._offsets[row]:self._offsets[row + 1]].decode('utf-8', 'surrogatepass')
+
+    def accepts(self, value):
+        return isinstance(value, str)
+
+    def append(self, value):
+        self._data += value.encode('utf-8', 'surrogatepass')
+        self._offsets.append(len(self._data))
+
+    def append_missing(self):
+        self._offsets.append(len(self._data))
+
+
+class _ObjectColumn(list):
+    """A column of arbitrary values."""
+
+    __slots__ = ()
+
+    def accepts(self, value):
+        return True
+
+    def append_missing(self):
+        self.append(None)
+
+
+class _FeatureColumns(object):
+    """
+    Columnar storage for the features of one `FeatureCollection`.
+
+    Coordinates are kept in `array('d')` columns, str properties in packed
+    columns, and the property keys of each feature as an index into the list
+    of distinct key tuples seen. `Feature` objects are only built on demand.
+    """
+
+    def __init__(self, title, parent=None):
+        self.title = title
+        self.parent = parent
+        self.lats = array('d')
+        self.longs = array('d')
+        self._bbox = None
+        self._bbox_stale = False
+        self._schemas = []
+        self._schema_ids = {}
+        self._row_schemas = array('I')
+        self._columns = {}
+        self._keys = {}
+        self._removed = set()
+
+    def __len__(self):
+        return len(self.lats) - len(self._removed)
+
+    @property
+    def bbox(self):
+        """list of float: Return the bbox of the rows, recomputed after removals."""
+        if self._bbox_stale:
+            self._bbox = None
+            for row in self.rows():
+                self._bbox = extend_bbox(self._bbox, self.lats[row], self.longs[row])
+            self._bbox_stale = False
+        return self._bbox
+
+    @property
+    def removed_count(self):
+        """int: Return the number of removed rows not yet compacted."""
+        return len(self._removed)
+
+    def rows(self):
+        """Return an iterable of the rows that have not been removed."""
+        if not self._removed:
+            return range(len(self.lats))
+        return (row for row in range(len(self.lats)) if row not in self._removed)
+
+    def keyed_rows(self):
+        """Return an iterator of `(key, row)`, key None for rows added without one."""
+        row_keys = {row: key for key, row in self._keys.items()}
+        return ((row_keys.get(row), row) for row in self.rows())
+
+    def append(self, lat, long, properties, key=None):
+        """int: Append a feature and return its row."""
+        row = len(self.lats)
+        if key is not None:
+            self._keys[key] = row
+        keys = tuple(properties)
+        schema_id = self._schema_ids.get(keys)
+        if schema_id is None:
+            schema_id = self._schema_ids[keys] = len(self._schemas)
+            self._schemas.append(keys)
+            for key in keys:
+                if key not in self._columns:
+                    self._columns[key] = self._new_column(row)
+
+        for key, column in self._columns.items():
+            if key in properties:
+                value = properties[key]
+                if not column.accepts(value):
+                    column = self._columns[key] = _ObjectColumn(column[i] for i in range(row))
+                column.append(value)
+            else:
+                column.append_missing()
+
+        self.lats.append(lat)
+        self.longs.append(long)
+        self._row_schemas.append(schema_id)
+        if not self._bbox_stale:
+            self._bbox = extend_bbox(self._bbox, lat, long)
+        return row
+
+    def remove(self, key):
+        """int: Remove the feature added with `key` and return its row, or None."""
+        row = self._keys.pop(key, None)
+        if row is not None:
+            self._removed.add(row)
+            self._bbox_stale = True
+        return row
+
+    def properties(self, row):
+        """dict: Return the properties at `row`."""
+        return {key: self._columns[key][row] for key in self._schemas[self._row_schemas[row]]}
+
+    def feature(self, row):
+        """Feature: Return the `Feature` at `row`."""
+        point = geojson.Point((self.longs[row], self.lats[row]))
+        return geojson.Feature(
+            geometry=point,
+            properties=self.properties(row)
+        )
+
+    def feature_collection(self, rows=None):
+        """FeatureCollection: Return the `FeatureCollection` of `rows`, default all rows."""
+        if rows is None:
+            rows = self.rows()
+        feature_collection = geojson.FeatureCollection(
+            title = self.title,
+            features = [self.feature(row) for row in rows]
+        )
+        if self.parent:
+            feature_collection['properties'] = { 'parent': self.parent }
+        return feature_collection
+
+    @staticmethod
+    def _new_column(rows):
+        column = _PackedStrColumn()
+        for _ in range(rows):
+            column.append_missing()
+        return column
+
 
 class GeoJSONParser(object):
     """
     Create a GeoJSONParser object.
-    
+
+    Note
+    ----
+    Features are stored in compact columns and only materialised as GeoJSON
+    objects when iterated.
     """
 
-    def __init__(self):
+    def __init__(self, tile_zoom=None, cluster_zooms=None):
+        """
+        Initialise GeoJSONParser object.
+
+        Parameters
+        ----------
+        tile_zoom : int, optional
+            Index features by z/x/y tile at `tile_zoom` as they are added.
+        cluster_zooms : list of int, optional
+            Aggregate features into clusters at each zoom level as they are added.
+
+        Raises
+        ------
+        ValueError
+            If `tile_zoom` or a cluster zoom level is out of range, see `tiles.check_zoom`.
+        """
+        for zoom in ([tile_zoom] if tile_zoom is not None else []) + list(cluster_zooms or []):
+            check_zoom(zoom)
         self._collections_dict = {}
+        self._tile_zoom = tile_zoom
+        self._tile_index_dict = {}
+        self._cluster_zooms = sorted(set(cluster_zooms)) if cluster_zooms else None
+        self._cluster_index_dict = {}
+        self._stale_clusters = set()
 
     def __iter__(self):
-        """Return an iterator for `_collections_dict` items."""
-        return iter(self._collections_dict.items())
+        """Return an iterator of `(title, FeatureCollection)` items."""
+        return ((title, self.feature_collection(title)) for title in self._collections_dict)
+
+    def __contains__(self, collection_title):
+        """bool: Return True if a `FeatureCollection` titled `collection_title` exists."""
+        return collection_title in self._collections_dict
+
+    @property
+    def titles(self):
+        """list of str: Return the `FeatureCollection` titles, in the order first added."""
+        return list(self._collections_dict)
+
+    @property
+    def tile_zoom(self):
+        """int: Return the tile zoom level, or None if tiles are not indexed."""
+        return self._tile_zoom
 
-    def add_feature(self, collection_title, lat, long, properties={}, collection_parent = None):
+    @property
+    def cluster_zooms(self):
+        """list of int: Return the cluster zoom levels, or None if not clustering."""
+        return self._cluster_zooms
+
+    def add_feature(self, collection_title, lat, long, properties={}, collection_parent = None, key = None):
         """
         Add a `Feature' to `_collections_dict`.
 
@@ -33,20 +243,227 @@ class GeoJSONParser(object):
             The 'Feature' properties.
         collection_parent : str
             The `FeatureCollection` parent.
+        key : hashable, optional
+            Identifies the 'Feature' for `remove_feature`, a 'Feature' already
+            added with `key` is replaced.
+        """
+        columns = self._collections_dict.get(collection_title)
+        if columns is None:
+            columns = _FeatureColumns(collection_title, collection_parent)
+            self._collections_dict[collection_title] = columns
+            if self._tile_zoom is not None:
+                self._tile_index_dict[collection_title] = TileIndex(self._tile_zoom)
+            if self._cluster_zooms is not None:
+                self._cluster_index_dict[collection_title] = ClusterIndex(self._cluster_zooms)
+        elif key is not None:
+            self._remove_row(collection_title, columns, key)
+
+        row = columns.append(lat, long, properties, key)
+
+        if self._tile_zoom is not None:
+            self._tile_index_dict[collection_title].add(lat, long, row)
+        if self._cluster_zooms is not None and collection_title not in self._stale_clusters:
+            self._cluster_index_dict[collection_title].add(lat, long, properties)
+
+    def remove_feature(self, collection_title, key):
+        """
+        Remove the `Feature` added with `key` from a `FeatureCollection`.
+
+        The `FeatureCollection` is removed with its last `Feature`.
+
+        Parameters
+        ----------
+        collection_title : str
+            The `FeatureCollection` title.
+        key : hashable
+            The key the 'Feature' was added with.
+
+        Returns
+        -------
+        bool
+            True if a 'Feature' was removed.
+        """
+        columns = self._collections_dict.get(collection_title)
+        if columns is None or not self._remove_row(collection_title, columns, key):
+            return False
+        if not len(columns):
+            self.remove_collection(collection_title)
+        elif columns.removed_count > len(columns):
+            self._compact(collection_title)
+        return True
+
+    def remove_collection(self, collection_title):
+        """
+        Remove a `FeatureCollection` and its tiles and clusters.
+
+        Parameters
+        ----------
+        collection_title : str
+            The `FeatureCollection` title.
+        """
+        self._collections_dict.pop(collection_title, None)
+        self._tile_index_dict.pop(collection_title, None)
+        self._cluster_index_dict.pop(collection_title, None)
+        self._stale_clusters.discard(collection_title)
+
+    def _remove_row(self, collection_title, columns, key):
+        # Removed rows are skipped until compacted, cluster aggregates are rebuilt when next read
+        row = columns.remove(key)
+        if row is None:
+            return False
+        if self._tile_zoom is not None:
+            self._tile_index_dict[collection_title].remove(columns.lats[row], columns.longs[row], row)
+        if self._cluster_zooms is not None:
+            self._stale_clusters.add(collection_title)
+        return True
+
+    def _compact(self, collection_title):
+        # Copy the remaining rows into new columns, renumbering them and rebuilding the indexes
+        columns = self._collections_dict[collection_title]
+        keyed_rows = list(columns.keyed_rows())
+        self.remove_collection(collection_title)
+        for key, row in keyed_rows:
+            self.add_feature(collection_title, columns.lats[row], columns.longs[row],
+                             columns.properties(row), columns.parent, key)
+
+    def _cluster_index(self, collection_title):
+        cluster_index = self._cluster_index_dict[collection_title]
+        if collection_title in self._stale_clusters:
+            columns = self._collections_dict[collection_title]
+            cluster_index = ClusterIndex(self._cluster_zooms)
+            for row in columns.rows():
+                cluster_index.add(columns.lats[row], columns.longs[row], columns.properties(row))
+            self._cluster_index_dict[collection_title] = cluster_index
+            self._stale_clusters.discard(collection_title)
+        return cluster_index
+
+    def feature_count(self, collection_title):
+        """int: Return the number of features in a `FeatureCollection`."""
+        return len(self._collections_dict[collection_title])
+
+    def bbox(self, collection_title):
+        """list of float: Return the `[west, south, east, north]` bbox of a `FeatureCollection`."""
+        return list(self._collections_dict[collection_title].bbox)
+
+    def feature_collection(self, collection_title):
+        """
+        Return a `FeatureCollection`.
+
+        Parameters
+        ----------
+        collection_title : str
+            The `FeatureCollection` title.
+
+        Returns
+        -------
+        FeatureCollection
+            The `FeatureCollection`, with its `bbox`.
         """
-        point = geojson.Point((long, lat))
-        feature = geojson.Feature(
-            geometry=point, 
-            properties=properties
+        columns = self._collections_dict[collection_title]
+        feature_collection = columns.feature_collection()
+        feature_collection['bbox'] = list(columns.bbox)
+        return feature_collection
+
+    def rollup_collection(self, title, collection_titles, parent=None):
+        """
+        Return a `FeatureCollection` of the features of several collections.
+
+        Parameters
+        ----------
+        title : str
+            The title of the rollup `FeatureCollection`.
+        collection_titles : list of str
+            The titles of the `FeatureCollection`s to roll up, in order.
+        parent : str, optional
+            The parent of the rollup `FeatureCollection`.
+
+        Returns
+        -------
+        FeatureCollection
+            The `FeatureCollection`, with the `bbox` of all its features.
+        """
+        features = []
+        bbox = None
+        for collection_title in collection_titles:
+            columns = self._collections_dict[collection_title]
+            features.extend(columns.feature(row) for row in columns.rows())
+            if columns.bbox is not None:
+                west, south, east, north = columns.bbox
+                bbox = extend_bbox(extend_bbox(bbox, south, west), north, east)
+        feature_collection = geojson.FeatureCollection(
+            title = title,
+            features = features
         )
-        if collection_title not in self._collections_dict:
+        if parent:
+            feature_collection['properties'] = { 'parent': parent }
+        feature_collection['bbox'] = bbox
+        return feature_collection
+
+    def iter_tiles(self, collection_title):
+        """
+        Return an iterator of the tiles of a `FeatureCollection`.
+
+        Parameters
+        ----------
+        collection_title : str
+            The `FeatureCollection` title.
+
+        Yields
+        ------
+        (z, x, y) : tuple of int
+            The tile.
+        feature_collection : FeatureCollection
+            The features in the tile, with their `bbox`.
+
+        Raises
+        ------
+        RuntimeError
+            If the parser was not initialised with `tile_zoom`.
+        """
+        if self._tile_zoom is None:
+            raise RuntimeError('Error: Tiles are not indexed, set tile_zoom')
+        columns = self._collections_dict[collection_title]
+        for tile, rows in self._tile_index_dict[collection_title]:
+            bbox = None
+            for row in rows:
+                bbox = extend_bbox(bbox, columns.lats[row], columns.longs[row])
+            feature_collection = columns.feature_collection(rows)
+            feature_collection['bbox'] = bbox
+            feature_collection['tile'] = list(tile)
+            yield tile, feature_collection
+
+    def iter_clusters(self, collection_title):
+        """
+        Return an iterator of the clusters of a `FeatureCollection`.
+
+        Parameters
+        ----------
+        collection_title : str
+            The `FeatureCollection` title.
+
+        Yields
+        ------
+        zoom : int
+            The cluster zoom level.
+        feature_collection : FeatureCollection
+            The cluster features at `zoom`.
+
+        Raises
+        ------
+        RuntimeError
+            If the parser was not initialised with `cluster_zooms`.
+        """
+        if self._cluster_zooms is None:
+            raise RuntimeError('Error: Features are not clustered, set cluster_zooms')
+        columns = self._collections_dict[collection_title]
+        cluster_index = self._cluster_index(collection_title)
+        for zoom in cluster_index.zooms:
             feature_collection = geojson.FeatureCollection(
                 title = collection_title,
-                features = [feature]
+                features = list(cluster_index.iter_features(zoom))
             )
-            if collection_parent: 
-                feature_collection['properties'] = { 'parent': collection_parent }
-
-            self._collections_dict[collection_title] = feature_collection
-        else:
-            self._collections_dict[collection_title]['features'].append(feature)
+            if columns.parent:
+                feature_collection['properties'] = { 'parent': columns.parent }
+            feature_collection['bbox'] = list(columns.bbox)
+            feature_collection['zoom'] = zoom
+            yield zoom, feature_collection
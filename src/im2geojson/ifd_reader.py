@@ -0,0 +1,275 @@
+"""
+Read tags from TIFF structured EXIF metadata, as held in the APP1 segment of a
+JPEG or the container of another image format.
+
+EXIF metadata is a TIFF header followed by Image File Directories (IFDs),
+each a table of 12 byte entries: tag, type, count and a value or an offset
+to it. `TiffReader` decodes only the entries asked for, so reading a few
+tags costs a table scan rather than decoding every tag in the image.
+"""
+import struct
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_SOS = b'\xff\xda'
+JPEG_APP1 = b'\xff\xe1'
+EXIF_HEADER = b'Exif\x00\x00'
+
+IFD0 = '0'
+IFD1 = '1'
+EXIF_IFD = 'exif'
+GPS_IFD = 'gps'
+
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+# The IFD1 offset and length of the JPEG thumbnail
+JPEG_INTERCHANGE_FORMAT = 0x0201
+JPEG_INTERCHANGE_FORMAT_LENGTH = 0x0202
+SUB_IFD_POINTERS = {
+    EXIF_IFD: EXIF_IFD_POINTER,
+    GPS_IFD: GPS_IFD_POINTER,
+}
+
+# TIFF field types
+BYTE = 1
+ASCII = 2
+SHORT = 3
+LONG = 4
+RATIONAL = 5
+SBYTE = 6
+UNDEFINED = 7
+SSHORT = 8
+SLONG = 9
+SRATIONAL = 10
+TYPE_FORMATS = {
+    BYTE: 'B',
+    ASCII: 's',
+    SHORT: 'H',
+    LONG: 'L',
+    RATIONAL: 'LL',
+    SBYTE: 'b',
+    UNDEFINED: 's',
+    SSHORT: 'h',
+    SLONG: 'l',
+    SRATIONAL: 'll',
+}
+TYPE_SIZES = {
+    BYTE: 1, ASCII: 1, SHORT: 2, LONG: 4, RATIONAL: 8,
+    SBYTE: 1, UNDEFINED: 1, SSHORT: 2, SLONG: 4, SRATIONAL: 8,
+}
+ENTRY_SIZE = 12
+
+
+class IFDError(ValueError):
+    """Raised for malformed TIFF metadata."""
+
+
+def iter_segments(data):
+    """
+    Iterate over the segments of JPEG `data` before the image data.
+
+    Parameters
+    ----------
+    data : bytes-like
+        The start of a JPEG file.
+
+    Yields
+    ------
+    (marker, offset, length) : tuple of bytes, int, int
+        The marker of each segment, its offset in `data` and its declared
+        length. The start of scan segment is the last yielded, unless `data`
+        ends or is not a JPEG first.
+    """
+    if bytes(data[:2]) != JPEG_SOI:
+        return
+    cursor = 2
+    size = len(data)
+    while cursor + 4 <= size and data[cursor] == 0xFF:
+        if data[cursor + 1] == 0xFF:
+            # Fill byte before a marker
+            cursor += 1
+            continue
+        marker = bytes(data[cursor:cursor + 2])
+        length = (data[cursor + 2] << 8) | data[cursor + 3]
+        yield marker, cursor, length
+        if marker == JPEG_SOS:
+            return
+        cursor += 2 + length
+
+def is_exif_segment(data, marker, offset):
+    """bool: Return True if the segment `marker` at `offset` of `data` holds EXIF metadata."""
+    return marker == JPEG_APP1 and bytes(data[offset + 4:offset + 10]) == EXIF_HEADER
+
+def find_exif_segment(data):
+    """
+    Find the EXIF APP1 segment of JPEG `data`.
+
+    Parameters
+    ----------
+    data : bytes-like
+        The start of a JPEG file, at least up to the end of its EXIF segment.
+
+    Returns
+    -------
+    (start, end) : tuple of int or None
+        The slice of `data` holding the TIFF metadata, or None if `data` is
+        not a JPEG or has no EXIF segment before the image data.
+    """
+    for marker, offset, length in iter_segments(data):
+        if is_exif_segment(data, marker, offset):
+            return offset + 10, min(offset + 2 + length, len(data))
+    return None
+
+def find_thumbnail(data, start=0, end=None):
+    """
+    Find the JPEG thumbnail of the TIFF metadata at `data[start:end]`.
+
+    The thumbnail is located by the `JPEGInterchangeFormat` and
+    `JPEGInterchangeFormatLength` entries of IFD1, without decoding any
+    other tag.
+
+    Returns
+    -------
+    (start, end) : tuple of int or None
+        The slice of `data` holding the thumbnail, or None if there is none,
+        or its entries are invalid or point past the metadata.
+    """
+    try:
+        reader = TiffReader(data, start, end)
+        ifd1_offset = reader.ifd1_offset()
+        if not ifd1_offset:
+            return None
+        found = reader.entries(ifd1_offset, {JPEG_INTERCHANGE_FORMAT, JPEG_INTERCHANGE_FORMAT_LENGTH})
+        if len(found) != 2:
+            return None
+        values = reader.value(found[JPEG_INTERCHANGE_FORMAT]), reader.value(found[JPEG_INTERCHANGE_FORMAT_LENGTH])
+        # Numbers are decoded as tuples, ASCII and UNDEFINED values are invalid
+        if not all(isinstance(value, tuple) and len(value) == 1 and isinstance(value[0], int) for value in values):
+            return None
+        (offset,), (length,) = values
+        if offset < 8 or length < 1:
+            return None
+        reader.slice(offset, length)
+    except IFDError:
+        return None
+    return start + offset, start + offset + length
+
+
+class TiffReader(object):
+    """
+    Create a TiffReader object.
+
+    Reads IFD entries and values from TIFF metadata. Offsets are relative to
+    the TIFF header, as in the metadata itself.
+    """
+
+    def __init__(self, data, start=0, end=None):
+        """
+        Initialise TiffReader object.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The buffer holding the TIFF metadata.
+        start : int, default 0
+            The offset of the TIFF header in `data`.
+        end : int, optional
+            The end of the TIFF metadata in `data`, default the end of `data`.
+
+        Raises
+        ------
+        IFDError
+            If the TIFF header is invalid.
+        """
+        self._data = memoryview(data)[start:end]
+        byte_order = bytes(self._data[:2])
+        if byte_order == b'II':
+            self._endian = '<'
+        elif byte_order == b'MM':
+            self._endian = '>'
+        else:
+            raise IFDError('IFDError: Invalid TIFF byte order')
+        magic, self._ifd0_offset = self._unpack('HL', 2)
+        if magic != 42:
+            raise IFDError('IFDError: Invalid TIFF header')
+        self._tag_format = struct.Struct(f'{self._endian}H10x')
+
+    @property
+    def ifd0_offset(self):
+        """int: Return the offset of IFD0."""
+        return self._ifd0_offset
+
+    def ifd1_offset(self):
+        """int: Return the offset of IFD1, the thumbnail IFD, or 0 if none."""
+        count, = self._unpack('H', self._ifd0_offset)
+        offset, = self._unpack('L', self._ifd0_offset + 2 + count * ENTRY_SIZE)
+        return offset
+
+    def entries(self, ifd_offset, tags):
+        """
+        Find the entries of `tags` in the IFD at `ifd_offset`.
+
+        Parameters
+        ----------
+        ifd_offset : int
+            The offset of the IFD.
+        tags : set of int
+            The tags to find.
+
+        Returns
+        -------
+        dict
+            The offset of each entry found, by tag.
+        """
+        count, = self._unpack('H', ifd_offset)
+        table = ifd_offset + 2
+        if table + count * ENTRY_SIZE > len(self._data):
+            raise IFDError('IFDError: IFD extends past the metadata')
+        found = {}
+        for index, (tag,) in enumerate(self._tag_format.iter_unpack(self._data[table:table + count * ENTRY_SIZE])):
+            if tag in tags:
+                found[tag] = table + index * ENTRY_SIZE
+        return found
+
+    def value(self, entry_offset):
+        """
+        Decode the value of the entry at `entry_offset`.
+
+        Returns
+        -------
+        str, bytes or tuple
+            ASCII values as str, UNDEFINED as bytes, numbers as a tuple, with
+            each RATIONAL as a (numerator, denominator) tuple.
+        """
+        field_type, count = self._unpack('HL', entry_offset + 2)
+        try:
+            size = TYPE_SIZES[field_type] * count
+        except KeyError:
+            raise IFDError(f'IFDError: Unsupported field type {field_type}')
+        if size <= 4:
+            value_offset = entry_offset + 8
+        else:
+            value_offset, = self._unpack('L', entry_offset + 8)
+        if value_offset + size > len(self._data):
+            raise IFDError('IFDError: Value extends past the metadata')
+
+        if field_type in (ASCII, UNDEFINED):
+            raw = bytes(self._data[value_offset:value_offset + size])
+            if field_type == UNDEFINED:
+                return raw
+            return raw.split(b'\x00', 1)[0].decode('ascii', 'replace')
+        values = self._unpack(TYPE_FORMATS[field_type] * count, value_offset)
+        if field_type in (RATIONAL, SRATIONAL):
+            return tuple(zip(values[::2], values[1::2]))
+        return values
+
+    def slice(self, offset, length):
+        """memoryview: Return `length` bytes from `offset`, without copying."""
+        if offset + length > len(self._data):
+            raise IFDError('IFDError: Data extends past the metadata')
+        return self._data[offset:offset + length]
+
+    def _unpack(self, fmt, offset):
+        try:
+            return struct.unpack_from(self._endian + fmt, self._data, offset)
+        except struct.error as e:
+            raise IFDError(f'IFDError: {e}') from e
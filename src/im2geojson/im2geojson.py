@@ -6,19 +6,56 @@ __docformat__ = "numpy"
 import os
 import glob
 import json
+import array
+import collections
+import contextlib
+import threading
+import time
 import concurrent.futures
 import logging
 
 from .geojson_parser import GeoJSONParser
-from .exif_reader import read_exif
+from .exif_reader import (read_exif, read_exif_bytes, read_exif_stream, _read_image_bytes, _read_file_bytes,
+                          _parse_exif_bytes, read_xmp, Prefetcher, READ_CHUNK_SIZE)
+from .prefilter import prefilter
 from .timer import Timer
+from .tiles import tile_bbox
+from .serializer import get_serializer, JSON_BACKEND
+from .exporters import get_exporter, EXPORTERS
+from .property_plan import compile_plan
+from .error_sink import ErrorSink, ERRORS_FILENAME
+from .autotune import AIMDController, AUTO_CONCURRENCY, MAX_READERS, MAX_PARSERS, READ_AHEAD_FACTOR
+from .deadlines import Deadlines, DeadlineExceeded, WorkerPool, failed_future
+from .sync import Manifest, MANIFEST_FILENAME, data_digest
+from .scheduling import locality_order, folder_batches, chunks, LISTING_SCHEDULE, LOCALITY_SCHEDULE, SCHEDULES
 
 DEFAULT_OUTPUT_DIRECTORY = './assets'
 GEOJSON_DIR = 'geojson'
 IMAGE_DIR = 'images'
+TILES_DIR = 'tiles'
+TILE_INDEX_FILENAME = 'index.json'
+CLUSTERS_DIR = 'clusters'
+ROLLUPS_DIR = 'rollups'
+WRITE_WORKERS = 4
+MAX_PENDING_WRITES = 2 * WRITE_WORKERS
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.tif', '.tiff', '.dng', '.heic', '.heif', '.avif', '.png', '.webp')
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+# Errors of the image itself, recorded by sync until it changes, unlike I/O errors and timeouts
+SYNC_ERRORS = (KeyError, AttributeError, ValueError)
+# As `ThreadPoolExecutor`
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+# Collections keyed by the immediate folder name, or by the relative path from `input_directory`
+FOLDER_LAYOUT = 'folder'
+TREE_LAYOUT = 'tree'
+LAYOUTS = (FOLDER_LAYOUT, TREE_LAYOUT)
 
 log = logging.getLogger('im2geojson')
 
+# The outcome of a chunk of images: the paths of those processed, their
+# coordinates as a flat array of lat, long pairs and their properties, and
+# the (filepath, exception) of those that failed
+BatchResult = collections.namedtuple('BatchResult', ['filepaths', 'coords', 'props', 'errors'])
+
 
 class ImageToGeoJSON(object):
     """
@@ -34,7 +71,23 @@ class ImageToGeoJSON(object):
                  input_directory, 
                  output_directory=DEFAULT_OUTPUT_DIRECTORY, 
                  save_images=False, 
-                 save_thumbnails=False):
+                 save_thumbnails=False,
+                 tile_zoom=None,
+                 cluster_zooms=None,
+                 json_backend=JSON_BACKEND,
+                 export_formats=None,
+                 concurrency=None,
+                 properties=None,
+                 file_timeout=None,
+                 run_timeout=None,
+                 schedule=LISTING_SCHEDULE,
+                 chunk_size=None,
+                 read_size=READ_CHUNK_SIZE,
+                 prefetch=0,
+                 xmp=False,
+                 sync=False,
+                 layout=FOLDER_LAYOUT,
+                 rollups=False):
         """
         Initialise ImageToGeoJSON object.
 
@@ -49,10 +102,94 @@ class ImageToGeoJSON(object):
             The path to the `output_directory`.
 
         save_images : bool, default False
-            Save images stripped of metadata to `output_directory`.
+            Save images stripped of metadata to `output_directory`. Only
+            JPEGs are stripped, other formats are recorded as errors.
 
         save_thumbnails : bool, default False
             Save thumbnail images to `output_directory`.
+
+        tile_zoom : int, optional
+            Also save each `FeatureCollection` as z/x/y tiles at `tile_zoom`,
+            with an index manifest, to the tiles folder of `output_directory`.
+
+        cluster_zooms : list of int, optional
+            Also save clusters of each `FeatureCollection` at each zoom level
+            to the clusters folder of `output_directory`.
+
+        json_backend : {'auto', 'orjson', 'json'}, default 'json'
+            The JSON serialisation backend. 'orjson' is faster but formats
+            differently, 'auto' uses it when installed.
+
+        export_formats : list of {'gpkg', 'parquet'}, optional
+            Also export all features to `output_directory` in each format:
+            GeoPackage with an R-tree index, or GeoParquet (requires pyarrow).
+
+        concurrency : int or 'auto', optional
+            The number of images processed at once, default as `ThreadPoolExecutor`.
+            'auto' reads and parses images in separate stages and tunes the
+            number of each in flight from the measured throughput.
+
+        properties : list of str, optional
+            Extra properties to read from each image, any of 'altitude',
+            'direction', 'gps_timestamp', 'make', 'model', 'orientation',
+            'focal_length', 'iso' and 'lens_model'.
+
+        file_timeout : float, optional
+            The seconds each image may take once processing starts. Images
+            that take longer are recorded as errors and `quarantined`.
+
+        run_timeout : float, optional
+            The seconds the whole run may take. Images not processed by then
+            are recorded as errors and `quarantined`.
+
+        schedule : {'listing', 'locality'}, default 'listing'
+            The order images are processed in. 'locality' orders them by
+            folder and inode number, and processes each folder's images as
+            one batch, for near-sequential reads on spinning disks and some
+            network filesystems.
+
+        chunk_size : int, optional
+            The number of images each worker task processes, returning one
+            compact result per chunk, to cut the per-image task overhead for
+            small images on fast storage. Not used with `concurrency` 'auto'
+            or timeouts, which schedule each image.
+
+        read_size : int, default 65536
+            The bytes read at a time from each file while reading its
+            metadata, and advised ahead by `prefetch`.
+
+        prefetch : int, default 0
+            The number of queued files to advise the OS to load ahead of
+            reading, `read_size` bytes of each, and to drop from the page
+            cache once read. Needs `os.posix_fadvise`, else ignored.
+
+        xmp : bool, default False
+            Read the GPS coordinate and datetime of images without EXIF GPS
+            data from their XMP packet, or a `.xmp` sidecar file beside them.
+            Images read from streams use only their EXIF data.
+
+        sync : bool, default False
+            Keep a manifest of each image's size, modification time and
+            outputs in `output_directory`, and on later runs skip unchanged
+            images, delete the outputs of images gone, and rewrite only the
+            collections that changed. Images are also hashed as they are
+            read when `save_images` is set. Not used by `start_images`.
+
+        layout : {'folder', 'tree'}, default 'folder'
+            How images are grouped into collections. 'folder' reads the
+            folders one level below `input_directory` and titles each
+            collection by its folder name. 'tree' reads every folder below
+            `input_directory` and titles each collection by its relative
+            path, such as 'trip1/day1', saving its geojson file, images and
+            thumbnails under that path, so folders of the same name never
+            merge.
+
+        rollups : bool, default False
+            Also save a collection of all the images below each folder with
+            subfolders to the rollups folder of `output_directory`, such as
+            'trip1' for 'trip1/day1' and 'trip1/day2'. Needs `layout` 'tree'.
+            Rollups, tiles and clusters are saved outside the geojson folder,
+            so never collide with a collection, such as one titled 'rollups'.
         
         """
         
@@ -60,10 +197,53 @@ class ImageToGeoJSON(object):
         self._output_directory = output_directory.rstrip('/')
         self._save_images = save_images
         self._save_thumbnails = save_thumbnails
+        self._tile_zoom = tile_zoom
+        self._cluster_zooms = cluster_zooms
+        self._serializer = get_serializer(json_backend)
+        self._export_formats = list(export_formats) if export_formats else []
+        for export_format in self._export_formats:
+            if export_format not in EXPORTERS:
+                raise ValueError(f'ValueError: Invalid export format {export_format}, Expecting one of {", ".join(EXPORTERS)}')
+        if not (concurrency is None or concurrency == AUTO_CONCURRENCY
+                or (isinstance(concurrency, int) and concurrency > 0)):
+            raise ValueError(f'ValueError: Invalid concurrency {concurrency}, Expecting a positive int or {AUTO_CONCURRENCY}')
+        self._concurrency = concurrency
+        self._plan = compile_plan(properties) if properties else None
+        for timeout in (file_timeout, run_timeout):
+            if timeout is not None and timeout <= 0:
+                raise ValueError(f'ValueError: Invalid timeout {timeout}, Expecting a positive number of seconds')
+        self._file_timeout = file_timeout
+        self._run_timeout = run_timeout
+        self._quarantined = []
+        if schedule not in SCHEDULES:
+            raise ValueError(f'ValueError: Invalid schedule {schedule}, Expecting one of {", ".join(SCHEDULES)}')
+        self._schedule = schedule
+        if not (chunk_size is None or (isinstance(chunk_size, int) and chunk_size > 0)):
+            raise ValueError(f'ValueError: Invalid chunk size {chunk_size}, Expecting a positive int')
+        self._chunk_size = chunk_size
+        for name, value, minimum in (('read size', read_size, 1), ('prefetch', prefetch, 0)):
+            if not isinstance(value, int) or value < minimum:
+                raise ValueError(f'ValueError: Invalid {name} {value}, Expecting an int of at least {minimum}')
+        self._read_size = read_size
+        self._prefetch = prefetch
+        self._prefetcher = None
+        self._xmp = xmp
+        self._sync = sync
+        self._file_hashes = None
+        self._unchanged_count = 0
+        self._removed_count = 0
+        if layout not in LAYOUTS:
+            raise ValueError(f'ValueError: Invalid layout {layout}, Expecting one of {", ".join(LAYOUTS)}')
+        if rollups and layout != TREE_LAYOUT:
+            raise ValueError(f'ValueError: Invalid rollups with layout {layout}, Expecting layout {TREE_LAYOUT}')
+        self._layout = layout
+        self._rollups = rollups
+        # Titles are relative to the root, image names are already relative in `start_images`
+        self._tree_root = input_directory
 
-        self._geojson_parser = GeoJSONParser()
+        self._geojson_parser = GeoJSONParser(tile_zoom=tile_zoom, cluster_zooms=cluster_zooms)
         self._timer = None
-        self._error_dictionary = {}
+        self._errors = ErrorSink(os.path.join(self._output_directory, ERRORS_FILENAME))
         self._total_count = 0
         self._success_count = 0
 
@@ -88,21 +268,49 @@ class ImageToGeoJSON(object):
     def output_directory(self):
         """str: Return the path to the `output_directory`."""
         return self._output_directory
+
+    @property
+    def layout(self):
+        """str: Return the `layout` of the folders in `input_directory`, 'folder' or 'tree'."""
+        return self._layout
         
     @property
     def summary(self):
-        """str: Return the `summary` string."""
-        return f'{self._success_count} out of {self._total_count} images processed successfully'
+        """str: Return the `summary` string, with the images unchanged and removed when syncing."""
+        summary = f'{self._success_count} out of {self._total_count} images processed successfully'
+        if self._sync:
+            summary += f', {self._unchanged_count} unchanged, {self._removed_count} removed'
+        return summary
     
     @property
     def has_errors(self):
         """bool: Return `true` if `error_dictionary` contains errors."""
-        return False if self._error_dictionary == {} else True
+        return self._errors.count > 0
     
     @property
     def error_dictionary(self):
-        """dict: Return the `error_dictionary`."""
-        return self._error_dictionary
+        """dict: Return the `error_dictionary`, read from `errors_path` on each call."""
+        return self._errors.read()
+
+    @property
+    def error_counts(self):
+        """dict: Return the number of errors of each class, most common first."""
+        return self._errors.counts
+
+    @property
+    def error_summary(self):
+        """str: Return the first errors, the count of each class and `errors_path`."""
+        return self._errors.summary()
+
+    @property
+    def quarantined(self):
+        """list of str: Return the images abandoned after exceeding `file_timeout` or `run_timeout`."""
+        return list(self._quarantined)
+
+    @property
+    def errors_path(self):
+        """str: Return the path to the JSON Lines file of errors."""
+        return self._errors.path
 
     def start(self):
         """
@@ -113,67 +321,648 @@ class ImageToGeoJSON(object):
             raise RuntimeError('Error: Too many calls to function')
         
         with Timer() as self._timer:
-            self._process_files()
-            
-    def _process_files(self):
-        # Process image files concurrently
-        files = glob.iglob(f'{self.input_directory}**/*.[Jj][Pp][Gg]')
-        # TODO - **/*.@(jpg|JPG|jpeg|JPEG|gif|GIF|png|PNG) : Tests for gif, png
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_to_path = {executor.submit(self._process_image_file, filepath): filepath for filepath in files}
-            for future in concurrent.futures.as_completed(future_to_path):
-                filepath = future_to_path[future]
+            try:
+                self._process_files()
+            finally:
+                self._errors.close()
+
+    def start_images(self, images):
+        """
+        Process images from memory or streams instead of `input_directory`.
+
+        Parameters
+        ----------
+        images : iterable of (str, bytes or file-like)
+            The image name and contents. The name is a relative path such as
+            'folder/image.jpg', its folder is the collection title. In 'tree'
+            layout absolute names, or those leading up with '..', are recorded
+            as errors. The contents are the image bytes, or a binary file-like
+            object of which only the metadata is read unless `save_images` is
+            set.
+
+        """
+        if self._timer is not None:
+            raise RuntimeError('Error: Too many calls to function')
+
+        self._tree_root = None
+        with Timer() as self._timer:
+            try:
+                self._process_files(list(images))
+            finally:
+                self._errors.close()
+
+    def process_image(self, filepath):
+        """
+        Process the image at `filepath`, recording an error if it fails.
+
+        The feature is returned, not added to its collection, see `update_feature`.
+
+        Returns
+        -------
+        (title, coord, props, parent) : tuple of str, tuple of float, dict, str or None
+            The collection title, coordinate, properties and parent title of
+            the image, or None if it failed.
+        """
+        try:
+            title, coord, props = self._process_image_file(filepath)
+        except Exception as e:
+            self._add_file_to_errors_with_exception_string(filepath, str(e), type(e).__name__)
+            return None
+        return title, coord, props, self._parent_title(filepath)
+
+    def update_feature(self, filepath, title, coord, props, parent=None):
+        """
+        Add the feature of the image at `filepath` to collection `title`,
+        replacing the feature added for it before.
+
+        The collection is saved by `save_collections`.
+        """
+        self._geojson_parser.add_feature(title, *coord, props, parent, key=filepath)
+
+    def remove_feature(self, filepath):
+        """
+        Remove the feature added for the image at `filepath` by `update_feature`.
+
+        Returns
+        -------
+        str or None
+            The title of the collection changed, or None if there was no feature.
+        """
+        title = self._title_and_filename(filepath)[0]
+        return title if self._geojson_parser.remove_feature(title, filepath) else None
+
+    def save_collections(self, titles):
+        """
+        Save the collections `titles`, deleting those left empty, and their rollups.
+
+        Parameters
+        ----------
+        titles : iterable of str
+            The titles of the collections changed by `update_feature` or `remove_feature`.
+        """
+        titles = sorted(set(titles))
+        for title in titles:
+            if title in self._geojson_parser:
+                self._save_collection(title)
+            else:
+                self._remove_collection(title)
+        if self._rollups and titles:
+            self._save_rollups(titles)
+
+    def close(self):
+        """Close the errors file, once no more images are processed by `process_image`."""
+        self._errors.close()
+
+    def _process_files(self, images=None):
+        # Process image files, or (name, bytes or file-like) images, concurrently
+        manifest = None
+        if images is None:
+            images = [(filepath, None) for filepath in self.image_filepaths()]
+            if self._sync:
+                manifest, images, unchanged, changed_titles = self._plan_sync([filepath for filepath, _ in images])
+        elif self._layout == TREE_LAYOUT:
+            # Names of uploads and object keys title their collections, so must not lead outside `output_directory`
+            outside = {filepath for filepath, _ in images if ImageToGeoJSON._is_outside(self._title_and_filename(filepath)[0])}
+            for filepath in sorted(outside):
                 self._total_count += 1
-                try:
-                    folder, coord, props = future.result()
-                except Exception as e:
-                    self._add_file_to_errors_with_exception_string(filepath, str(e))
+                exception_string = f'ValueError: Invalid image name {filepath}, Expecting a relative path without {os.pardir}'
+                self._add_file_to_errors_with_exception_string(filepath, exception_string, ValueError.__name__)
+            images = [image for image in images if image[0] not in outside]
+        filepaths = [filepath for filepath, _ in images]
+
+        # Count files per folder, so each collection can be saved once complete
+        pending_counts = collections.Counter(
+            self._title_and_filename(filepath)[0] for filepath in filepaths
+        )
+        write_slots = threading.BoundedSemaphore(MAX_PENDING_WRITES)
+        write_futures = []
+
+        with contextlib.ExitStack() as stack:
+            exporters = [
+                stack.enter_context(get_exporter(export_format, self.output_directory))
+                for export_format in self._export_formats
+            ]
+            writer = stack.enter_context(concurrent.futures.ThreadPoolExecutor(max_workers=WRITE_WORKERS))
+            if manifest is not None:
+                stack.callback(manifest.save)
+                self._add_unchanged_features(manifest, unchanged, changed_titles, exporters)
+                if self._save_images:
+                    # Images are read in full to save them, hash them as they are read
+                    self._file_hashes = {}
+            for filepath, result, error in self._iter_processed(images):
+                self._total_count += 1
+                if error is not None:
+                    self._add_file_to_errors_with_exception_string(filepath, str(error), type(error).__name__)
+                    if isinstance(error, DeadlineExceeded):
+                        self._quarantined.append(filepath)
+                    if manifest is not None:
+                        file_hash = self._pop_file_hash(filepath)
+                        manifest.remove([filepath])
+                        if isinstance(error, SYNC_ERRORS):
+                            manifest.record_error(filepath, type(error).__name__, str(error), file_hash)
                 else:
-                    parent = ImageToGeoJSON._parent_folder_from_filepath(filepath)
+                    folder, coord, props = result
+                    parent = self._parent_title(filepath)
                     self._geojson_parser.add_feature(folder, *coord, props, parent)
+                    for exporter in exporters:
+                        exporter.add_feature(folder, *coord, props, parent)
+                    if manifest is not None:
+                        manifest.record(filepath, folder, coord, props, parent, self._pop_file_hash(filepath))
                     self._success_count += 1
 
-        # Save geojson
-        for title, feature_collection in self._geojson_parser:
-            geojson_file_path = os.path.join(self._geojson_dir_path, f'{title}.geojson')
-            with open(geojson_file_path, 'w') as f:
-                json.dump(feature_collection, f, indent=4)
+                # Save geojson
+                title = self._title_and_filename(filepath)[0]
+                pending_counts[title] -= 1
+                if pending_counts[title] == 0 and title in self._geojson_parser:
+                    write_slots.acquire()
+                    write_future = writer.submit(self._save_collection, title)
+                    write_future.add_done_callback(lambda f: write_slots.release())
+                    write_futures.append(write_future)
+
+            if manifest is not None:
+                # Collections changed only by removed images, or left empty
+                for title in sorted(changed_titles):
+                    if title not in self._geojson_parser:
+                        self._remove_collection(title)
+                    elif title not in pending_counts:
+                        write_futures.append(writer.submit(self._save_collection, title))
+
+            if self._rollups:
+                rollup_titles = set(pending_counts).union(changed_titles if manifest is not None else ())
+                write_futures.append(writer.submit(self._save_rollups, rollup_titles))
+
+            for write_future in write_futures:
+                write_future.result()
+
+    def _plan_sync(self, filepaths):
+        """
+        Load the manifest, split `filepaths` into the images to process and
+        those unchanged, and remove the images gone.
+
+        Returns
+        -------
+        (manifest, images, unchanged, changed_titles) : tuple of Manifest, list, list, set
+            The manifest, the (filepath, None) images to process, the paths
+            of the unchanged images, and the titles of the collections to save.
+        """
+        options = {
+            'save_images': self._save_images,
+            'save_thumbnails': self._save_thumbnails,
+            'properties': list(self._plan.properties) if self._plan else [],
+            'xmp': self._xmp,
+            'tile_zoom': self._tile_zoom,
+            'cluster_zooms': list(self._cluster_zooms) if self._cluster_zooms else [],
+            'layout': self._layout,
+            'rollups': self._rollups,
+        }
+        manifest = Manifest(os.path.join(self._output_directory, MANIFEST_FILENAME),
+                            options=options, hash_files=self._save_images)
+        removed = manifest.orphans(filepaths)
+        changed, unchanged = manifest.plan(filepaths)
+        manifest.remove(removed)
+
+        title = lambda filepath: self._title_and_filename(filepath)[0]
+        changed_titles = {title(filepath) for filepath in [*changed, *removed]}
+        # Collections of unchanged images are saved again if their file is missing
+        changed_titles.update(title(filepath) for filepath in unchanged
+                              if not os.path.exists(self._geojson_file_path(title(filepath))))
+        self._unchanged_count = len(unchanged)
+        self._removed_count = len(removed)
+        log.info(f'Sync: {len(changed)} new or changed, {len(unchanged)} unchanged, {len(removed)} removed')
+        return manifest, [(filepath, None) for filepath in changed], unchanged, changed_titles
+
+    def _add_unchanged_features(self, manifest, unchanged, changed_titles, exporters):
+        # Add the recorded features of `unchanged` images to the collections to save, or to all for
+        # rollups, and to every export
+        for filepath in unchanged:
+            feature = manifest.feature(filepath)
+            if feature is None:
+                error_class, exception_string = manifest.error(filepath)
+                self._add_file_to_errors_with_exception_string(filepath, exception_string, error_class)
+                continue
+            folder, coord, props, parent = feature
+            if folder in changed_titles or self._rollups:
+                self._geojson_parser.add_feature(folder, *coord, props, parent)
+            for exporter in exporters:
+                exporter.add_feature(folder, *coord, props, parent)
+
+    def _remove_collection(self, title):
+        # Delete the geojson file, tiles and clusters of a collection, but not those of the
+        # collections below it in 'tree' layout, saved in its folders
+        tiles_path = os.path.join(self._tiles_dir_path, title)
+        paths = [self._geojson_file_path(title), os.path.join(tiles_path, TILE_INDEX_FILENAME), *self._saved_tiles(title)]
+        clusters_path = os.path.join(self._clusters_dir_path, title)
+        paths.extend(os.path.join(clusters_path, f'{zoom}.geojson') for zoom in self._cluster_zooms or ())
+        self._remove_files(paths)
+
+    def _saved_tiles(self, title):
+        """list of str: Return the paths of the tiles of collection `title` listed in its saved index."""
+        tiles_path = os.path.join(self._tiles_dir_path, title)
+        try:
+            with open(os.path.join(tiles_path, TILE_INDEX_FILENAME), 'r') as f:
+                return [os.path.join(tiles_path, tile['path']) for tile in json.load(f)['tiles']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def _remove_files(self, paths):
+        # Delete `paths`, and the directories left empty up to the geojson, tiles or clusters directory
+        roots = {os.path.normpath(path) for path in (self._geojson_dir_path, self._tiles_dir_path, self._clusters_dir_path)}
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            directory = os.path.normpath(os.path.dirname(path))
+            while directory not in roots:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    def _iter_processed(self, images):
+        # Yield (filepath, (folder, coord, props), None) as each image is processed, or (filepath, None, exception)
+        if self._schedule == LOCALITY_SCHEDULE:
+            images = locality_order(images)
+        batched = self._schedule == LOCALITY_SCHEDULE or self._chunk_size
+        if self._prefetch and not batched:
+            self._prefetcher = self._create_prefetcher(images)
+
+        if self._concurrency == AUTO_CONCURRENCY:
+            futures = self._iter_processed_autotuned(images)
+        elif self._file_timeout is not None or self._run_timeout is not None:
+            futures = self._iter_processed_with_deadlines(images)
+        elif batched:
+            batches = folder_batches(images) if self._schedule == LOCALITY_SCHEDULE else [images]
+            if self._chunk_size:
+                batches = [chunk for batch in batches for chunk in chunks(batch, self._chunk_size)]
+            yield from self._iter_processed_batches(batches)
+            return
+        else:
+            futures = self._iter_processed_futures(images)
+
+        try:
+            for filepath, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield filepath, None, e
+                else:
+                    yield filepath, result, None
+        finally:
+            self._prefetcher = None
 
-    def _process_image_file(self, filepath):
+    def _create_prefetcher(self, images):
+        """Prefetcher: Return a prefetcher of the files of `images`, in order."""
+        size = 0 if self._save_images else self._read_size
+        return Prefetcher([filepath for filepath, source in images if source is None], self._prefetch, size)
+
+    def _iter_processed_futures(self, images):
+        # Yield (filepath, future) as each image is processed, one task per image
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            future_to_path = {executor.submit(self._process_image_file, filepath, source): filepath for filepath, source in images}
+            for future in concurrent.futures.as_completed(future_to_path):
+                yield future_to_path[future], future
+
+    def _iter_processed_batches(self, batches):
+        # Process each batch of images in order on one worker, as one task
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            futures = [executor.submit(self._process_batch, batch) for batch in batches]
+            for future in concurrent.futures.as_completed(futures):
+                batch_result = future.result()
+                coords = batch_result.coords
+                for index, (filepath, props) in enumerate(zip(batch_result.filepaths, batch_result.props)):
+                    folder = self._title_and_filename(filepath)[0]
+                    yield filepath, (folder, (coords[2 * index], coords[2 * index + 1]), props), None
+                for filepath, error in batch_result.errors:
+                    yield filepath, None, error
+
+    def _process_batch(self, batch):
+        # Process `batch` of (filepath, source) in order, returning one BatchResult
+        batch_result = BatchResult([], array.array('d'), [], [])
+        prefetcher = self._create_prefetcher(batch) if self._prefetch else None
+        for filepath, source in batch:
+            if prefetcher is not None and source is None:
+                prefetcher.advance()
+            try:
+                folder, coord, props = self._process_image_file(filepath, source)
+            except Exception as e:
+                batch_result.errors.append((filepath, e))
+            else:
+                batch_result.filepaths.append(filepath)
+                batch_result.coords.extend(coord)
+                batch_result.props.append(props)
+        return batch_result
+
+    def _iter_processed_with_deadlines(self, images):
+        # Submit a window of images at a time, abandoning those past their deadline
+        deadlines = Deadlines(self._file_timeout, self._run_timeout)
+        pool = WorkerPool(max_workers=self._concurrency)
+        window = 2 * (self._concurrency or DEFAULT_WORKERS)
+        queue = collections.deque(images)
+        running = {}
+        try:
+            while queue or running:
+                while queue and len(running) < window:
+                    filepath, source = queue.popleft()
+                    future = pool.submit(deadlines.run, filepath, self._process_image_file, filepath, source)
+                    running[future] = (filepath, time.monotonic())
+                done, _ = concurrent.futures.wait(running, timeout=deadlines.timeout(),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    filepath, _ = running.pop(future)
+                    deadlines.discard(filepath)
+                    yield filepath, future
+
+                expired = deadlines.expired([filepath for filepath, _ in running.values()],
+                                            (filepath for filepath, _ in queue))
+                if expired:
+                    errors = dict(expired)
+                    ImageToGeoJSON._drop_expired(errors, running, queue, pool)
+                    for filepath, error in expired:
+                        yield filepath, failed_future(error)
+        finally:
+            # Abandon workers stuck past their deadline rather than wait for them
+            pool.shutdown(wait=not deadlines.expired_any)
+
+    def _iter_processed_autotuned(self, images):
+        # Read and parse in separate pools, each with its in-flight limit tuned by AIMD
+        deadlines = Deadlines(self._file_timeout, self._run_timeout)
+        read_control = AIMDController(initial=4, maximum=MAX_READERS)
+        parse_control = AIMDController(initial=2, maximum=MAX_PARSERS)
+        queue = collections.deque(images)
+        read = collections.deque()
+        reading = {}
+        parsing = {}
+        readers = WorkerPool(max_workers=MAX_READERS)
+        parsers = WorkerPool(max_workers=MAX_PARSERS)
         try:
-            coord, props, image_b, thumb_b = read_exif(filepath, 
-                                                       get_image=self._save_images, 
-                                                       get_thumbnail=self._save_thumbnails)
+            while queue or read or reading or parsing:
+                # Read ahead up to a multiple of the reader limit, bounding memory while parsers catch up
+                read_ahead = READ_AHEAD_FACTOR * read_control.limit
+                while queue and len(reading) < read_control.limit and len(reading) + len(read) < read_ahead:
+                    filepath, source = queue.popleft()
+                    future = readers.submit(deadlines.run, filepath, self._read_image, filepath, source)
+                    reading[future] = (filepath, time.monotonic())
+                while read and len(parsing) < parse_control.limit:
+                    filepath, image_b = read.popleft()
+                    future = parsers.submit(deadlines.run, filepath, self._parse_image, filepath, image_b)
+                    parsing[future] = (filepath, time.monotonic())
+
+                done, _ = concurrent.futures.wait([*reading, *parsing], timeout=deadlines.timeout(),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                now = time.monotonic()
+                for future in done:
+                    if future in reading:
+                        filepath, start = reading.pop(future)
+                        read_control.record(now - start)
+                        if future.exception() is not None:
+                            deadlines.discard(filepath)
+                            yield filepath, future
+                        else:
+                            read.append((filepath, future.result()))
+                    else:
+                        filepath, start = parsing.pop(future)
+                        parse_control.record(now - start)
+                        deadlines.discard(filepath)
+                        yield filepath, future
+
+                # Images read and waiting to be parsed are still on the clock
+                in_flight = [filepath for filepath, _ in [*reading.values(), *parsing.values()]]
+                expired = deadlines.expired([*in_flight, *(filepath for filepath, _ in read)],
+                                            (filepath for filepath, _ in queue))
+                if expired:
+                    errors = dict(expired)
+                    ImageToGeoJSON._drop_expired(errors, reading, queue, readers)
+                    ImageToGeoJSON._drop_expired(errors, parsing, read, parsers)
+                    for filepath, error in expired:
+                        yield filepath, failed_future(error)
+        finally:
+            readers.shutdown(wait=not deadlines.expired_any)
+            parsers.shutdown(wait=not deadlines.expired_any)
+
+        log.info(f'Autotuned concurrency: {read_control.limit} readers, {parse_control.limit} parsers')
+
+    @staticmethod
+    def _drop_expired(errors, running, waiting, pool):
+        """
+        Drop the images of `errors` from `running`, future: (filepath, start),
+        and from `waiting`, a deque of (filepath, ...). Replace `pool` if any
+        was still being processed, so its stuck worker costs no capacity.
+        """
+        stuck = False
+        for future, (filepath, _) in list(running.items()):
+            if filepath in errors:
+                del running[future]
+                if not future.cancel() and not future.done():
+                    stuck = True
+        if any(filepath in errors for filepath, *_ in waiting):
+            kept = [item for item in waiting if item[0] not in errors]
+            waiting.clear()
+            waiting.extend(kept)
+        if stuck:
+            for old_future, new_future in pool.replace().items():
+                running[new_future] = running.pop(old_future)
+
+    def image_filepaths(self):
+        """list of str: Return the sorted paths of the images in `input_directory`, at every depth for 'tree'."""
+        # Files are read by their magic bytes, the extension only selects them
+        if self._layout == TREE_LAYOUT:
+            filepaths = glob.iglob(os.path.join(self.input_directory, '**', '*.*'), recursive=True)
+        else:
+            filepaths = glob.iglob(f'{self.input_directory}**/*.*')
+        return sorted(filepath for filepath in filepaths
+                      if os.path.splitext(filepath)[1].lower() in IMAGE_EXTENSIONS)
+
+    def is_image_path(self, filepath):
+        """bool: Return True if `filepath` is one of the `image_filepaths`, whether or not it exists."""
+        if os.path.splitext(filepath)[1].lower() not in IMAGE_EXTENSIONS:
+            return False
+        parts = os.path.relpath(filepath, self.input_directory).split(os.sep)
+        # Hidden files and folders are not matched, as by `glob`
+        if any(part.startswith('.') for part in parts):
+            return False
+        return self._layout == TREE_LAYOUT or len(parts) == 2
+
+    def _save_collection(self, title):
+        # Save a FeatureCollection with its tiles and clusters
+        feature_collection = self._geojson_parser.feature_collection(title)
+        geojson_file_path = self._geojson_file_path(title)
+        if self._layout == TREE_LAYOUT:
+            os.makedirs(os.path.dirname(geojson_file_path), exist_ok=True)
+        self._serializer.dump(feature_collection, geojson_file_path)
+
+        if self._tile_zoom is not None:
+            self._save_tiles(title, feature_collection)
+
+        if self._cluster_zooms:
+            self._save_clusters(title)
+
+    def _save_rollups(self, titles):
+        # Save the rollup of each folder above `titles`, or delete it once no collection is below it
+        rollup_titles = sorted({ancestor for title in titles for ancestor in ImageToGeoJSON._ancestor_titles(title)})
+        collection_titles = self._geojson_parser.titles
+        for rollup_title in rollup_titles:
+            rollup_file_path = self._rollup_file_path(rollup_title)
+            prefix = rollup_title + os.sep
+            below = [title for title in collection_titles if title == rollup_title or title.startswith(prefix)]
+            if not any(title != rollup_title for title in below):
+                if os.path.exists(rollup_file_path):
+                    os.remove(rollup_file_path)
+                continue
+            parent = os.path.dirname(rollup_title) or None
+            rollup_collection = self._geojson_parser.rollup_collection(rollup_title, sorted(below), parent)
+            os.makedirs(os.path.dirname(rollup_file_path), exist_ok=True)
+            self._serializer.dump(rollup_collection, rollup_file_path)
+
+    def _save_clusters(self, title):
+        # Save a FeatureCollection of clusters per zoom level
+        clusters_path = os.path.join(self._clusters_dir_path, title)
+        os.makedirs(clusters_path, exist_ok=True)
+        for zoom, cluster_collection in self._geojson_parser.iter_clusters(title):
+            cluster_file_path = os.path.join(clusters_path, f'{zoom}.geojson')
+            self._serializer.dump(cluster_collection, cluster_file_path)
+
+    def _save_tiles(self, title, feature_collection):
+        # Save z/x/y tiles and an index manifest of the tiles, deleting the tiles saved before left empty
+        tiles_path = os.path.join(self._tiles_dir_path, title)
+        saved_tiles = self._saved_tiles(title)
+        tiles = []
+        for (z, x, y), tile_collection in self._geojson_parser.iter_tiles(title):
+            rel_tile_path = os.path.join(str(z), str(x), f'{y}.geojson')
+            tile_path = os.path.join(tiles_path, rel_tile_path)
+            os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+            self._serializer.dump(tile_collection, tile_path)
+            tiles.append({
+                'tile': [z, x, y],
+                'path': rel_tile_path,
+                'count': len(tile_collection['features']),
+                'bbox': tile_bbox(z, x, y),
+            })
+
+        index = {
+            'title': title,
+            'zoom': self._tile_zoom,
+            'count': len(feature_collection['features']),
+            'bbox': feature_collection['bbox'],
+            'tiles': tiles,
+        }
+        self._serializer.dump(index, os.path.join(tiles_path, TILE_INDEX_FILENAME))
+        tile_paths = {os.path.join(tiles_path, tile['path']) for tile in tiles}
+        self._remove_files([path for path in saved_tiles if path not in tile_paths])
+
+    def _process_image_file(self, filepath, source=None):
+        # Read from `source` bytes or file-like if given, else from `filepath`
+        if source is None and self._file_hashes is not None:
+            return self._parse_image(filepath, self._read_image(filepath))
+        if source is None:
+            reader, source = read_exif, filepath
+            self._advance_prefetcher()
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            reader = read_exif_bytes
+        else:
+            reader = read_exif_stream
+        try:
+            coord, props, image_b, thumb_b = reader(source, 
+                                                    get_image=self._save_images, 
+                                                    get_thumbnail=self._save_thumbnails,
+                                                    properties=self._plan,
+                                                    **self._read_args(reader))
         except Exception as e:
             raise e
         else:
-            folder, filename = ImageToGeoJSON._folder_and_filename_from_filepath(filepath)
-            props['filename'] = filename
+            return self._image_feature(filepath, coord, props, image_b, thumb_b)
+
+    def _read_image(self, filepath, source=None):
+        # I/O stage: return the bytes of the image needed to parse it, rejecting those without GPS
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            try:
+                prefilter(source)
+            except (KeyError, AttributeError) as e:
+                return self._read_xmp(e, filepath, source)
+            return source
+        if source is None:
+            self._advance_prefetcher()
+            try:
+                with open(filepath, 'rb') as image_file:
+                    image_b = _read_file_bytes(image_file, self._save_images, self._read_size, drop_cache=self._prefetch > 0)
+            except (KeyError, AttributeError) as e:
+                return self._read_xmp(e, filepath)
+            if self._file_hashes is not None and isinstance(image_b, bytes):
+                self._file_hashes[filepath] = data_digest(image_b)
+            return image_b
+        return _read_image_bytes(source, self._save_images, self._read_size)
+
+    def _pop_file_hash(self, filepath):
+        # Return the hash of `filepath` taken as it was read, or None
+        return None if self._file_hashes is None else self._file_hashes.pop(filepath, None)
 
-            # image 
-            if self._save_images and image_b is not None:
-                rel_image_path = self._rel_image_path(filename)
-                image_path = os.path.join(self.output_directory, rel_image_path)            
+    def _read_xmp(self, error, filepath, image_b=None):
+        # Return the result read from XMP if enabled, else raise `error`
+        if not self._xmp:
+            raise error
+        return read_xmp(error, filepath=filepath, image_b=image_b)
+
+    def _read_args(self, reader):
+        """dict: Return the read size, cache and XMP arguments for `reader`."""
+        if reader is read_exif:
+            return {'read_size': self._read_size, 'drop_cache': self._prefetch > 0, 'xmp': self._xmp}
+        if reader is read_exif_stream:
+            return {'read_size': self._read_size}
+        return {'xmp': self._xmp}
+
+    def _advance_prefetcher(self):
+        # Advise the next queued file, as one more is read
+        prefetcher = self._prefetcher
+        if prefetcher is not None:
+            prefetcher.advance()
+
+    def _parse_image(self, filepath, image_b):
+        # CPU stage: parse the bytes from `_read_image`, or take the result it read from XMP
+        if isinstance(image_b, tuple):
+            return self._image_feature(filepath, *image_b)
+        try:
+            coord, props, image_b, thumb_b = _parse_exif_bytes(image_b,
+                                                               get_image=self._save_images,
+                                                               get_thumbnail=self._save_thumbnails,
+                                                               properties=self._plan)
+        except (KeyError, AttributeError) as e:
+            coord, props, image_b, thumb_b = self._read_xmp(e, filepath, image_b)
+        return self._image_feature(filepath, coord, props, image_b, thumb_b)
 
-                with open(image_path, 'wb') as im:
-                    im.write(image_b)
-                    props["rel_image_path"] = rel_image_path
+    def _image_feature(self, filepath, coord, props, image_b, thumb_b):
+        # Save the image and thumbnail, return the folder, coord and props
+        folder, filename = self._title_and_filename(filepath)
+        props['filename'] = filename
 
-            # thumbnail 
-            if self._save_thumbnails and thumb_b is not None:
-                rel_thumbnail_path = self._rel_thumbnail_path(filename)
-                thumbnail_path = os.path.join(self.output_directory, rel_thumbnail_path)
+        # image 
+        if self._save_images and image_b is not None:
+            rel_image_path = self._rel_image_path(filename, folder)
+            image_path = os.path.join(self.output_directory, rel_image_path)            
+            if self._layout == TREE_LAYOUT:
+                os.makedirs(os.path.dirname(image_path), exist_ok=True)
 
-                with open(thumbnail_path, 'wb') as im:
-                    im.write(thumb_b)
-                    props["rel_thumbnail_path"] = rel_thumbnail_path
+            with open(image_path, 'wb') as im:
+                im.write(image_b)
+                props["rel_image_path"] = rel_image_path
 
-            return folder, coord, props
+        # thumbnail 
+        if self._save_thumbnails and thumb_b is not None:
+            rel_thumbnail_path = self._rel_thumbnail_path(filename, folder)
+            thumbnail_path = os.path.join(self.output_directory, rel_thumbnail_path)
+            if self._layout == TREE_LAYOUT:
+                os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+
+            with open(thumbnail_path, 'wb') as im:
+                im.write(thumb_b)
+                props["rel_thumbnail_path"] = rel_thumbnail_path
+
+        return folder, coord, props
         
-    def _add_file_to_errors_with_exception_string(self, filepath, exception_string):
-        folder, filename = ImageToGeoJSON._folder_and_filename_from_filepath(filepath)
+    def _add_file_to_errors_with_exception_string(self, filepath, exception_string, error_class='Error'):
+        folder, filename = self._title_and_filename(filepath)
         key = os.path.join(folder, filename)
-        self._error_dictionary[key] = exception_string
+        self._errors.add(key, exception_string, error_class)
 
     def _output_parent_folder(self):
         """str: Return the output parent folder name."""
@@ -185,19 +974,77 @@ class ImageToGeoJSON(object):
         """str: Return the path to the geojson directory."""
         return os.path.join(self.output_directory, GEOJSON_DIR)
     
+    def _geojson_file_path(self, title):
+        """str: Return the path to the geojson file of a collection."""
+        return os.path.join(self._geojson_dir_path, f'{title}.geojson')
+
+    @property
+    def _rollups_dir_path(self):
+        """str: Return the path to the rollups directory."""
+        return os.path.join(self.output_directory, ROLLUPS_DIR)
+
+    def _rollup_file_path(self, title):
+        """str: Return the path to the geojson file of the rollup of a folder."""
+        return os.path.join(self._rollups_dir_path, f'{title}.geojson')
+
+    @property
+    def _tiles_dir_path(self):
+        """str: Return the path to the tiles directory."""
+        return os.path.join(self.output_directory, TILES_DIR)
+
+    @property
+    def _clusters_dir_path(self):
+        """str: Return the path to the clusters directory."""
+        return os.path.join(self.output_directory, CLUSTERS_DIR)
+
     @property
     def _image_dir_path(self):
         """str: Return the path to the image directory."""
         return os.path.join(self.output_directory, IMAGE_DIR)
 
-    def _rel_image_path(self, filename):
-        """str: Return the relative path to the image filename."""
-        return os.path.join(IMAGE_DIR, filename)
+    def _rel_image_path(self, filename, title=None):
+        """str: Return the relative path to the image filename, below its collection `title` for 'tree'."""
+        return os.path.join(IMAGE_DIR, self._image_subdir(title), filename)
     
-    def _rel_thumbnail_path(self, filename):
-        """str: Return the relative path to the thumbnail image filename."""
+    def _rel_thumbnail_path(self, filename, title=None):
+        """str: Return the relative path to the thumbnail image filename, below its collection `title` for 'tree'."""
         thumb_file_name = ImageToGeoJSON._thumbnail_filename(filename)
-        return os.path.join(IMAGE_DIR, thumb_file_name)
+        return os.path.join(IMAGE_DIR, self._image_subdir(title), thumb_file_name)
+
+    def _image_subdir(self, title):
+        """str: Return the folder of the images of collection `title` within the image directory."""
+        if self._layout == TREE_LAYOUT and title:
+            return title
+        return ''
+
+    def _title_and_filename(self, filepath):
+        """tuple of str: Return the collection title and filename of the image at `filepath`, as `layout`."""
+        if self._layout == FOLDER_LAYOUT:
+            return ImageToGeoJSON._folder_and_filename_from_filepath(filepath)
+        head, filename = os.path.split(filepath)
+        title = os.path.relpath(head, self._tree_root) if self._tree_root else os.path.normpath(head or os.curdir)
+        if title == os.curdir:
+            # Images directly in the root keep their folder name
+            return ImageToGeoJSON._folder_and_filename_from_filepath(filepath)
+        return title, filename
+
+    def _parent_title(self, filepath):
+        """str: Return the parent of the collection of the image at `filepath`, as `layout`."""
+        title = self._title_and_filename(filepath)[0]
+        if self._layout == TREE_LAYOUT and os.sep in title:
+            return os.path.dirname(title)
+        return ImageToGeoJSON._parent_folder_from_filepath(filepath)
+
+    @staticmethod
+    def _is_outside(title):
+        """bool: Return True if the files of collection `title` would be saved outside their folders."""
+        return os.path.isabs(title) or os.pardir in title.split(os.sep)
+
+    @staticmethod
+    def _ancestor_titles(title):
+        """list of str: Return the titles of the folders above collection `title`, outermost first."""
+        parts = title.split(os.sep)
+        return [os.sep.join(parts[:index]) for index in range(1, len(parts))]
 
     @staticmethod
     def _folder_and_filename_from_filepath(filepath):
@@ -216,6 +1063,8 @@ class ImageToGeoJSON(object):
     
     @staticmethod
     def _thumbnail_filename(image_filename):
-        """str: Split the image filename and return the thumbnail filename."""
-        f_name, f_type  = image_filename.split('.')
-        return f_name + '_thumb.' + f_type
\ No newline at end of file
+        """str: Split the image filename and return the thumbnail filename, a JPEG for every format."""
+        f_name, f_type  = os.path.splitext(image_filename)
+        if f_type.lower() not in JPEG_EXTENSIONS:
+            f_type += '.jpg'
+        return f_name + '_thumb' + f_type
\ No newline at end of file
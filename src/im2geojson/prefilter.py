@@ -0,0 +1,102 @@
+"""
+Reject images without GPS metadata from the first few KB of the file.
+
+In most archives the majority of images have no GPS metadata at all. Finding
+that out with `exif.Image` costs a full parse, then an exception per image.
+`check` walks only the JPEG segment headers, the IFD0 table and the GPS IFD
+table, usually all within the first `PREFILTER_SIZE` bytes, and returns the
+error for an image that cannot be geotagged without raising anything.
+
+Images the start of which is inconclusive, such as those that are not JPEGs,
+have malformed metadata or metadata beyond the bytes given, are passed on to
+the full parser.
+"""
+from .ifd_reader import (TiffReader, IFDError, iter_segments, is_exif_segment,
+                         JPEG_SOS, GPS_IFD_POINTER)
+
+PREFILTER_SIZE = 4096
+
+NO_EXIF = 'no_exif'
+NO_GPS = 'no_gps'
+
+# GPS tags read for the coordinate, in the order of `exif_reader`
+GPS_TAGS = (
+    (0x0002, 'gps_latitude'),
+    (0x0001, 'gps_latitude_ref'),
+    (0x0004, 'gps_longitude'),
+    (0x0003, 'gps_longitude_ref'),
+)
+
+
+class RejectedImageError(Exception):
+    """Base for images rejected by the prefilter, `reason` is the category."""
+
+    reason = None
+
+
+class NoExifError(RejectedImageError, KeyError):
+    """Raised for JPEG images without EXIF metadata."""
+
+    reason = NO_EXIF
+
+
+class NoGPSError(RejectedImageError, AttributeError):
+    """Raised for images with EXIF metadata but no GPS coordinate."""
+
+    reason = NO_GPS
+
+
+def check(data):
+    """
+    Check the start of an image for EXIF metadata with a GPS coordinate.
+
+    Parameters
+    ----------
+    data : bytes-like
+        The start of the image file.
+
+    Returns
+    -------
+    RejectedImageError or None
+        The error to raise if the image can be rejected, else None.
+    """
+    for marker, offset, length in iter_segments(data):
+        if marker == JPEG_SOS:
+            return NoExifError('KeyError: No metadata.')
+        if is_exif_segment(data, marker, offset):
+            return _check_gps(data, offset + 10, offset + 2 + length)
+    return None
+
+def prefilter(data):
+    """
+    Raise the error from `check` for `data`, if any.
+
+    Raises
+    ------
+    NoExifError
+        If `data` is a JPEG without EXIF metadata, a `KeyError`.
+    NoGPSError
+        If `data` has EXIF metadata without a GPS coordinate, an `AttributeError`.
+    """
+    error = check(data)
+    if error is not None:
+        raise error
+
+def _check_gps(data, start, end):
+    # Return NoGPSError for the first missing coordinate tag, or None if inconclusive
+    try:
+        reader = TiffReader(data, start, end)
+        pointer = reader.entries(reader.ifd0_offset, {GPS_IFD_POINTER}).get(GPS_IFD_POINTER)
+        if pointer is None:
+            return _no_gps_error(GPS_TAGS[0][1])
+        gps_offset, = reader.value(pointer)
+        gps_entries = reader.entries(gps_offset, {tag for tag, _ in GPS_TAGS})
+    except (IFDError, ValueError):
+        return None
+    for tag, attribute in GPS_TAGS:
+        if tag not in gps_entries:
+            return _no_gps_error(attribute)
+    return None
+
+def _no_gps_error(attribute):
+    return NoGPSError(f'AttributeError: image does not have attribute {attribute}')
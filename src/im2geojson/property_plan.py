@@ -0,0 +1,186 @@
+"""
+Extract optional image properties from EXIF metadata.
+
+Properties are chosen by name and compiled once into an `ExtractionPlan`,
+which knows exactly which tags of which IFDs it needs. Each image then
+costs a scan of those IFD tables and the decoding of the chosen tags only;
+sub-IFDs no chosen property needs are never visited.
+"""
+import collections
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from .ifd_reader import (TiffReader, IFDError, find_exif_segment,
+                         IFD0, EXIF_IFD, GPS_IFD, SUB_IFD_POINTERS)
+
+PLACES = 6
+
+# A property's tags, all in one IFD, and the function converting their
+# values (None when a tag is missing) to the property value or None
+PropertySpec = collections.namedtuple('PropertySpec', ['ifd', 'tags', 'convert'])
+
+
+def _text(value):
+    """str or None: Return stripped ASCII `value`, or None if empty."""
+    return (value.strip() or None) if isinstance(value, str) else None
+
+def _integer(value):
+    """int or None: Return the first number of `value`."""
+    return int(value[0]) if isinstance(value, (tuple, bytes)) and value else None
+
+def _rational(value):
+    """float or None: Return the first rational of `value` as a float."""
+    if not isinstance(value, tuple) or not value:
+        return None
+    numerator, denominator = value[0]
+    return round(numerator / denominator, PLACES)
+
+def _altitude(altitude, altitude_ref):
+    """float or None: Return the altitude in metres, negative below sea level."""
+    metres = _rational(altitude)
+    if metres is not None and _integer(altitude_ref) == 1:
+        metres = -metres
+    return metres
+
+def _gps_timestamp(datestamp, timestamp):
+    """str or None: Return the GPS date and time, in UTC, as ISO 8601."""
+    if not isinstance(datestamp, str) or not isinstance(timestamp, tuple) or len(timestamp) != 3:
+        return None
+    hours, minutes, seconds = (numerator / denominator for numerator, denominator in timestamp)
+    microsecond = round((seconds % 1) * 1000000)
+    year, month, day = datestamp.split(':')
+    gps_datetime = datetime(int(year), int(month), int(day), int(hours), int(minutes), int(seconds),
+                            min(microsecond, 999999), tzinfo=timezone.utc)
+    return gps_datetime.isoformat()
+
+
+PROPERTIES = {
+    'altitude': PropertySpec(GPS_IFD, (0x0006, 0x0005), _altitude),
+    'direction': PropertySpec(GPS_IFD, (0x0011,), _rational),
+    'gps_timestamp': PropertySpec(GPS_IFD, (0x001D, 0x0007), _gps_timestamp),
+    'make': PropertySpec(IFD0, (0x010F,), _text),
+    'model': PropertySpec(IFD0, (0x0110,), _text),
+    'orientation': PropertySpec(IFD0, (0x0112,), _integer),
+    'focal_length': PropertySpec(EXIF_IFD, (0x920A,), _rational),
+    'iso': PropertySpec(EXIF_IFD, (0x8827,), _integer),
+    'lens_model': PropertySpec(EXIF_IFD, (0xA434,), _text),
+}
+
+
+class ExtractionPlan(object):
+    """
+    Create an ExtractionPlan object.
+
+    The tags to read from each IFD for a list of properties, compiled once
+    and applied to each image with `extract`.
+    """
+
+    def __init__(self, properties):
+        """
+        Initialise ExtractionPlan object.
+
+        Parameters
+        ----------
+        properties : list of str
+            The property names, keys of `PROPERTIES`.
+
+        Raises
+        ------
+        ValueError
+            If a property is unknown.
+        """
+        for name in properties:
+            if name not in PROPERTIES:
+                raise ValueError(f'ValueError: Invalid property {name}, Expecting one of {", ".join(PROPERTIES)}')
+        self._properties = tuple(dict.fromkeys(properties))
+        self._specs = [(name, PROPERTIES[name]) for name in self._properties]
+
+        self._ifd_tags = {}
+        for name, spec in self._specs:
+            self._ifd_tags.setdefault(spec.ifd, set()).update(spec.tags)
+        self._sub_ifds = [ifd for ifd in (EXIF_IFD, GPS_IFD) if ifd in self._ifd_tags]
+        self._ifd0_tags = self._ifd_tags.get(IFD0, set()) | {SUB_IFD_POINTERS[ifd] for ifd in self._sub_ifds}
+
+    @property
+    def properties(self):
+        """tuple of str: Return the property names."""
+        return self._properties
+
+    def extract(self, image_b):
+        """
+        Extract the properties from the JPEG `image_b`.
+
+        Parameters
+        ----------
+        image_b : bytes-like
+            The image, or its start up to the end of the EXIF metadata.
+
+        Returns
+        -------
+        dict
+            The value of each property found. Missing or malformed values are left out.
+        """
+        if not self._specs:
+            return {}
+        segment = find_exif_segment(image_b)
+        if segment is None:
+            return {}
+        return self.extract_tiff(image_b, *segment)
+
+    def extract_tiff(self, data, start=0, end=None):
+        """
+        Extract the properties from the TIFF metadata at `data[start:end]`.
+
+        Returns
+        -------
+        dict
+            As `extract`.
+        """
+        if not self._specs:
+            return {}
+        try:
+            reader = TiffReader(data, start, end)
+            ifd0 = reader.entries(reader.ifd0_offset, self._ifd0_tags)
+            entries = {IFD0: ifd0}
+            for ifd in self._sub_ifds:
+                pointer = ifd0.get(SUB_IFD_POINTERS[ifd])
+                if pointer is not None:
+                    offset, = reader.value(pointer)
+                    entries[ifd] = reader.entries(offset, self._ifd_tags[ifd])
+        except (IFDError, ValueError, TypeError):
+            return {}
+
+        props = {}
+        for name, spec in self._specs:
+            ifd_entries = entries.get(spec.ifd, {})
+            try:
+                values = [reader.value(ifd_entries[tag]) if tag in ifd_entries else None for tag in spec.tags]
+                value = spec.convert(*values)
+            except (ValueError, TypeError, ZeroDivisionError, OverflowError):
+                value = None
+            if value is not None:
+                props[name] = value
+        return props
+
+
+@lru_cache(maxsize=None)
+def _compile_plan(properties):
+    return ExtractionPlan(properties)
+
+def compile_plan(properties):
+    """
+    Return the `ExtractionPlan` for `properties`, compiled once per list.
+
+    Parameters
+    ----------
+    properties : list of str or ExtractionPlan
+        The property names, or a compiled plan, returned as is.
+
+    Returns
+    -------
+    ExtractionPlan
+        The plan.
+    """
+    if isinstance(properties, ExtractionPlan):
+        return properties
+    return _compile_plan(tuple(properties))
@@ -0,0 +1,60 @@
+"""
+Order and group images so they are read close to where they lie on disk.
+
+Files listed by directory order are scattered across a disk, and submitting
+them all at once scatters the reads further. The locality schedule orders
+images by directory and then by inode number, which most filesystems
+allocate roughly in on-disk order, and groups each folder's images into one
+batch read sequentially by one worker. On spinning disks and some network
+filesystems the near-sequential access reads several times faster, and each
+collection completes, and is written, as one.
+"""
+import os
+import itertools
+
+LISTING_SCHEDULE = 'listing'
+LOCALITY_SCHEDULE = 'locality'
+SCHEDULES = (LISTING_SCHEDULE, LOCALITY_SCHEDULE)
+
+
+def locality_order(images):
+    """
+    Order `images` by directory, then by inode number.
+
+    Parameters
+    ----------
+    images : list of (str, source)
+        The image paths, and their contents or None to read the path.
+
+    Returns
+    -------
+    list of (str, source)
+        The images in locality order. Images in memory, or that cannot be
+        found, sort first in their directory, in their given order.
+    """
+    def key(image):
+        filepath, source = image
+        inode = 0
+        if source is None:
+            try:
+                inode = os.stat(filepath).st_ino
+            except OSError:
+                pass
+        return os.path.dirname(filepath), inode
+
+    return sorted(images, key=key)
+
+def folder_batches(images):
+    """
+    Group consecutive `images` in the same folder into batches.
+
+    Returns
+    -------
+    list of list of (str, source)
+        One batch per run of images in a folder, in order.
+    """
+    return [list(batch) for _, batch in itertools.groupby(images, key=lambda image: os.path.dirname(image[0]))]
+
+def chunks(images, chunk_size):
+    """list of list: Split `images` into consecutive chunks of up to `chunk_size`."""
+    return [images[index:index + chunk_size] for index in range(0, len(images), chunk_size)]
@@ -0,0 +1,127 @@
+"""
+Serialise GeoJSON to file, with the standard library `json` module or orjson.
+
+The default `json` backend writes the same bytes wherever it runs. orjson is
+much faster for large collections but indents by 2 spaces and writes
+non-ASCII characters unescaped, so it is only used when asked for, by
+'orjson' or by 'auto' when it is installed.
+"""
+import json
+import os
+import secrets
+
+try:
+    import orjson
+except ImportError:             # pragma: no cover
+    orjson = None
+
+AUTO_BACKEND = 'auto'
+ORJSON_BACKEND = 'orjson'
+JSON_BACKEND = 'json'
+BACKENDS = (AUTO_BACKEND, ORJSON_BACKEND, JSON_BACKEND)
+
+
+class JSONSerializer(object):
+    """
+    Create a JSONSerializer object.
+
+    Serialises with the standard library `json` module, indented by 4 spaces.
+    """
+
+    name = JSON_BACKEND
+
+    def dumps(self, obj):
+        """bytes: Return `obj` serialised to UTF-8 encoded JSON."""
+        return json.dumps(obj, indent=4).encode('utf-8')
+
+    def dump(self, obj, file_path):
+        """Serialise `obj` to the file at `file_path`, atomically."""
+        write_atomic(file_path, self.dumps(obj))
+
+
+class ORJSONSerializer(JSONSerializer):
+    """
+    Create an ORJSONSerializer object.
+
+    Serialises with `orjson`, indented by 2 spaces, writing bytes directly.
+    Keys are written in the same order as `JSONSerializer`.
+    """
+
+    name = ORJSON_BACKEND
+
+    def dumps(self, obj):
+        """bytes: Return `obj` serialised to UTF-8 encoded JSON."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+
+def write_atomic(file_path, data):
+    """
+    Write `data` to `file_path` atomically.
+
+    Writes to a temporary file in the same directory and renames it over
+    `file_path`, so readers never see a partially written file.
+
+    Parameters
+    ----------
+    file_path : str
+        The path to the file.
+    data : bytes
+        The file contents.
+    """
+    directory, filename = os.path.split(file_path)
+    fd, tmp_path = _create_temporary(directory, filename)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _create_temporary(directory, filename):
+    """
+    tuple of int, str: Create a new temporary file beside `filename`, return its fd and path.
+
+    Created with mode 0o666 less the umask, as `open()`, which the OS applies
+    itself, rather than mkstemp's owner only mode.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        tmp_path = os.path.join(directory or '.', f'.{filename}.{secrets.token_hex(4)}.tmp')
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:         # pragma: no cover
+            continue
+
+def get_serializer(backend=JSON_BACKEND):
+    """
+    Return a serializer for `backend`.
+
+    Parameters
+    ----------
+    backend : {'auto', 'orjson', 'json'}, default 'json'
+        The JSON backend, 'auto' uses orjson when it is installed.
+
+    Returns
+    -------
+    JSONSerializer
+        The serializer.
+
+    Raises
+    ------
+    ValueError
+        If `backend` is unknown.
+    ImportError
+        If `backend` is 'orjson' and orjson is not installed.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'ValueError: Invalid JSON backend {backend}, Expecting one of {", ".join(BACKENDS)}')
+
+    if backend == AUTO_BACKEND:
+        backend = ORJSON_BACKEND if orjson is not None else JSON_BACKEND
+
+    if backend == ORJSON_BACKEND:
+        if orjson is None:
+            raise ImportError('ImportError: orjson is not installed')
+        return ORJSONSerializer()
+    return JSONSerializer()
@@ -0,0 +1,479 @@
+"""
+Serve image metadata parsing over localhost HTTP or a Unix socket.
+
+A long-lived server keeps a warm worker pool and a result cache, so batches
+of images can be submitted without starting Python for each one:
+
+    python -m im2geojson.server --port 8000
+    python -m im2geojson.server --socket /tmp/im2geojson.sock
+
+Endpoints
+---------
+`GET /health`
+    Returns `{"status": "ok"}`.
+
+`POST /features`
+    Body `{"paths": ["<path-to-image>", ...]}`, up to 10000 paths. Returns
+    `{"features": [Feature, ...], "errors": {"<path>": "<error>", ...}}`.
+
+`POST /image?name=<filename>`
+    Body is the raw image bytes. Returns `{"features": [...], "errors": {...}}`
+    for the single image.
+
+When all request slots are busy the server replies `503` with `Retry-After`,
+before reading the body. Images not processed within the request time limit
+are returned as errors.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import collections
+import concurrent.futures
+import socketserver
+import logging
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from .exif_reader import read_exif, read_exif_bytes, READ_CHUNK_SIZE
+from .property_plan import compile_plan, PROPERTIES
+from .deadlines import WorkerPool, failed_future
+
+log = logging.getLogger('im2geojson')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_MAX_PENDING = 8
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_MAX_IN_FLIGHT = 256
+MAX_BODY_SIZE = 64 * 1024 * 1024
+MAX_PATHS = 10000
+RETRY_AFTER_SECONDS = 1
+
+
+class _ResultCache(object):
+    """A thread-safe LRU cache of image results keyed by path, size and modification time."""
+
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._results = collections.OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self._maxsize:
+                self._results.popitem(last=False)
+
+
+class ImageProcessor(object):
+    """
+    Create an ImageProcessor object.
+
+    Parses images to GeoJSON Features on a persistent worker pool, with
+    bounded concurrent requests, a bounded number of images queued or
+    processing across them, and a per-request time limit. Images are
+    read with the same `properties`, `xmp` and `read_size` options as
+    `ImageToGeoJSON`.
+    """
+
+    def __init__(self,
+                 max_workers=None,
+                 max_pending=DEFAULT_MAX_PENDING,
+                 timeout=DEFAULT_TIMEOUT,
+                 cache_size=DEFAULT_CACHE_SIZE,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 properties=None,
+                 xmp=False,
+                 read_size=READ_CHUNK_SIZE):
+        """
+        Initialise ImageProcessor object.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The number of worker threads, default as `ThreadPoolExecutor`.
+        max_pending : int, default 8
+            The number of requests processed at once, others are rejected.
+        timeout : float, default 30.0
+            The time limit in seconds for each request.
+        cache_size : int, default 10000
+            The number of path results to cache, 0 disables the cache.
+        max_in_flight : int, default 256
+            The number of images queued or processing at once, across all
+            requests. Requests wait for a free place until their time limit.
+        properties : list of str, optional
+            Extra properties to read from each image, see `ImageToGeoJSON`.
+        xmp : bool, default False
+            Read the GPS data of images without it in EXIF from their XMP
+            packet, or a `.xmp` sidecar file beside paths.
+        read_size : int, default 65536
+            The bytes read at a time from each file while reading its metadata.
+
+        Raises
+        ------
+        ValueError
+            If a property or `read_size` is invalid.
+        """
+        if not isinstance(read_size, int) or read_size < 1:
+            raise ValueError(f'ValueError: Invalid read size {read_size}, Expecting an int of at least 1')
+        self._plan = compile_plan(properties) if properties else None
+        self._xmp = xmp
+        self._read_size = read_size
+        self._pool = WorkerPool(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._timeout = timeout
+        self._cache = _ResultCache(cache_size)
+
+    def acquire(self):
+        """bool: Reserve a request slot without blocking, return False if all are busy."""
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        """Release a request slot."""
+        self._slots.release()
+
+    def process_paths(self, paths):
+        """
+        Parse the images at `paths`.
+
+        Returns
+        -------
+        features : list of dict
+            The GeoJSON Features, in the order of `paths`.
+        errors : dict
+            The error string for each path that failed.
+        """
+        deadline = time.monotonic() + self._timeout
+        futures = [(path, self._submit(deadline, self._process_path, path)) for path in paths]
+        return self._collect(futures, deadline)
+
+    def process_bytes(self, name, image_b):
+        """
+        Parse the image `image_b`, named `name`.
+
+        Returns
+        -------
+        features : list of dict
+            The GeoJSON Feature, if parsed.
+        errors : dict
+            The error string for `name`, if it failed.
+        """
+        deadline = time.monotonic() + self._timeout
+        future = self._submit(deadline, self._process_bytes, name, image_b)
+        return self._collect([(name, future)], deadline)
+
+    def shutdown(self):
+        """Shut down the worker pool, cancelling the images not yet started."""
+        self._pool.shutdown(wait=False)
+
+    def _submit(self, deadline, fn, *args):
+        # Wait until `deadline` for an in-flight place, released once the future is done or cancelled
+        if not self._in_flight.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            return failed_future(TimeoutError(self._timeout_string()))
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(lambda future: self._in_flight.release())
+        return future
+
+    def _collect(self, futures, deadline):
+        done, not_done = concurrent.futures.wait([future for _, future in futures],
+                                                 timeout=max(0.0, deadline - time.monotonic()))
+        features = []
+        errors = {}
+        for name, future in futures:
+            if future in not_done:
+                # Queued images are dropped, running ones keep their in-flight place until they finish
+                future.cancel()
+                errors[name] = self._timeout_string()
+                continue
+            try:
+                coord, props = future.result()
+            except Exception as e:
+                errors[name] = str(e)
+            else:
+                features.append(ImageProcessor._feature(coord, props))
+        return features, errors
+
+    def _timeout_string(self):
+        return f'TimeoutError: Not processed within {self._timeout} seconds'
+
+    def _process_path(self, path):
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        result = self._cache.get(key)
+        if result is None:
+            coord, props, image_b, thumb_b = read_exif(path,
+                                                       properties=self._plan,
+                                                       read_size=self._read_size,
+                                                       xmp=self._xmp)
+            props['filename'] = os.path.basename(path)
+            result = (coord, props)
+            self._cache.put(key, result)
+        coord, props = result
+        return coord, dict(props)
+
+    def _process_bytes(self, name, image_b):
+        coord, props, image_b, thumb_b = read_exif_bytes(image_b, properties=self._plan, xmp=self._xmp)
+        props['filename'] = name
+        return coord, props
+
+    @staticmethod
+    def _feature(coord, props):
+        lat, long = coord
+        return {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [long, lat]},
+            'properties': props,
+        }
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Handle HTTP requests for an ImageProcessor."""
+
+    server_version = 'im2geojson'
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        log.debug(f'{self.address_string()} - {format % args}')
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/health':
+            self._send_json(HTTPStatus.OK, {'status': 'ok'})
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {'error': 'Not found'})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path not in ('/features', '/image'):
+            self._discard_body()
+            self._send_json(HTTPStatus.NOT_FOUND, {'error': 'Not found'})
+            return
+
+        length = self._content_length()
+        if length is None:
+            # The body cannot be read, or skipped, without a valid length
+            self.close_connection = True
+            if self.headers.get('Content-Length') is None:
+                self._send_json(HTTPStatus.LENGTH_REQUIRED, {'error': 'Expecting Content-Length'})
+            else:
+                self._send_json(HTTPStatus.BAD_REQUEST, {'error': 'Invalid Content-Length, Expecting an integer >= 0'})
+            return
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': f'Body larger than {MAX_BODY_SIZE} bytes'})
+            return
+
+        # Reserve a slot before reading the body, a busy server leaves it unread and closes the connection
+        processor = self.server.processor
+        if not processor.acquire():
+            self.close_connection = True
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'Server busy'},
+                            {'Retry-After': str(RETRY_AFTER_SECONDS)})
+            return
+        try:
+            body = self.rfile.read(length)
+            if url.path == '/features':
+                try:
+                    paths = json.loads(body)['paths']
+                    if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+                        raise TypeError
+                except (ValueError, KeyError, TypeError):
+                    self._send_json(HTTPStatus.BAD_REQUEST, {'error': 'Expecting {"paths": [str, ...]}'})
+                    return
+                if len(paths) > MAX_PATHS:
+                    self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': f'More than {MAX_PATHS} paths'})
+                    return
+                features, errors = processor.process_paths(paths)
+            else:
+                name = parse_qs(url.query).get('name', ['image'])[0]
+                features, errors = processor.process_bytes(name, body)
+        finally:
+            processor.release()
+        self._send_json(HTTPStatus.OK, {'features': features, 'errors': errors})
+
+    def _content_length(self):
+        # The Content-Length as an int, or None if missing, malformed or negative
+        length = (self.headers.get('Content-Length') or '').strip()
+        if not (length.isascii() and length.isdigit()):
+            return None
+        return int(length)
+
+    def _discard_body(self):
+        length = self._content_length()
+        if length is not None and length <= MAX_BODY_SIZE:
+            self.rfile.read(length)
+        else:
+            self.close_connection = True
+
+    def _send_json(self, status, obj, headers={}):
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class HTTPServer(ThreadingHTTPServer):
+    """A threading localhost HTTP server with an ImageProcessor."""
+
+    daemon_threads = True
+
+    def __init__(self, address, processor):
+        self.processor = processor
+        super().__init__(address, RequestHandler)
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    """A threading Unix socket HTTP server with an ImageProcessor."""
+
+    daemon_threads = True
+
+    def __init__(self, path, processor):
+        self.processor = processor
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, RequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, **processor_args):
+    """
+    Create a server, listening on `socket_path` if given, else on `host`:`port`.
+
+    Parameters
+    ----------
+    host : str, default '127.0.0.1'
+        The host to listen on.
+    port : int, default 8000
+        The port to listen on, 0 picks a free port.
+    socket_path : str, optional
+        The Unix socket path to listen on instead.
+    **processor_args
+        Passed to `ImageProcessor`.
+
+    Returns
+    -------
+    HTTPServer or UnixHTTPServer
+        The server, call `serve_forever` to start it.
+    """
+    processor = ImageProcessor(**processor_args)
+    if socket_path is not None:
+        return UnixHTTPServer(socket_path, processor)
+    return HTTPServer((host, port), processor)
+
+def create_parser():
+    """
+    Creates a server CLI parser.
+
+    Returns
+    -------
+    parser : ArgumentParser
+        The ArgumentParser with arguments added.
+    """
+    parser = argparse.ArgumentParser(
+        argument_default=argparse.SUPPRESS,
+        prog='im2geojson.server',
+        description='Serve GeoJSON parsing of image metadata',
+        )
+    parser.add_argument(
+        '--host',
+        help='Set the host to listen on',
+        type=str
+        )
+    parser.add_argument(
+        '-p',
+        '--port',
+        help='Set the port to listen on',
+        type=int
+        )
+    parser.add_argument(
+        '--socket',
+        dest='socket_path',
+        help='Listen on the Unix socket SOCKET instead',
+        type=str
+        )
+    parser.add_argument(
+        '--max_workers',
+        help='Set the number of worker threads',
+        type=int
+        )
+    parser.add_argument(
+        '--max_pending',
+        help='Set the number of requests processed at once',
+        type=int
+        )
+    parser.add_argument(
+        '--timeout',
+        help='Set the time limit in seconds for each request',
+        type=float
+        )
+    parser.add_argument(
+        '--max_in_flight',
+        help='Set the number of images queued or processing at once, across all requests',
+        type=int
+        )
+    parser.add_argument(
+        '--props',
+        dest='properties',
+        help='Also read each of the properties PROPS from each image',
+        type=str,
+        nargs='+',
+        choices=list(PROPERTIES)
+        )
+    parser.add_argument(
+        '--xmp',
+        help='Read the GPS data of images without it in EXIF from their XMP packet or .xmp sidecar file',
+        action='store_true'
+        )
+    parser.add_argument(
+        '--read_size',
+        help='Set the bytes read at a time from each file while reading its metadata',
+        type=int
+        )
+    return parser
+
+def main(args=None):
+    """
+    Serve until interrupted.
+    """
+    parsed_args_dict = vars(create_parser().parse_args(args))
+    server = create_server(**parsed_args_dict)
+    address = server.server_address
+    print(f'Serving on {address if isinstance(address, str) else ":".join(map(str, address))}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.processor.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])              # pragma: no cover
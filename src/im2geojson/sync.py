@@ -0,0 +1,316 @@
+"""
+Sync outputs with their source images across runs, like rsync.
+
+A `Manifest` in `output_directory` records, for each image processed, its
+size and modification time, optionally a hash of its contents, and the
+feature parsed from it, with the images and thumbnails saved for it in its
+properties, or the metadata error it raised. Each entry is a flat list, as
+the manifest holds one per image. On the next run each source is checked
+with one `os.stat`:
+
+* Unchanged images, with all their outputs in place, are not read, parsed
+  or written again. Their features, or errors, are taken from the manifest.
+* Images of the same size with a new modification time, such as those
+  touched or copied again, are unchanged if their hash matches. New images
+  are hashed from the bytes read to process them, not read again.
+* Images that are gone are orphans, their outputs are deleted.
+
+Only the collections with a new, changed or deleted image are rewritten.
+The manifest is discarded whenever the options it was built with change,
+and only saved again when an entry changed.
+"""
+import os
+import json
+import collections
+import hashlib
+import concurrent.futures
+
+from .serializer import write_atomic
+
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_VERSION = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+OUTPUT_KEYS = ('rel_image_path', 'rel_thumbnail_path')
+
+# The fields of each entry
+_SIZE, _MTIME, _HASH, _FEATURE, _ERROR = range(5)
+
+
+def file_digest(filepath, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Hash the contents of the file at `filepath`.
+
+    Returns
+    -------
+    str or None
+        The hex BLAKE2b digest, or None if the file cannot be read.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(filepath, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def data_digest(data):
+    """str: Return the hex BLAKE2b digest of the bytes-like `data`, as `file_digest`."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class Manifest(object):
+    """
+    Create a Manifest object.
+
+    Maps each source image to its signature, feature and outputs, loaded from
+    and saved to a JSON file. Output paths are relative to the directory of
+    the file.
+    """
+
+    def __init__(self, path, options=None, hash_files=False, max_workers=None):
+        """
+        Initialise Manifest object, loading the entries saved at `path`.
+
+        Parameters
+        ----------
+        path : str
+            The path to the manifest file.
+        options : dict, optional
+            The options that outputs depend on. Entries saved with other
+            options are discarded.
+        hash_files : bool, default False
+            Hash the images with a changed modification time as they are
+            planned, so unchanged contents are detected. New images are
+            recorded with the hash passed to `record`.
+        max_workers : int, optional
+            The number of threads hashing images, default as `ThreadPoolExecutor`.
+        """
+        self._path = path
+        self._directory = os.path.dirname(path)
+        self._options = options or {}
+        self._hash_files = hash_files
+        self._max_workers = max_workers
+        self._entries = {}
+        # The number of entries recording each output, as images of the same filename share one
+        self._output_counts = collections.Counter()
+        self._staged = {}
+        self._dirty = False
+        self._load()
+
+    @property
+    def path(self):
+        """str: Return the path to the manifest file."""
+        return self._path
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, filepath):
+        return filepath in self._entries
+
+    def plan(self, filepaths):
+        """
+        Split `filepaths` into the images to process and those unchanged.
+
+        Parameters
+        ----------
+        filepaths : list of str
+            The paths of the source images.
+
+        Returns
+        -------
+        (changed, unchanged) : tuple of list of str
+            The new or changed images, and the unchanged images, in order.
+        """
+        signatures = {}
+        current = set()
+        to_hash = []
+        for filepath in filepaths:
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                continue
+            signature = signatures[filepath] = [st.st_size, st.st_mtime_ns]
+            entry = self._entries.get(filepath)
+            if entry is not None and self._outputs_exist(entry):
+                current.add(filepath)
+                if entry[_SIZE:_HASH] == signature:
+                    continue
+                if self._hash_files:
+                    to_hash.append(filepath)
+
+        hashes = {}
+        if to_hash:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                hashes = dict(zip(to_hash, executor.map(file_digest, to_hash)))
+
+        changed = []
+        unchanged = []
+        for filepath in filepaths:
+            signature = signatures.get(filepath)
+            file_hash = hashes.get(filepath)
+            if filepath in current:
+                entry = self._entries[filepath]
+                if entry[_SIZE:_HASH] == signature:
+                    unchanged.append(filepath)
+                    continue
+                if file_hash is not None and entry[_HASH] == file_hash:
+                    entry[_SIZE:_HASH] = signature
+                    self._dirty = True
+                    unchanged.append(filepath)
+                    continue
+            self._staged[filepath] = (signature, file_hash)
+            changed.append(filepath)
+        return changed, unchanged
+
+    def orphans(self, filepaths):
+        """list of str: Return the images with entries that are not in `filepaths`, in order."""
+        sources = set(filepaths)
+        return sorted(filepath for filepath in self._entries if filepath not in sources)
+
+    def feature(self, filepath):
+        """
+        Return the feature recorded for `filepath`.
+
+        Returns
+        -------
+        (folder, coord, props, parent) : tuple of str, tuple of float, dict, str or None
+            As added to a `GeoJSONParser`, with a copy of the props, or None
+            if an error was recorded.
+        """
+        feature = self._entries[filepath][_FEATURE]
+        if feature is None:
+            return None
+        folder, lat, long, props, parent = feature
+        return folder, (lat, long), dict(props), parent
+
+    def error(self, filepath):
+        """(str, str) or None: Return the error class and string recorded for `filepath`, or None."""
+        error = self._entries[filepath][_ERROR]
+        return None if error is None else tuple(error)
+
+    def record(self, filepath, folder, coord, props, parent, file_hash=None):
+        """
+        Record the feature parsed from `filepath`, and the outputs in its props.
+
+        The signature and hash planned for `filepath` are recorded, not its
+        current ones, so a change while it was processed is found next run.
+        `file_hash`, the `data_digest` of the contents read to process it,
+        is recorded instead of the planned hash if given.
+        """
+        self._record(filepath, [folder, *coord, props, parent], None, file_hash)
+
+    def record_error(self, filepath, error_class, exception_string, file_hash=None):
+        """
+        Record the error raised by `filepath`, reported again while it is unchanged.
+
+        Only record errors of the image itself, such as missing metadata,
+        which processing it again would raise again.
+        """
+        self._record(filepath, None, [error_class, exception_string], file_hash)
+
+    def _record(self, filepath, feature, error, file_hash=None):
+        signature, planned_hash = self._staged.pop(filepath, (None, None))
+        if file_hash is None:
+            file_hash = planned_hash
+        if signature is None:
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                return
+            signature = [st.st_size, st.st_mtime_ns]
+        entry = [*signature, file_hash, feature, error]
+        previous = self._pop_entry(filepath)
+        self._add_entry(filepath, entry)
+        if previous is not None:
+            # Outputs no longer saved for the changed image
+            self._delete_outputs(Manifest._outputs(previous))
+        self._dirty = True
+
+    def remove(self, filepaths):
+        """
+        Remove the entries of `filepaths`, if any, and delete their outputs.
+
+        Outputs also recorded for another image, as images of the same
+        filename in different folders share an output path, are kept.
+
+        Returns
+        -------
+        list of str
+            The relative paths of the outputs deleted.
+        """
+        removed = []
+        for filepath in filepaths:
+            self._staged.pop(filepath, None)
+            entry = self._pop_entry(filepath)
+            if entry is not None:
+                removed.extend(Manifest._outputs(entry))
+                self._dirty = True
+        return self._delete_outputs(removed)
+
+    def save(self):
+        """Save the manifest to `path`, atomically, unless it is unchanged since loaded or saved."""
+        if not self._dirty:
+            return
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'options': self._options,
+            'entries': self._entries,
+        }
+        write_atomic(self._path, json.dumps(manifest, separators=(',', ':')).encode('utf-8'))
+        self._dirty = False
+
+    def _load(self):
+        # Load the entries at `path`, unless missing, unreadable or saved with other options
+        self._dirty = True
+        try:
+            with open(self._path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (isinstance(manifest, dict) and manifest.get('version') == MANIFEST_VERSION
+                and manifest.get('options') == self._options):
+            for filepath, entry in manifest.get('entries', {}).items():
+                self._add_entry(filepath, entry)
+            self._dirty = False
+
+    def _add_entry(self, filepath, entry):
+        self._entries[filepath] = entry
+        self._output_counts.update(Manifest._outputs(entry))
+
+    def _pop_entry(self, filepath):
+        # Remove and return the entry of `filepath`, or None
+        entry = self._entries.pop(filepath, None)
+        if entry is not None:
+            self._output_counts.subtract(Manifest._outputs(entry))
+        return entry
+
+    def _delete_outputs(self, outputs):
+        # Delete `outputs` not recorded for any image, return those deleted
+        deleted = []
+        for output in dict.fromkeys(outputs):
+            if self._output_counts[output] > 0:
+                continue
+            del self._output_counts[output]
+            try:
+                os.remove(os.path.join(self._directory, output))
+            except FileNotFoundError:
+                pass
+            deleted.append(output)
+        return deleted
+
+    def _outputs_exist(self, entry):
+        return all(os.path.exists(os.path.join(self._directory, output)) for output in Manifest._outputs(entry))
+
+    @staticmethod
+    def _outputs(entry):
+        # The relative paths of the images and thumbnails saved for `entry`, as recorded in its props
+        feature = entry[_FEATURE]
+        if feature is None:
+            return []
+        props = feature[3]
+        return [props[key] for key in OUTPUT_KEYS if key in props]
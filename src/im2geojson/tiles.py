@@ -0,0 +1,183 @@
+"""
+Index GeoJSON Features by Web Mercator (z/x/y) tile.
+"""
+import math
+from array import array
+
+MAX_LATITUDE = 85.05112878
+MAX_ZOOM = 24
+
+
+def check_zoom(zoom):
+    """
+    Check `zoom` is a tile zoom level, an int between 0 and `MAX_ZOOM`.
+
+    Raises
+    ------
+    ValueError
+        If `zoom` is out of range.
+    """
+    if isinstance(zoom, bool) or not isinstance(zoom, int) or not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f'ValueError: Invalid zoom {zoom}, Should be between 0 and {MAX_ZOOM}')
+
+def lat_long_to_tile(lat, long, zoom):
+    """
+    Return the tile containing `lat`, `long` at `zoom`.
+
+    Parameters
+    ----------
+    lat : float
+        The latitude.
+    long : float
+        The longitude.
+    zoom : int
+        The tile zoom level.
+
+    Returns
+    -------
+    (x, y) : tuple of int
+        The tile column and row.
+    """
+    n = 1 << zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    lat_rad = math.radians(lat)
+    x = int((long + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tile_bbox(zoom, x, y):
+    """
+    Return the bounding box of tile `x`, `y` at `zoom`.
+
+    Returns
+    -------
+    [west, south, east, north] : list of float
+        The tile bounds in degrees.
+    """
+    n = 1 << zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return [west, south, east, north]
+
+def extend_bbox(bbox, lat, long):
+    """
+    Extend `bbox` to include `lat`, `long`.
+
+    Parameters
+    ----------
+    bbox : list of float or None
+        The bounding box `[west, south, east, north]`, or None if empty.
+    lat : float
+        The latitude.
+    long : float
+        The longitude.
+
+    Returns
+    -------
+    list of float
+        The extended bounding box.
+    """
+    if bbox is None:
+        return [long, lat, long, lat]
+    if long < bbox[0]:
+        bbox[0] = long
+    if lat < bbox[1]:
+        bbox[1] = lat
+    if long > bbox[2]:
+        bbox[2] = long
+    if lat > bbox[3]:
+        bbox[3] = lat
+    return bbox
+
+
+class TileIndex(object):
+    """
+    Create a TileIndex object.
+
+    Buckets integer items, such as feature rows, by the tile that contains
+    them at a single `zoom` level.
+    """
+
+    def __init__(self, zoom):
+        """
+        Initialise TileIndex object.
+
+        Parameters
+        ----------
+        zoom : int
+            The tile zoom level, between 0 and 24.
+
+        Raises
+        ------
+        ValueError
+            If `zoom` is out of range.
+        """
+        check_zoom(zoom)
+        self._zoom = zoom
+        self._tiles = {}
+
+    def __iter__(self):
+        """Return an iterator of `((z, x, y), items)` in tile order."""
+        return (((self._zoom, x, y), self._tiles[(x, y)]) for x, y in sorted(self._tiles))
+
+    def __len__(self):
+        """int: Return the number of tiles."""
+        return len(self._tiles)
+
+    @property
+    def zoom(self):
+        """int: Return the tile zoom level."""
+        return self._zoom
+
+    def add(self, lat, long, item):
+        """
+        Add `item` to the tile containing `lat`, `long`.
+
+        Parameters
+        ----------
+        lat : float
+            The latitude.
+        long : float
+            The longitude.
+        item : int
+            The item, a non-negative integer.
+
+        Returns
+        -------
+        (z, x, y) : tuple of int
+            The tile the item was added to.
+        """
+        x, y = lat_long_to_tile(lat, long, self._zoom)
+        items = self._tiles.get((x, y))
+        if items is None:
+            items = self._tiles[(x, y)] = array('L')
+        items.append(item)
+        return self._zoom, x, y
+
+    def remove(self, lat, long, item):
+        """
+        Remove `item` from the tile containing `lat`, `long`.
+
+        Parameters
+        ----------
+        lat : float
+            The latitude the item was added at.
+        long : float
+            The longitude the item was added at.
+        item : int
+            The item.
+
+        Raises
+        ------
+        ValueError
+            If `item` is not in the tile.
+        """
+        x, y = lat_long_to_tile(lat, long, self._zoom)
+        items = self._tiles.get((x, y))
+        if items is None:
+            raise ValueError(f'ValueError: Item {item} not in tile {self._zoom}/{x}/{y}')
+        items.remove(item)
+        if not items:
+            del self._tiles[(x, y)]
@@ -0,0 +1,358 @@
+"""
+Watch `input_directory` and process new or changed images as they arrive.
+"""
+import os
+import sys
+import json
+import time
+import select
+import struct
+import logging
+import ctypes
+import ctypes.util
+
+from .im2geojson import TREE_LAYOUT
+
+log = logging.getLogger('im2geojson')
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_SETTLE_TIME = 1.0
+DEFAULT_RESCAN_INTERVAL = 60.0
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# struct inotify_event: wd, mask, cookie and len, followed by len bytes of NUL padded name
+INOTIFY_EVENT = struct.Struct('iIII')
+INOTIFY_READ_SIZE = 65536
+
+
+class _SleepWaiter(object):
+    """Wait by sleeping, the polling fallback."""
+
+    def watch(self, directories):
+        pass
+
+    def wait(self, timeout):
+        """None: Sleep for `timeout` seconds, the changes are unknown."""
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+
+class _InotifyWaiter(object):
+    """Wait for file system events in watched directories with Linux inotify."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._inotify_add_watch = libc.inotify_add_watch
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        # The directory of each watch descriptor
+        self._directories = {}
+
+    def watch(self, directories):
+        """Add (or refresh) inotify watches on `directories`."""
+        for directory in directories:
+            wd = self._inotify_add_watch(self._fd, os.fsencode(directory), INOTIFY_MASK)
+            if wd >= 0:
+                self._directories[wd] = directory
+
+    def wait(self, timeout):
+        """
+        Wait up to `timeout` seconds for events, and read those queued.
+
+        Returns
+        -------
+        list of (str, bool) or None
+            The path changed by each event and whether it is a directory, in
+            order without repeats, empty if none arrived. None if the event
+            queue overflowed, so the changes are unknown.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        data = bytearray()
+        try:
+            while True:
+                chunk = os.read(self._fd, INOTIFY_READ_SIZE)
+                if not chunk:
+                    break
+                data += chunk
+        except BlockingIOError:
+            pass
+
+        changed = {}
+        overflowed = False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            name = bytes(data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length]).rstrip(b'\0')
+            offset += INOTIFY_EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+            elif mask & IN_IGNORED:
+                # The directory was deleted or moved, its entries have their own events
+                self._directories.pop(wd, None)
+            elif name and wd in self._directories:
+                changed[os.path.join(self._directories[wd], os.fsdecode(name))] = bool(mask & IN_ISDIR)
+        return None if overflowed else list(changed.items())
+
+    def close(self):
+        os.close(self._fd)
+
+
+def _make_waiter():
+    """Return an inotify waiter on Linux, or a polling waiter."""
+    if sys.platform.startswith('linux'):
+        try:
+            return _InotifyWaiter()
+        except (OSError, AttributeError) as e:
+            log.info(f'inotify unavailable, polling instead: {e}')
+    return _SleepWaiter()
+
+
+class Watcher(object):
+    """
+    Create a Watcher object.
+
+    Polls the images in the `input_directory` of an `ImageToGeoJSON` and
+    processes each new or changed image once it has stopped changing. The
+    matching folder's collection is rewritten in place, or with
+    `ndjson_path` each feature is appended to an NDJSON stream instead.
+    inotify, where available, wakes the watcher as soon as files change and
+    names them, so only those files are checked between full rescans.
+    """
+
+    def __init__(self,
+                 im2geojson,
+                 interval=DEFAULT_INTERVAL,
+                 settle_time=DEFAULT_SETTLE_TIME,
+                 ndjson_path=None,
+                 rescan_interval=DEFAULT_RESCAN_INTERVAL):
+        """
+        Initialise Watcher object.
+
+        Parameters
+        ----------
+        im2geojson : ImageToGeoJSON
+            The ImageToGeoJSON to process images with.
+
+        interval : float, default 2.0
+            The maximum time in seconds between polls.
+
+        settle_time : float, default 1.0
+            The time in seconds a file's size and modification time must stay
+            unchanged before it is processed, so partially written files are skipped.
+
+        ndjson_path : str, optional
+            Append features to the NDJSON file at `ndjson_path` instead of
+            rewriting collections.
+
+        rescan_interval : float, default 60.0
+            The time in seconds between full rescans of `input_directory`
+            with inotify, in case an event is missed. Without inotify every
+            poll is a full rescan.
+        """
+        self._im2geojson = im2geojson
+        self._interval = interval
+        self._settle_time = settle_time
+        self._ndjson_path = ndjson_path
+        self._rescan_interval = rescan_interval
+
+        self._pending = {}
+        self._processed = {}
+        self._processed_count = 0
+        self._success_count = 0
+        self._waiter = None
+
+    @property
+    def summary(self):
+        """str: Return the `summary` string."""
+        return f'{self._success_count} out of {self._processed_count} images processed successfully'
+
+    def run(self, max_polls=None):
+        """
+        Poll until interrupted, or for `max_polls` polls.
+
+        Parameters
+        ----------
+        max_polls : int, optional
+            The number of polls, default until KeyboardInterrupt.
+        """
+        self._waiter = _make_waiter()
+        polls = 0
+        changed = None
+        rescanned = None
+        try:
+            while True:
+                if changed is None or time.monotonic() - rescanned >= self._rescan_interval:
+                    # Watch before scanning, so no change after the scan is missed
+                    self._waiter.watch(self._watch_directories())
+                    rescanned = time.monotonic()
+                    self.poll()
+                else:
+                    self.poll(self._changed_filepaths(changed))
+                polls += 1
+                if max_polls is not None and polls >= max_polls:
+                    break
+                changed = self._waiter.wait(self._settle_time if self._pending else self._interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._waiter.close()
+            self._waiter = None
+            self._im2geojson.close()
+
+    def poll(self, filepaths=None):
+        """
+        Check the images once and process those that are ready.
+
+        Parameters
+        ----------
+        filepaths : iterable of str, optional
+            The paths of the images changed, created or deleted since the
+            last poll. The images waiting to settle are checked too. Default
+            a full rescan of `input_directory`.
+
+        Returns
+        -------
+        list of str
+            The paths of the images processed.
+        """
+        now = time.monotonic()
+        if filepaths is None:
+            candidates = self._im2geojson.image_filepaths()
+            # Images not found by a full rescan are gone
+            gone = set(self._processed).union(self._pending).difference(candidates)
+        else:
+            candidates = sorted(set(filepaths).union(self._pending))
+            gone = set()
+
+        ready = []
+        for filepath in candidates:
+            try:
+                st = os.stat(filepath)
+            except FileNotFoundError:
+                gone.add(filepath)
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if self._processed.get(filepath) == signature:
+                continue
+            pending = self._pending.get(filepath)
+            if pending is None or pending[0] != signature:
+                self._pending[filepath] = (signature, now)
+            elif now - pending[1] >= self._settle_time:
+                del self._pending[filepath]
+                self._processed[filepath] = signature
+                ready.append(filepath)
+
+        deleted = sorted(filepath for filepath in gone if filepath in self._processed)
+        for filepath in gone:
+            self._processed.pop(filepath, None)
+            self._pending.pop(filepath, None)
+
+        changed_titles = set()
+        lines = []
+        for filepath in ready:
+            self._processed_count += 1
+            feature = self._im2geojson.process_image(filepath)
+            if feature is None:
+                self._remove_feature(filepath, changed_titles)
+                continue
+            self._success_count += 1
+            if self._ndjson_path is not None:
+                lines.append(Watcher._ndjson_line(*feature))
+            else:
+                self._im2geojson.update_feature(filepath, *feature)
+                changed_titles.add(feature[0])
+
+        for filepath in deleted:
+            self._remove_feature(filepath, changed_titles)
+
+        if self._ndjson_path is not None:
+            if lines:
+                with open(self._ndjson_path, 'a') as f:
+                    f.writelines(lines)
+        else:
+            self._im2geojson.save_collections(changed_titles)
+
+        if ready or deleted:
+            log.info(f'Processed {len(ready)} new or changed images, {len(deleted)} deleted')
+        return ready
+
+    def _remove_feature(self, filepath, changed_titles):
+        title = self._im2geojson.remove_feature(filepath)
+        if title is not None:
+            changed_titles.add(title)
+
+    def _changed_filepaths(self, changed):
+        """
+        Return the images to check for the (path, is_dir) changes named by
+        inotify: the images changed, and those in folders created, moved in,
+        deleted or moved away.
+        """
+        filepaths = set()
+        for path, is_dir in changed:
+            if not is_dir:
+                if self._im2geojson.is_image_path(path):
+                    filepaths.add(path)
+            elif os.path.isdir(path):
+                # A folder created or moved in, its images may be there before it is watched
+                directories = self._watch_directories(path)
+                self._waiter.watch(directories)
+                for directory in directories:
+                    with os.scandir(directory) as it:
+                        filepaths.update(entry.path for entry in it
+                                         if entry.is_file() and self._im2geojson.is_image_path(entry.path))
+            else:
+                # A folder deleted or moved away, its images are gone
+                prefix = os.path.join(path, '')
+                filepaths.update(filepath for filepath in [*self._processed, *self._pending]
+                                 if filepath.startswith(prefix))
+        return filepaths
+
+    @staticmethod
+    def _ndjson_line(title, coord, props, parent):
+        lat, long = coord
+        feature = {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [long, lat]},
+            'properties': props,
+            'collection': title,
+        }
+        if parent:
+            feature['parent'] = parent
+        return json.dumps(feature) + '\n'
+
+    def _watch_directories(self, directory=None):
+        """
+        list of str: Return `input_directory` and its folders, or its whole
+        tree with layout 'tree'. Only `directory` and those below it, if given.
+        """
+        input_directory = self._im2geojson.input_directory
+        if directory is None:
+            directory = input_directory
+        if not os.path.isdir(directory):
+            return []
+        if self._im2geojson.layout == TREE_LAYOUT:
+            return [dirpath for dirpath, _, _ in os.walk(directory)]
+        if os.path.normpath(directory) != os.path.normpath(input_directory):
+            # Images are only read one folder below `input_directory`
+            parent = os.path.dirname(os.path.normpath(directory))
+            return [directory] if parent == os.path.normpath(input_directory) else []
+        with os.scandir(input_directory) as it:
+            folders = [entry.path for entry in it if entry.is_dir()]
+        return [input_directory] + folders
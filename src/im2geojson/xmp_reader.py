@@ -0,0 +1,183 @@
+"""
+Read GPS and datetime values from Extensible Metadata Platform (XMP) packets.
+
+Editors such as Lightroom often record the GPS coordinate only in XMP, either
+in an XMP APP1 segment of the JPEG or in a `.xmp` sidecar file beside it.
+Packets are parsed with a streaming XML parser, fed a chunk at a time and
+stopped once every value is found, so a large sidecar is rarely read to the
+end.
+"""
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+
+from .ifd_reader import iter_segments, JPEG_SOI, JPEG_SOS, JPEG_APP1
+
+XMP_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
+XMP_CHUNK_SIZE = 64 * 1024
+SIDECAR_EXTENSIONS = ('.xmp', '.XMP')
+
+EXIF_NS = 'http://ns.adobe.com/exif/1.0/'
+PHOTOSHOP_NS = 'http://ns.adobe.com/photoshop/1.0/'
+XMP_NS = 'http://ns.adobe.com/xap/1.0/'
+
+GPS_LATITUDE = f'{{{EXIF_NS}}}GPSLatitude'
+GPS_LONGITUDE = f'{{{EXIF_NS}}}GPSLongitude'
+DATETIME_ORIGINAL = f'{{{EXIF_NS}}}DateTimeOriginal'
+DATE_CREATED = f'{{{PHOTOSHOP_NS}}}DateCreated'
+CREATE_DATE = f'{{{XMP_NS}}}CreateDate'
+# The capture datetime, most specific first
+DATETIME_NAMES = (DATETIME_ORIGINAL, DATE_CREATED, CREATE_DATE)
+XMP_NAMES = (GPS_LATITUDE, GPS_LONGITUDE, *DATETIME_NAMES)
+# No later value can change the result once these are found
+FINAL_NAMES = (GPS_LATITUDE, GPS_LONGITUDE, DATETIME_NAMES[0])
+
+XMP_DATETIME = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?:T(\d{2}):(\d{2})(?::(\d{2})(?:\.(\d+))?)?)?(Z|[+-]\d{2}:\d{2})?')
+
+
+def find_xmp_segment(data):
+    """
+    Find the XMP APP1 segment of JPEG `data`.
+
+    Returns
+    -------
+    (start, end) : tuple of int or None
+        The slice of `data` holding the XMP packet, or None if not found.
+    """
+    for marker, offset, length in iter_segments(data):
+        if marker == JPEG_APP1 and bytes(data[offset + 4:offset + 4 + len(XMP_HEADER)]) == XMP_HEADER:
+            return offset + 4 + len(XMP_HEADER), min(offset + 2 + length, len(data))
+    return None
+
+def read_jpeg_xmp(stream):
+    """
+    Read the XMP packet of the JPEG `stream`, skipping over other segments.
+
+    Returns
+    -------
+    bytes or None
+        The XMP packet, or None if `stream` is not a JPEG or has none
+        before the image data.
+    """
+    if stream.read(2) != JPEG_SOI:
+        return None
+    while True:
+        header = stream.read(4)
+        # Markers may be preceded by 0xFF fill bytes
+        while header[:2] == b'\xff\xff':
+            header = header[1:] + stream.read(1)
+        if len(header) < 4 or header[0] != 0xFF or header[:2] == JPEG_SOS:
+            return None
+        length = int.from_bytes(header[2:4], 'big')
+        if header[:2] == JPEG_APP1:
+            segment = stream.read(length - 2)
+            if segment.startswith(XMP_HEADER):
+                return segment[len(XMP_HEADER):]
+        else:
+            stream.seek(length - 2, os.SEEK_CUR)
+
+def sidecar_paths(filepath):
+    """list of str: Return the paths a sidecar of `filepath` may have, 'IMG.xmp' then 'IMG.jpg.xmp'."""
+    root = os.path.splitext(filepath)[0]
+    return [root + extension for extension in SIDECAR_EXTENSIONS] + [filepath + '.xmp']
+
+def iter_file_chunks(filepath, chunk_size=XMP_CHUNK_SIZE):
+    """Iterate over the contents of `filepath` in chunks of `chunk_size` bytes."""
+    with open(filepath, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def parse_xmp(chunks):
+    """
+    Parse the GPS and datetime values from an XMP packet.
+
+    Values are read from both the attribute and the element forms of RDF.
+    Parsing stops once the coordinate and the first of `DATETIME_NAMES`, the
+    datetime preferred, are found, and each element is cleared once handled.
+
+    Parameters
+    ----------
+    chunks : iterable of bytes
+        The XMP packet, in chunks.
+
+    Returns
+    -------
+    dict
+        The value of each of `XMP_NAMES` found, by qualified name. Values of
+        a malformed packet up to the error are returned.
+    """
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    values = {}
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == 'start':
+                    for name in XMP_NAMES:
+                        value = element.get(name)
+                        if value is not None:
+                            values.setdefault(name, value)
+                else:
+                    if element.tag in XMP_NAMES and element.text and element.text.strip():
+                        values.setdefault(element.tag, element.text.strip())
+                    element.clear()
+                if all(name in values for name in FINAL_NAMES):
+                    return values
+    except ElementTree.ParseError:
+        pass
+    return values
+
+def xmp_coordinate(value):
+    """
+    Convert an XMP GPS coordinate, 'DDD,MM,SSk' or 'DDD,MM.mmk', to degrees, minutes and seconds.
+
+    Returns
+    -------
+    (deg, min, sec, ref) : tuple of float, float, float, str
+        The arguments of `dms_to_decimal`.
+
+    Raises
+    ------
+    ValueError
+        If `value` is not an XMP GPS coordinate.
+    """
+    parts = value[:-1].split(',')
+    try:
+        if len(parts) == 3:
+            deg, minutes, seconds = map(float, parts)
+        elif len(parts) == 2:
+            deg, fractional_minutes = map(float, parts)
+            minutes = float(int(fractional_minutes))
+            seconds = (fractional_minutes - minutes) * 60
+        else:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f'ValueError: Invalid XMP GPS coordinate {value}') from None
+    return deg, minutes, seconds, value[-1:].upper()
+
+def xmp_datetime(value):
+    """
+    Convert an XMP datetime, ISO 8601 with optional seconds, fraction and offset, to EXIF strings.
+
+    Returns
+    -------
+    (datetime_str, subsec, offset) : tuple of str, str or None, str or None
+        The EXIF datetime, 'YYYY:MM:DD HH:MM:SS', sub-second digits and
+        offset from UTC, '+HH:MM', when recorded.
+
+    Raises
+    ------
+    ValueError
+        If `value` is not an XMP datetime.
+    """
+    match = XMP_DATETIME.fullmatch(value)
+    if match is None:
+        raise ValueError(f'ValueError: Invalid XMP datetime {value}')
+    year, month, day, hour, minute, second, subsec, offset = match.groups()
+    datetime_str = f'{year}:{month}:{day} {hour or "00"}:{minute or "00"}:{second or "00"}'
+    if offset == 'Z':
+        offset = '+00:00'
+    return datetime_str, subsec, offset
@@ -0,0 +1,100 @@
+"""
+Tests for autotune
+"""
+
+import unittest
+
+from im2geojson.autotune import *
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAIMDController(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def run_window(self, controller, throughput):
+        """Complete a window of items at `throughput` items per second."""
+        limit = controller.limit
+        count = max(MIN_WINDOW, 2 * limit)
+        for _ in range(count):
+            self.clock.now += 1 / throughput
+            controller.record(limit / throughput)
+
+    def test_initial_limit(self):
+        controller = AIMDController(initial=4, clock=self.clock)
+        self.assertEqual(4, controller.limit)
+        self.assertIsNone(controller.throughput)
+        self.assertIsNone(controller.mean_latency)
+
+    def test_limit_unchanged_within_window(self):
+        controller = AIMDController(initial=4, clock=self.clock)
+        for _ in range(MIN_WINDOW - 1):
+            controller.record(0.1)
+        self.assertEqual(4, controller.limit)
+
+    def test_additive_increase_while_throughput_holds(self):
+        controller = AIMDController(initial=4, increase=2, clock=self.clock)
+        self.run_window(controller, 100)
+        self.assertEqual(6, controller.limit)
+        self.run_window(controller, 100 * (1 - DEFAULT_TOLERANCE / 2))
+        self.assertEqual(8, controller.limit)
+        self.assertAlmostEqual(97.5, controller.throughput)
+
+    def test_decrease_when_throughput_drifts_below_best(self):
+        controller = AIMDController(initial=8, clock=self.clock)
+        for throughput in [100, 97, 94]:
+            self.run_window(controller, throughput)
+        self.assertEqual(5, controller.limit)
+
+    def test_multiplicative_decrease_when_throughput_drops(self):
+        controller = AIMDController(initial=8, clock=self.clock)
+        self.run_window(controller, 100)
+        self.run_window(controller, 50)
+        self.assertEqual(4, controller.limit)
+
+    def test_limit_bounded(self):
+        controller = AIMDController(initial=2, minimum=2, maximum=3, clock=self.clock)
+        for _ in range(3):
+            self.run_window(controller, 100)
+        self.assertEqual(3, controller.limit)
+        self.run_window(controller, 10)
+        self.assertEqual(2, controller.limit)
+
+    def test_converges_to_storage_concurrency(self):
+        # Throughput grows with items in flight up to the storage's capacity, then falls
+        for capacity in [4, 40]:
+            controller = AIMDController(initial=1, clock=self.clock)
+            limits = []
+            for _ in range(80):
+                limit = controller.limit
+                throughput = 10 * limit if limit <= capacity else 10 * capacity * capacity / limit
+                self.run_window(controller, throughput)
+                limits.append(controller.limit)
+            self.assertLessEqual(capacity // 2, min(limits[-20:]))
+            self.assertGreaterEqual(capacity + capacity // 10 + 2, max(limits[-20:]))
+
+    def test_mean_latency(self):
+        controller = AIMDController(clock=self.clock)
+        controller.record(0.1)
+        controller.record(0.3)
+        self.assertAlmostEqual(0.2, controller.mean_latency)
+
+    def test_invalid_limits_raise_exception(self):
+        with self.assertRaises(ValueError):
+            AIMDController(initial=0)
+        with self.assertRaises(ValueError):
+            AIMDController(initial=10, maximum=5)
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
@@ -6,9 +6,14 @@ import unittest
 import io
 import shutil
 import os
-from contextlib import redirect_stdout
+import sys
+import subprocess
+import tempfile
+from unittest import mock
+from contextlib import redirect_stdout, redirect_stderr
 
-from im2geojson.cli import create_parser, parse_args_to_dict, main
+from im2geojson import cli
+from im2geojson.cli import create_parser, parse_args_to_dict, main, JSON_BACKENDS, EXPORT_FORMATS
 
 
 class TestParserCreate(unittest.TestCase):
@@ -48,6 +53,102 @@ class TestParserArguments(unittest.TestCase):
         parsed = self.parser.parse_args(['testing/in', '--save_images'])
         self.assertTrue(parsed.save_images)
 
+    def test_parser_short_tile_zoom(self):
+        parsed = self.parser.parse_args(['testing/in', '-z', '12'])
+        self.assertEqual(12, parsed.tile_zoom)
+
+    def test_parser_tile_zoom(self):
+        parsed = self.parser.parse_args(['testing/in', '--tile_zoom', '12'])
+        self.assertEqual(12, parsed.tile_zoom)
+
+    def test_parser_short_cluster_zooms(self):
+        parsed = self.parser.parse_args(['testing/in', '-c', '4', '8'])
+        self.assertEqual([4, 8], parsed.cluster_zooms)
+
+    def test_parser_cluster_zooms(self):
+        parsed = self.parser.parse_args(['testing/in', '--cluster_zooms', '12'])
+        self.assertEqual([12], parsed.cluster_zooms)
+
+    def test_parser_json_backend(self):
+        parsed = self.parser.parse_args(['testing/in', '--json_backend', 'json'])
+        self.assertEqual('json', parsed.json_backend)
+
+    def test_parser_invalid_json_backend(self):
+        with redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                self.parser.parse_args(['testing/in', '--json_backend', 'pickle'])
+
+    def test_parser_short_export_formats(self):
+        parsed = self.parser.parse_args(['testing/in', '-e', 'gpkg', 'parquet'])
+        self.assertEqual(['gpkg', 'parquet'], parsed.export_formats)
+
+    def test_parser_export_formats(self):
+        parsed = self.parser.parse_args(['testing/in', '--export_formats', 'gpkg'])
+        self.assertEqual(['gpkg'], parsed.export_formats)
+
+    def test_parser_props(self):
+        parsed = self.parser.parse_args(['testing/in', '--props', 'altitude', 'make'])
+        self.assertEqual(['altitude', 'make'], parsed.properties)
+        parsed = self.parser.parse_args(['testing/in', '-p', 'iso'])
+        self.assertEqual(['iso'], parsed.properties)
+
+    def test_parser_schedule(self):
+        parsed = self.parser.parse_args(['testing/in', '--schedule', 'locality'])
+        self.assertEqual('locality', parsed.schedule)
+
+    def test_parser_chunk_size(self):
+        parsed = self.parser.parse_args(['testing/in', '--chunk_size', '64'])
+        self.assertEqual(64, parsed.chunk_size)
+
+    def test_parser_read_ahead(self):
+        parsed = self.parser.parse_args(['testing/in', '--prefetch', '16', '--read_size', '4096'])
+        self.assertEqual(16, parsed.prefetch)
+        self.assertEqual(4096, parsed.read_size)
+
+    def test_parser_xmp(self):
+        parsed = self.parser.parse_args(['testing/in', '--xmp'])
+        self.assertTrue(parsed.xmp)
+
+    def test_parser_sync(self):
+        parsed = self.parser.parse_args(['testing/in', '--sync'])
+        self.assertTrue(parsed.sync)
+
+    def test_parser_layout(self):
+        parsed = self.parser.parse_args(['testing/in', '--layout', 'tree', '--rollups'])
+        self.assertEqual('tree', parsed.layout)
+        self.assertTrue(parsed.rollups)
+
+    def test_parser_invalid_layout(self):
+        with self.assertRaises(SystemExit):
+            self.parser.parse_args(['testing/in', '--layout', 'flat'])
+
+    def test_parser_timeouts(self):
+        parsed = self.parser.parse_args(['testing/in', '--file_timeout', '2.5', '--run_timeout', '60'])
+        self.assertEqual(2.5, parsed.file_timeout)
+        self.assertEqual(60.0, parsed.run_timeout)
+
+    def test_parser_concurrency(self):
+        parsed = self.parser.parse_args(['testing/in', '--concurrency', '8'])
+        self.assertEqual(8, parsed.concurrency)
+        parsed = self.parser.parse_args(['testing/in', '-j', 'auto'])
+        self.assertEqual('auto', parsed.concurrency)
+
+    def test_parser_invalid_concurrency(self):
+        for value in ['0', 'fast']:
+            with redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit):
+                    self.parser.parse_args(['testing/in', '-j', value])
+
+    def test_parser_short_watch(self):
+        parsed = self.parser.parse_args(['testing/in', '-w'])
+        self.assertTrue(parsed.watch)
+
+    def test_parser_watch_options(self):
+        parsed = self.parser.parse_args(['testing/in', '--watch', '--interval', '0.5', '--ndjson', 'testing/out.ndjson'])
+        self.assertTrue(parsed.watch)
+        self.assertEqual(0.5, parsed.interval)
+        self.assertEqual('testing/out.ndjson', parsed.ndjson)
+
     def test_parser_short_save_thumbnails(self):
         parsed = self.parser.parse_args(['testing/in', '-t'])
         self.assertTrue(parsed.save_thumbnails)
@@ -116,7 +217,99 @@ class TestMain(unittest.TestCase):
         self.assertEqual(expected_first_line, out_lines[0])
         self.assertEqual(expected_last_line, out_lines[2])
         self.assertIn('No metadata', out_lines[3])
+        self.assertEqual('NoExifError: 1', out_lines[4])
+        self.assertIn('errors.jsonl', out_lines[5])
+
+    def test_main_watch(self):
+        f = io.StringIO()
+        with mock.patch('im2geojson.watcher.Watcher.run') as run:
+            with redirect_stdout(f):
+                main(['./', '-o', self.output_directory, '-w', '--interval', '0.5'])
+        run.assert_called_once()
+        out_lines = f.getvalue().split('\n')
+        self.assertEqual('Watching... press Ctrl+C to stop', out_lines[0])
+        self.assertEqual('0 out of 0 images processed successfully', out_lines[1])
+
+
+class TestCLIImportTime(unittest.TestCase):
+
+    # Modules the CLI must not import before arguments are parsed
+    LAZY_MODULES = ['exif', 'plum', 'geojson', 'concurrent.futures', 'glob', 'sqlite3', 'orjson']
+    # Generous limit in microseconds, on the fastest of several runs
+    IMPORT_TIME_LIMIT = 50000
+
+    def import_times(self, *args):
+        """dict: Return the cumulative import time in microseconds of each module imported running `args`."""
+        env = dict(os.environ, PYTHONPATH=os.path.abspath('src'))
+        result = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                                env=env, capture_output=True, text=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, module = line.split('|')
+                if cumulative.strip().isdigit():
+                    times[module.strip()] = int(cumulative)
+        return times
+
+    def assertNoLazyModules(self, times):
+        for module in self.LAZY_MODULES:
+            self.assertNotIn(module, times)
+
+    def test_help_imports_no_lazy_modules(self):
+        self.assertNoLazyModules(self.import_times('-m', 'im2geojson', '--help'))
+
+    def test_argument_error_imports_no_lazy_modules(self):
+        self.assertNoLazyModules(self.import_times('-m', 'im2geojson'))
+
+    def test_cli_import_time(self):
+        import_time = min(self.import_times('-c', 'import im2geojson.cli')['im2geojson.cli'] for _ in range(3))
+        self.assertLess(import_time, self.IMPORT_TIME_LIMIT)
+
+    def test_package_import_is_lazy(self):
+        times = self.import_times('-c', 'import im2geojson')
+        self.assertNoLazyModules(times)
+        self.assertIn('im2geojson.im2geojson', self.import_times('-c', 'from im2geojson import ImageToGeoJSON'))
+
+    def test_choices_match_modules(self):
+        from im2geojson.serializer import BACKENDS
+        from im2geojson.exporters import EXPORTERS
+        self.assertEqual(BACKENDS, JSON_BACKENDS)
+        self.assertEqual(tuple(EXPORTERS), EXPORT_FORMATS)
+        from im2geojson.property_plan import PROPERTIES
+        self.assertEqual(tuple(PROPERTIES), cli.PROPERTIES)
+        from im2geojson import autotune, scheduling
+        self.assertEqual(scheduling.SCHEDULES, cli.SCHEDULES)
+        from im2geojson.im2geojson import LAYOUTS
+        self.assertEqual(LAYOUTS, cli.LAYOUTS)
+        self.assertEqual(autotune.AUTO_CONCURRENCY, cli.AUTO_CONCURRENCY)
+
+
+@unittest.skipUnless(hasattr(os, 'mkfifo'), 'Named pipes unavailable')
+class TestCLIHungRead(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        folder = os.path.join(self.directory, 'input', 'folder')
+        os.makedirs(folder)
+        shutil.copyfile('tests/test_files/test_images/test_exif/test_folder/EXIF.jpg', os.path.join(folder, 'EXIF.jpg'))
+        # Opening a named pipe without a writer blocks, as a read of a hung network mount
+        os.mkfifo(os.path.join(folder, 'HUNG.jpg'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_file_timeout_exits_with_read_hung(self):
+        env = dict(os.environ, PYTHONPATH=os.path.abspath('src'))
+        for concurrency in ['1', 'auto']:
+            with self.subTest(concurrency=concurrency):
+                output_directory = os.path.join(self.directory, f'output_{concurrency}')
+                result = subprocess.run([sys.executable, '-m', 'im2geojson', os.path.join(self.directory, 'input', ''),
+                                         '-o', output_directory, '--file_timeout', '0.5', '-j', concurrency],
+                                        env=env, capture_output=True, text=True, timeout=30)
+                self.assertEqual(0, result.returncode)
+                self.assertIn('1 out of 2 images processed successfully', result.stdout)
+                self.assertIn('TimeoutError: Not processed within 0.5 seconds', result.stdout)
 
 
 if __name__ == '__main__':  
-    unittest.main()             # pragma: no cover
\ No newline at end of file
+    unittest.main()             # pragma: no cover
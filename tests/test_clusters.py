@@ -0,0 +1,63 @@
+"""
+Tests for clusters
+"""
+
+import unittest
+
+from im2geojson.clusters import ClusterIndex
+
+
+class TestClusterIndex(unittest.TestCase):
+
+    def test_invalid_zoom_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ClusterIndex([4, -1])
+
+    def test_zooms_sorted_unique(self):
+        cluster_index = ClusterIndex([8, 4, 8])
+        self.assertEqual([4, 8], cluster_index.zooms)
+
+    def test_single_point_cluster(self):
+        cluster_index = ClusterIndex([12])
+        cluster_index.add(-8.631053, 115.095269, {'datetime': '2023-05-05 06:19:24'})
+        features = list(cluster_index.iter_features(12))
+        self.assertEqual(1, len(features))
+        self.assertEqual([115.095269, -8.631053], features[0]['geometry']['coordinates'])
+        properties = features[0]['properties']
+        self.assertTrue(properties['cluster'])
+        self.assertEqual(1, properties['point_count'])
+        self.assertEqual('2023-05-05 06:19:24', properties['datetime_start'])
+        self.assertEqual('2023-05-05 06:19:24', properties['datetime_end'])
+        self.assertEqual([12, 3357, 2146], properties['tile'])
+
+    def test_cluster_aggregates_points(self):
+        cluster_index = ClusterIndex([1])
+        cluster_index.add(10, 10, {'datetime': '2023-05-05 06:19:24'})
+        cluster_index.add(20, 20, {'datetime': '2023-05-04 06:19:24'})
+        cluster_index.add(30, 30, {})
+        features = list(cluster_index.iter_features(1))
+        self.assertEqual(1, len(features))
+        self.assertEqual([20, 20], features[0]['geometry']['coordinates'])
+        properties = features[0]['properties']
+        self.assertEqual(3, properties['point_count'])
+        self.assertEqual('2023-05-04 06:19:24', properties['datetime_start'])
+        self.assertEqual('2023-05-05 06:19:24', properties['datetime_end'])
+
+    def test_clusters_per_zoom(self):
+        cluster_index = ClusterIndex([0, 1])
+        cluster_index.add(10, 10)
+        cluster_index.add(-10, -10)
+        self.assertEqual(1, len(list(cluster_index.iter_features(0))))
+        self.assertEqual(2, len(list(cluster_index.iter_features(1))))
+
+    def test_cluster_without_datetime(self):
+        cluster_index = ClusterIndex([0])
+        cluster_index.add(10, 10)
+        properties = next(cluster_index.iter_features(0))['properties']
+        self.assertIsNone(properties['datetime_start'])
+        self.assertIsNone(properties['datetime_end'])
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
@@ -0,0 +1,69 @@
+"""
+Tests for datetime_conversion
+"""
+
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from im2geojson.datetime_conversion import *
+
+
+class TestParseDatetime(unittest.TestCase):
+
+    def test_parse_datetime(self):
+        self.assertEqual(datetime(2023, 5, 5, 6, 19, 24), parse_datetime('2023:05:05 06:19:24'))
+
+    def test_parse_datetime_matches_strptime(self):
+        for datetime_str in ['2023:05:05 06:19:24', '1999:12:31 23:59:59', '2024:02:29 00:00:00',
+                             '2023:5:5 6:19:24', '２０２３:05:05 06:19:24']:
+            self.assertEqual(datetime.strptime(datetime_str, DATETIME_FORMAT), parse_datetime(datetime_str))
+
+    def test_parse_datetime_does_not_call_strptime(self):
+        with mock.patch('im2geojson.datetime_conversion.datetime') as mock_datetime:
+            parse_datetime('2023:05:05 06:19:24')
+        mock_datetime.strptime.assert_not_called()
+
+    def test_invalid_datetime_raises_strptime_exception(self):
+        for datetime_str in ['corrupted', '0000:00:00 00:00:00', '    :  :     :  :  ', '2023:02:30 00:00:00',
+                             '2023:05:05 24:00:00', '2023:05:05T06:19:24']:
+            with self.assertRaises(ValueError) as expected:
+                datetime.strptime(datetime_str, DATETIME_FORMAT)
+            with self.assertRaises(ValueError) as raised:
+                parse_datetime(datetime_str)
+            self.assertEqual(str(expected.exception), str(raised.exception))
+
+    def test_parse_datetime_cached(self):
+        parse_datetime_cached.cache_clear()
+        parse_datetime_cached('2023:05:05 06:19:24')
+        parse_datetime_cached('2023:05:05 06:19:24')
+        self.assertEqual(1, parse_datetime_cached.cache_info().hits)
+
+
+class TestParseSubsec(unittest.TestCase):
+
+    def test_parse_subsec(self):
+        self.assertEqual(477000, parse_subsec('477'))
+        self.assertEqual(50000, parse_subsec('05'))
+        self.assertEqual(123456, parse_subsec('1234567'))
+        self.assertEqual(477000, parse_subsec('477 '))
+
+    def test_invalid_subsec_returns_none(self):
+        for subsec_str in [None, '', '   ', 'abc', '-1']:
+            self.assertIsNone(parse_subsec(subsec_str))
+
+
+class TestParseOffset(unittest.TestCase):
+
+    def test_parse_offset(self):
+        self.assertEqual(timezone(timedelta(hours=8)), parse_offset('+08:00'))
+        self.assertEqual(timezone(-timedelta(hours=3, minutes=30)), parse_offset('-03:30'))
+
+    def test_invalid_offset_returns_none(self):
+        for offset_str in [None, '', '08:00', '+8:00', '+24:00', '+08:60', '+0a:00', '   :  ']:
+            self.assertIsNone(parse_offset(offset_str))
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
@@ -0,0 +1,147 @@
+"""
+Tests for deadlines
+"""
+
+import unittest
+import threading
+
+from im2geojson.deadlines import *
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadlines(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_no_timeouts(self):
+        deadlines = Deadlines(clock=self.clock)
+        self.assertEqual(1, deadlines.run('a.jpg', lambda: 1))
+        self.clock.now = 1000.0
+        self.assertIsNone(deadlines.timeout())
+        self.assertEqual([], deadlines.expired(['a.jpg'], ['b.jpg']))
+        self.assertFalse(deadlines.expired_any)
+
+    def test_file_timeout(self):
+        deadlines = Deadlines(file_timeout=2.0, clock=self.clock)
+        self.assertEqual(2.0, deadlines.timeout())
+        deadlines.run('a.jpg', lambda: None)
+        self.clock.now = 1.0
+        deadlines.run('b.jpg', lambda: None)
+        self.assertEqual(1.0, deadlines.timeout())
+        self.assertEqual([], deadlines.expired(['a.jpg', 'b.jpg', 'c.jpg']))
+
+        self.clock.now = 2.0
+        expired = deadlines.expired(['a.jpg', 'b.jpg', 'c.jpg'], ['d.jpg'])
+        self.assertEqual(['a.jpg'], [key for key, _ in expired])
+        self.assertIsInstance(expired[0][1], DeadlineExceeded)
+        self.assertIsInstance(expired[0][1], TimeoutError)
+        self.assertEqual('TimeoutError: Not processed within 2.0 seconds', str(expired[0][1]))
+        self.assertTrue(deadlines.expired_any)
+        self.assertEqual(1.0, deadlines.timeout())
+
+    def test_run_keeps_first_start(self):
+        deadlines = Deadlines(file_timeout=2.0, clock=self.clock)
+        deadlines.run('a.jpg', lambda: None)
+        self.clock.now = 1.5
+        deadlines.run('a.jpg', lambda: None)
+        self.assertEqual(0.5, deadlines.timeout())
+
+    def test_discard(self):
+        deadlines = Deadlines(file_timeout=2.0, clock=self.clock)
+        deadlines.run('a.jpg', lambda: None)
+        deadlines.discard('a.jpg')
+        self.clock.now = 5.0
+        # Images started from now expire no sooner than the file timeout
+        self.assertEqual(2.0, deadlines.timeout())
+        self.assertEqual([], deadlines.expired(['a.jpg']))
+
+    def test_run_timeout(self):
+        deadlines = Deadlines(file_timeout=10.0, run_timeout=3.0, clock=self.clock)
+        deadlines.run('a.jpg', lambda: None)
+        self.assertEqual(3.0, deadlines.timeout())
+        self.clock.now = 3.0
+        self.assertEqual(0.0, deadlines.timeout())
+        expired = deadlines.expired(['a.jpg'], iter(['b.jpg']))
+        self.assertEqual(['a.jpg', 'b.jpg'], [key for key, _ in expired])
+        self.assertEqual('TimeoutError: Run not completed within 3.0 seconds', str(expired[1][1]))
+
+    def test_invalid_timeout_raises_exception(self):
+        with self.assertRaises(ValueError):
+            Deadlines(file_timeout=0)
+        with self.assertRaises(ValueError):
+            Deadlines(run_timeout=-1)
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def test_submit(self):
+        pool = WorkerPool(max_workers=2)
+        self.assertEqual(3, pool.submit(sum, [1, 2]).result())
+        pool.shutdown()
+
+    def test_replace_moves_work_not_started(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def stuck():
+            started.set()
+            release.wait(5)
+            return 'stuck'
+
+        pool = WorkerPool(max_workers=1)
+        stuck_future = pool.submit(stuck)
+        started.wait(5)
+        waiting_future = pool.submit(str.upper, 'moved')
+        moved = pool.replace()
+        self.assertEqual([waiting_future], list(moved))
+        self.assertTrue(waiting_future.cancelled())
+        self.assertEqual('MOVED', moved[waiting_future].result(timeout=5))
+        self.assertEqual(1, pool.replaced)
+
+        release.set()
+        self.assertEqual('stuck', stuck_future.result(timeout=5))
+        pool.shutdown()
+
+    def test_workers_are_daemon_threads(self):
+        pool = WorkerPool(max_workers=1)
+        thread = pool.submit(threading.current_thread).result(timeout=5)
+        self.assertTrue(thread.daemon)
+        pool.shutdown()
+        self.assertFalse(thread.is_alive())
+
+    def test_shutdown_cancels_work_not_started(self):
+        release = threading.Event()
+        pool = WorkerPool(max_workers=1)
+        running_future = pool.submit(release.wait, 5)
+        waiting_future = pool.submit(str.upper, 'cancelled')
+        pool.shutdown(wait=False)
+        self.assertTrue(waiting_future.cancelled())
+        release.set()
+        self.assertTrue(running_future.result(timeout=5))
+
+    def test_invalid_max_workers_raises_exception(self):
+        with self.assertRaises(ValueError):
+            WorkerPool(max_workers=0)
+
+
+class TestFailedFuture(unittest.TestCase):
+
+    def test_failed_future(self):
+        future = failed_future(DeadlineExceeded('TimeoutError: late'))
+        self.assertTrue(future.done())
+        with self.assertRaises(DeadlineExceeded):
+            future.result()
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
@@ -0,0 +1,79 @@
+"""
+Tests for error_sink
+"""
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+
+from im2geojson.error_sink import *
+
+
+class TestErrorSink(unittest.TestCase):
+
+    def setUp(self):
+        self.output_directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.output_directory, ERRORS_FILENAME)
+        self.sink = ErrorSink(self.path, max_samples=2)
+
+    def tearDown(self):
+        self.sink.close()
+        shutil.rmtree(self.output_directory)
+
+    def read_lines(self):
+        with open(self.path, 'r') as f:
+            return [json.loads(line) for line in f]
+
+    def test_no_errors(self):
+        self.assertEqual(0, self.sink.count)
+        self.assertEqual({}, self.sink.read())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_add_writes_as_errors_occur(self):
+        self.sink.add('folder/A.jpg', 'KeyError: No metadata.', 'KeyError')
+        self.assertEqual([{'file': 'folder/A.jpg', 'class': 'KeyError', 'error': 'KeyError: No metadata.'}],
+                         self.read_lines())
+
+    def test_add_keeps_counts_and_bounded_samples(self):
+        for i in range(1000):
+            self.sink.add(f'folder/{i}.jpg', f'ValueError: {i}', 'ValueError' if i % 4 else 'KeyError')
+        self.assertEqual(1000, self.sink.count)
+        self.assertEqual({'ValueError': 750, 'KeyError': 250}, self.sink.counts)
+        self.assertEqual([('folder/0.jpg', 'ValueError: 0'), ('folder/1.jpg', 'ValueError: 1')], self.sink.samples)
+        self.assertEqual(1000, len(self.read_lines()))
+
+    def test_read(self):
+        self.sink.add('folder/A.jpg', 'first', 'KeyError')
+        self.sink.add('folder/B.jpg', 'second', 'ValueError')
+        self.sink.add('folder/A.jpg', 'third', 'KeyError')
+        self.assertEqual({'folder/A.jpg': 'third', 'folder/B.jpg': 'second'}, self.sink.read())
+
+    def test_creation_removes_earlier_run(self):
+        with open(self.path, 'w') as f:
+            f.write('{"file": "old.jpg", "class": "Error", "error": "old"}\n')
+        sink = ErrorSink(self.path)
+        self.assertFalse(os.path.exists(self.path))
+        sink.add('folder/A.jpg', 'new', 'KeyError')
+        self.assertEqual({'folder/A.jpg': 'new'}, sink.read())
+        sink.close()
+
+    def test_add_after_close_appends(self):
+        self.sink.add('folder/A.jpg', 'first', 'KeyError')
+        self.sink.close()
+        self.sink.add('folder/B.jpg', 'second', 'KeyError')
+        self.assertEqual(['folder/A.jpg', 'folder/B.jpg'], [line['file'] for line in self.read_lines()])
+
+    def test_summary(self):
+        for i in range(5):
+            self.sink.add(f'folder/{i}.jpg', f'error {i}', 'KeyError' if i else 'ValueError')
+        lines = self.sink.summary().split('\n')
+        self.assertEqual(['folder/0.jpg: error 0', 'folder/1.jpg: error 1', '... and 3 more',
+                          'KeyError: 4, ValueError: 1'], lines[:4])
+        self.assertEqual(f'All errors saved to {os.path.normpath(self.path)}', lines[4])
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
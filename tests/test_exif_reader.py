@@ -4,10 +4,21 @@ Tests for exif_reader
 
 import unittest
 import os
+import io
+import shutil
+import tempfile
+import warnings
+import concurrent.futures
 
 from exif import Image
+from unittest import mock
 
-from im2geojson.exif_reader import read_exif
+from im2geojson.exif_reader import read_exif, read_exif_bytes, read_exif_stream, _parse_exif_bytes
+from im2geojson.exif_reader import Prefetcher, advise_willneed
+from im2geojson import exif_reader
+from im2geojson.exif_reader import read_xmp
+from im2geojson.prefilter import RejectedImageError, NoExifError, NoGPSError, PREFILTER_SIZE
+from tests.test_xmp_reader import build_xmp_jpeg, XMP_ATTRIBUTES, XMP_ELEMENTS
 
 
 class TestExif(unittest.TestCase):
@@ -29,11 +40,36 @@ class TestExif(unittest.TestCase):
         coord, props, image_b, thumb_b = read_exif(self.filepath, get_image=False, get_thumbnail=False)
         self.assertEqual(props['datetime'], datetime)
 
+    def test_read_exif_datetime_iso(self):
+        coord, props, image_b, thumb_b = read_exif(self.filepath, get_image=False, get_thumbnail=False)
+        self.assertEqual('2023-05-05T06:19:24.477000+08:00', props['datetime_iso'])
+
+    def test_read_exif_properties(self):
+        coord, props, image_b, thumb_b = read_exif(self.filepath, properties=['altitude', 'make'])
+        self.assertEqual(3.824946, props['altitude'])
+        self.assertEqual('Apple', props['make'])
+        self.assertNotIn('model', props)
+
     def test_read_exif_thumbnail_file(self):
         coord, props, image_b, thumb_b = read_exif(self.filepath, get_image=False, get_thumbnail=True)
         self.assertIsNotNone(thumb_b)
         self.assertIsNone(image_b)
 
+    def test_read_exif_thumbnail_is_view(self):
+        with open(self.filepath, 'rb') as f:
+            expected = Image(f.read()).get_thumbnail()
+        for get_image in [False, True]:
+            thumb_b = read_exif(self.filepath, get_image=get_image, get_thumbnail=True)[3]
+            self.assertIsInstance(thumb_b, memoryview)
+            self.assertEqual(expected, bytes(thumb_b))
+
+    def test_read_exif_thumbnail_falls_back_to_exif(self):
+        with open(self.filepath, 'rb') as f:
+            image_b = f.read()
+        with mock.patch.object(exif_reader, 'find_thumbnail', return_value=None):
+            thumb_b = read_exif_bytes(image_b, get_thumbnail=True)[3]
+        self.assertEqual(Image(image_b).get_thumbnail(), thumb_b)
+
     def test_read_exif_image_file(self):
         coord, props, image_b, thumb_b = read_exif(self.filepath, get_image=True, get_thumbnail=False)
         self.assertIsNotNone(image_b)
@@ -54,6 +90,145 @@ class TestExif(unittest.TestCase):
         self.assertIn('No such file or directory', captured.records[0].getMessage())
 
 
+class TestExifBytesAndStream(unittest.TestCase):
+
+    def setUp(self):
+        self.filepath = 'tests/test_files/test_images/test_exif/test_folder/EXIF.jpg'
+        with open(self.filepath, 'rb') as f:
+            self.image_b = f.read()
+
+    def test_read_exif_bytes_matches_read_exif(self):
+        self.assertEqual(read_exif(self.filepath, get_thumbnail=True),
+                         read_exif_bytes(self.image_b, get_thumbnail=True))
+
+    def test_read_exif_bytes_memoryview(self):
+        coord, props, image_b, thumb_b = read_exif_bytes(memoryview(self.image_b))
+        self.assertEqual((-8.631053, 115.095269), coord)
+
+    def test_read_exif_stream_matches_read_exif(self):
+        self.assertEqual(read_exif(self.filepath, get_thumbnail=True),
+                         read_exif_stream(io.BytesIO(self.image_b), get_thumbnail=True))
+
+    def test_read_exif_stream_reads_only_metadata(self):
+        stream = io.BytesIO(self.image_b)
+        coord, props, image_b, thumb_b = read_exif_stream(stream)
+        self.assertEqual('2023-05-05 06:19:24', props['datetime'])
+        self.assertLess(stream.tell(), 100 * 1024)
+
+    def test_read_exif_stream_get_image_reads_all(self):
+        stream = io.BytesIO(self.image_b)
+        coord, props, image_b, thumb_b = read_exif_stream(stream, get_image=True)
+        self.assertEqual(len(self.image_b), stream.tell())
+        self.assertIsNotNone(image_b)
+
+    def test_read_exif_stream_errors_match_read_exif(self):
+        in_path = 'tests/test_files/test_images/'
+        for file_dir in ['test_no_exif/test_folder/NO_EXIF.jpg',
+                         'test_missing_exif/test_folder/MISSING_EXIF.jpg',
+                         'test_missing_datetime/test_folder/MISSING_DATETIME.jpg',
+                         'test_corrupted_datetime/test_folder/CORRUPTED_DATETIME.jpg',
+                         'test_corrupted_exif/test_folder/CORRUPTED_EXIF.jpg']:
+            with open(os.path.join(in_path, file_dir), 'rb') as f:
+                image_b = f.read()
+            with self.assertRaises(Exception) as expected:
+                read_exif_bytes(image_b)
+            with self.assertRaises(Exception) as raised:
+                read_exif_stream(io.BytesIO(image_b))
+            self.assertEqual(repr(expected.exception), repr(raised.exception))
+
+    def test_prefilter_errors_match_full_parse(self):
+        in_path = 'tests/test_files/test_images/'
+        for file_dir in ['test_no_exif/test_folder/NO_EXIF.jpg',
+                         'test_missing_exif/test_folder/MISSING_EXIF.jpg']:
+            with open(os.path.join(in_path, file_dir), 'rb') as f:
+                image_b = f.read()
+            with self.assertRaises(RejectedImageError) as rejected:
+                read_exif_bytes(image_b)
+            with self.assertRaises(Exception) as parsed:
+                _parse_exif_bytes(image_b)
+            self.assertIsInstance(rejected.exception, type(parsed.exception))
+            self.assertEqual(str(parsed.exception), str(rejected.exception))
+
+    def test_read_exif_stream_prefilter_reads_only_head(self):
+        with open('tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg', 'rb') as f:
+            stream = io.BytesIO(f.read())
+        with self.assertRaises(RejectedImageError):
+            read_exif_stream(stream, get_image=True)
+        self.assertEqual(PREFILTER_SIZE, stream.tell())
+
+    def test_read_exif_stream_not_jpeg(self):
+        with self.assertRaises(KeyError):
+            read_exif_stream(io.BytesIO(b'not a jpeg'))
+
+
+@unittest.skipUnless(exif_reader.HAS_FADVISE, 'requires os.posix_fadvise')
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.filepath = 'tests/test_files/test_images/test_exif/test_folder/EXIF.jpg'
+
+    def test_advise_willneed(self):
+        with mock.patch('os.posix_fadvise') as fadvise:
+            advise_willneed(self.filepath, 4096)
+        fadvise.assert_called_once_with(mock.ANY, 0, 4096, os.POSIX_FADV_WILLNEED)
+
+    def test_advise_willneed_missing_file(self):
+        with mock.patch('os.posix_fadvise') as fadvise:
+            advise_willneed('NO_EXIST.jpg')
+        fadvise.assert_not_called()
+
+    def test_read_exif_drop_cache(self):
+        with mock.patch('os.posix_fadvise') as fadvise:
+            self.assertEqual(read_exif(self.filepath), read_exif(self.filepath, drop_cache=True))
+        fadvise.assert_called_once_with(mock.ANY, 0, 0, os.POSIX_FADV_DONTNEED)
+
+    def test_prefetcher(self):
+        with mock.patch('im2geojson.exif_reader.advise_willneed') as advise:
+            prefetcher = Prefetcher(['a.jpg', 'b.jpg', 'c.jpg'], depth=2, size=1024)
+            self.assertEqual([mock.call('a.jpg', 1024), mock.call('b.jpg', 1024)], advise.call_args_list)
+            prefetcher.advance()
+            prefetcher.advance()
+        self.assertEqual(3, advise.call_count)
+        advise.assert_called_with('c.jpg', 1024)
+
+
+class TestReadSize(unittest.TestCase):
+
+    def test_read_exif_stream_read_size(self):
+        with open('tests/test_files/test_images/test_exif/test_folder/EXIF.jpg', 'rb') as f:
+            image_b = f.read()
+        stream = io.BytesIO(image_b)
+        self.assertEqual(read_exif_bytes(image_b), read_exif_stream(stream, read_size=1024))
+        self.assertLess(stream.tell(), 16 * 1024)
+        stream = io.BytesIO(image_b)
+        read_exif_stream(stream)
+        self.assertGreater(stream.tell(), 64 * 1024)
+
+
+class TestExifConcurrentStrip(unittest.TestCase):
+
+    def setUp(self):
+        self.in_path = 'tests/test_files/test_images/test_small_image/'
+        self.file_dir = 'test_folder/SMALL_IMAGE.jpg'
+        self.filepath = os.path.join(self.in_path, self.file_dir)
+        self.iterations = 1000
+
+    def _strip(self, _):
+        coord, props, image_b, thumb_b = read_exif(self.filepath, get_image=True, get_thumbnail=False)
+        return image_b
+
+    def test_concurrent_strip_matches_serial_strip(self):
+        expected = self._strip(None)
+        filters = list(warnings.filters)
+        with warnings.catch_warnings(record=True) as caught:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
+                results = list(executor.map(self._strip, range(self.iterations)))
+        self.assertEqual(self.iterations, len(results))
+        self.assertTrue(all(image_b == expected for image_b in results))
+        self.assertEqual([], caught)
+        self.assertEqual(filters, warnings.filters)
+
+
 class TestExifFromImageTypes(unittest.TestCase):
 
     def setUp(self):
@@ -138,6 +313,80 @@ class TestCorruptedDatetime(unittest.TestCase):
         self.assertEqual("ValueError: time data 'corrupted' does not match format '%Y:%m:%d %H:%M:%S'", str(e.exception))
 
 
+class TestXMPFallback(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.no_exif_path = 'tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg'
+        self.missing_exif_path = 'tests/test_files/test_images/test_missing_exif/test_folder/MISSING_EXIF.jpg'
+        self.expected_coord = (-8.631053, 115.095269)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def copy(self, path, filename):
+        filepath = os.path.join(self.directory, filename)
+        shutil.copyfile(path, filepath)
+        return filepath
+
+    def test_read_exif_embedded_xmp(self):
+        with open(self.no_exif_path, 'rb') as f:
+            image_b = build_xmp_jpeg(f.read())
+        filepath = os.path.join(self.directory, 'IMG.jpg')
+        with open(filepath, 'wb') as f:
+            f.write(image_b)
+        for result in [read_exif(filepath, get_image=True, get_thumbnail=True, xmp=True),
+                       read_exif_bytes(image_b, xmp=True)]:
+            coord, props, image_b, thumb_b = result
+            self.assertEqual(self.expected_coord, coord)
+            self.assertEqual({'datetime': '2023-05-05 06:19:24', 'datetime_iso': '2023-05-05T06:19:24.512000+08:00'}, props)
+            self.assertIsNone(image_b)
+            self.assertIsNone(thumb_b)
+
+    def test_read_exif_sidecar(self):
+        for sidecar in ['IMG.xmp', 'IMG.jpg.xmp']:
+            with self.subTest(sidecar=sidecar):
+                filepath = self.copy(self.missing_exif_path, 'IMG.jpg')
+                with open(os.path.join(self.directory, sidecar), 'wb') as f:
+                    f.write(XMP_ELEMENTS)
+                coord, props, image_b, thumb_b = read_exif(filepath, xmp=True)
+                self.assertEqual(self.expected_coord, coord)
+                self.assertEqual({'datetime': '2023-05-05 06:19:24'}, props)
+                os.remove(os.path.join(self.directory, sidecar))
+
+    def test_xmp_not_read_by_default(self):
+        filepath = self.copy(self.no_exif_path, 'IMG.jpg')
+        with open(os.path.join(self.directory, 'IMG.xmp'), 'wb') as f:
+            f.write(XMP_ELEMENTS)
+        with self.assertRaises(NoExifError):
+            read_exif(filepath)
+
+    def test_xmp_not_read_for_exif_gps(self):
+        with mock.patch('im2geojson.exif_reader.read_xmp') as read_xmp_mock:
+            read_exif('tests/test_files/test_images/test_exif/test_folder/EXIF.jpg', xmp=True)
+        read_xmp_mock.assert_not_called()
+
+    def test_no_xmp_raises_exif_error(self):
+        filepath = self.copy(self.missing_exif_path, 'IMG.jpg')
+        with self.assertRaises(AttributeError) as e:
+            read_exif(filepath, xmp=True)
+        self.assertEqual('AttributeError: image does not have attribute gps_latitude', str(e.exception))
+
+    def test_read_xmp_incomplete_raises_error(self):
+        error = NoGPSError('AttributeError: image does not have attribute gps_latitude')
+        with open(self.no_exif_path, 'rb') as f:
+            image_b = build_xmp_jpeg(f.read(), XMP_ATTRIBUTES.replace(b'exif:DateTimeOriginal', b'exif:Other'))
+        with self.assertRaises(NoGPSError) as e:
+            read_xmp(error, image_b=image_b)
+        self.assertIs(error, e.exception)
+
+    def test_read_xmp_invalid_coordinate_raises_exception(self):
+        with open(self.no_exif_path, 'rb') as f:
+            image_b = build_xmp_jpeg(f.read(), XMP_ATTRIBUTES.replace(b'8,37.86318S', b'8,37.86318X'))
+        with self.assertRaises(ValueError) as e:
+            read_xmp(KeyError('KeyError: No metadata.'), image_b=image_b)
+        self.assertEqual('ValueError: Invalid GPS Reference X, Expecting N, S, E or W', str(e.exception))
+
 
 if __name__ == '__main__':
-    unittest.main()             # pragma: no cover
\ No newline at end of file
+    unittest.main()             # pragma: no cover
@@ -0,0 +1,142 @@
+"""
+Tests for exporters
+"""
+
+import unittest
+import os
+import json
+import shutil
+import struct
+import sqlite3
+
+from im2geojson.exporters import *
+
+
+try:
+    import pyarrow.parquet
+except ImportError:             # pragma: no cover
+    pyarrow = None
+
+
+class TestExporterBaseClass(unittest.TestCase):
+
+    def setUp(self):
+        self.output_directory = 'tests/assets/'
+        os.makedirs(self.output_directory, exist_ok=True)
+
+    def tearDown(self):
+        if os.path.isdir(self.output_directory):
+            shutil.rmtree(self.output_directory)
+
+    def add_features(self, exporter):
+        exporter.add_feature('folder_a', -8.631053, 115.095269, { 'datetime': '2023-05-05 06:19:24', 'filename': 'A.jpg' }, 'parent')
+        exporter.add_feature('folder_a', -8.5, 115.5, { 'datetime': '2023-05-05 06:19:25', 'filename': 'B.jpg' }, 'parent')
+        exporter.add_feature('folder_b', 51.5, -0.1, { 'filename': 'C.jpg' })
+
+
+class TestGetExporter(TestExporterBaseClass):
+
+    def test_gpkg_exporter(self):
+        with get_exporter('gpkg', self.output_directory) as exporter:
+            self.assertIsInstance(exporter, GeoPackageExporter)
+            self.assertEqual(os.path.join(self.output_directory, 'features.gpkg'), exporter.file_path)
+
+    def test_invalid_format_raises_exception(self):
+        with self.assertRaises(ValueError):
+            get_exporter('shp', self.output_directory)
+
+
+class TestPointWKB(unittest.TestCase):
+
+    def test_point_wkb(self):
+        wkb = point_wkb(-8.631053, 115.095269)
+        self.assertEqual(21, len(wkb))
+        self.assertEqual((1, 1, 115.095269, -8.631053), struct.unpack('<BIdd', wkb))
+
+
+class TestGeoPackageExporter(TestExporterBaseClass):
+
+    def setUp(self):
+        super().setUp()
+        self.file_path = os.path.join(self.output_directory, 'features.gpkg')
+
+    def query(self, sql, *args):
+        connection = sqlite3.connect(self.file_path)
+        try:
+            return connection.execute(sql, args).fetchall()
+        finally:
+            connection.close()
+
+    def test_application_id(self):
+        GeoPackageExporter(self.file_path).close()
+        self.assertEqual([(GPKG_APPLICATION_ID,)], self.query('PRAGMA application_id'))
+
+    def test_features(self):
+        with GeoPackageExporter(self.file_path) as exporter:
+            self.add_features(exporter)
+        self.assertEqual(3, exporter.count)
+        rows = self.query('SELECT fid, collection, parent, datetime, filename, properties FROM features ORDER BY fid')
+        self.assertEqual((1, 'folder_a', 'parent', '2023-05-05 06:19:24', 'A.jpg'), rows[0][:5])
+        self.assertEqual({ 'datetime': '2023-05-05 06:19:24', 'filename': 'A.jpg' }, json.loads(rows[0][5]))
+        self.assertEqual((3, 'folder_b', None, None, 'C.jpg'), rows[2][:5])
+
+    def test_geometry_blob(self):
+        with GeoPackageExporter(self.file_path) as exporter:
+            self.add_features(exporter)
+        (blob,), = self.query('SELECT geom FROM features WHERE fid = 1')
+        self.assertEqual(b'GP', blob[:2])
+        self.assertEqual((0, 1, 4326), struct.unpack('<BBi', blob[2:8]))
+        self.assertEqual((1, 1, 115.095269, -8.631053), struct.unpack('<BIdd', blob[8:]))
+
+    def test_rtree_index(self):
+        with GeoPackageExporter(self.file_path) as exporter:
+            self.add_features(exporter)
+        rows = self.query('SELECT id FROM rtree_features_geom WHERE minx >= ? AND maxx <= ? AND miny >= ? AND maxy <= ? ORDER BY id',
+                          115, 116, -9, -8)
+        self.assertEqual([(1,), (2,)], rows)
+
+    def test_contents_extent(self):
+        with GeoPackageExporter(self.file_path) as exporter:
+            self.add_features(exporter)
+        rows = self.query('SELECT min_x, min_y, max_x, max_y FROM gpkg_contents WHERE table_name = ?', 'features')
+        self.assertEqual([(-0.1, -8.631053, 115.5, 51.5)], rows)
+
+    def test_writes_in_batches(self):
+        exporter = GeoPackageExporter(self.file_path, batch_size=2)
+        self.add_features(exporter)
+        self.assertEqual([(2,)], self.query('SELECT COUNT(*) FROM features'))
+        exporter.close()
+        self.assertEqual([(3,)], self.query('SELECT COUNT(*) FROM features'))
+        self.assertEqual([(3,)], self.query('SELECT COUNT(*) FROM rtree_features_geom'))
+
+    def test_replaces_existing_file(self):
+        with GeoPackageExporter(self.file_path) as exporter:
+            self.add_features(exporter)
+        with GeoPackageExporter(self.file_path) as exporter:
+            exporter.add_feature('folder_c', 0, 0, {})
+        self.assertEqual([(1,)], self.query('SELECT COUNT(*) FROM features'))
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestGeoParquetExporter(TestExporterBaseClass):
+
+    def setUp(self):
+        super().setUp()
+        self.file_path = os.path.join(self.output_directory, 'features.parquet')
+
+    def test_features(self):
+        with GeoParquetExporter(self.file_path, batch_size=2) as exporter:
+            self.add_features(exporter)
+        parquet_file = pyarrow.parquet.ParquetFile(self.file_path)
+        self.assertEqual(2, parquet_file.num_row_groups)
+        table = parquet_file.read()
+        self.assertEqual(['folder_a', 'folder_a', 'folder_b'], table.column('collection').to_pylist())
+        self.assertEqual(point_wkb(-8.631053, 115.095269), table.column('geometry').to_pylist()[0])
+        geo_metadata = json.loads(table.schema.metadata[b'geo'])
+        self.assertEqual('geometry', geo_metadata['primary_column'])
+        self.assertEqual('WKB', geo_metadata['columns']['geometry']['encoding'])
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
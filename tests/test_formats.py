@@ -0,0 +1,237 @@
+"""
+Tests for formats
+"""
+
+import unittest
+import io
+import os
+import mmap
+import shutil
+import struct
+import tempfile
+import zlib
+
+from im2geojson.formats import *
+from im2geojson.ifd_reader import find_exif_segment
+from im2geojson.exif_reader import read_exif, read_exif_bytes, read_exif_stream, find_format, _read_image_bytes
+from im2geojson.prefilter import NoExifError, NoGPSError
+from tests.test_ifd_reader import build_tiff
+
+EXIF_JPG = 'tests/test_files/test_images/test_exif/test_folder/EXIF.jpg'
+
+
+def exif_tiff():
+    """bytes: Return the TIFF metadata of the EXIF.jpg test image."""
+    with open(EXIF_JPG, 'rb') as f:
+        image_b = f.read()
+    start, end = find_exif_segment(image_b)
+    return image_b[start:end]
+
+def build_png(tiff, image_data=b'\x00' * 9):
+    """bytes: Return a PNG with an 'eXIf' chunk holding `tiff` between its header and `image_data`."""
+    def chunk(chunk_type, data):
+        return struct.pack('>L', len(data)) + chunk_type + data + struct.pack('>L', zlib.crc32(chunk_type + data))
+    ihdr = struct.pack('>LLBBBBB', 1, 1, 8, 2, 0, 0, 0)
+    return PNG_SIGNATURE + chunk(b'IHDR', ihdr) + chunk(b'eXIf', tiff) + chunk(b'IDAT', image_data) + chunk(b'IEND', b'')
+
+def build_webp(tiff):
+    """bytes: Return a WebP with an 'EXIF' chunk holding `tiff` after an odd length image chunk."""
+    def chunk(fourcc, data):
+        return fourcc + struct.pack('<L', len(data)) + data + b'\x00' * (len(data) & 1)
+    body = WEBP + chunk(b'VP8X', b'\x08' + b'\x00' * 9) + chunk(b'VP8L', b'\x00' * 5) + chunk(b'EXIF', tiff)
+    return RIFF + struct.pack('<L', len(body)) + body
+
+def build_heif(tiff, brand=b'heic'):
+    """bytes: Return a HEIF with an image item and an 'Exif' item holding `tiff`, stored in 'mdat'."""
+    def box(box_type, data):
+        return struct.pack('>L', 8 + len(data)) + box_type + data
+
+    def infe(item_id, item_type):
+        return box(b'infe', b'\x02\x00\x00\x00' + struct.pack('>HH', item_id, 0) + item_type + b'\x00')
+
+    ftyp = box(FTYP, brand + b'\x00\x00\x00\x00' + b'mif1' + brand)
+    iinf = box(b'iinf', b'\x00\x00\x00\x00' + struct.pack('>H', 2) + infe(1, b'hvc1') + infe(2, EXIF_ITEM_TYPE))
+    image = b'\x00' * 16
+    exif_item = struct.pack('>L', 0) + tiff
+
+    def meta(mdat_offset):
+        extents = [(1, mdat_offset, len(image)), (2, mdat_offset + len(image), len(exif_item))]
+        iloc = b'\x00\x00\x00\x00' + b'\x44\x00' + struct.pack('>H', len(extents))
+        for item_id, offset, length in extents:
+            iloc += struct.pack('>HHHLL', item_id, 0, 1, offset, length)
+        return box(b'meta', b'\x00\x00\x00\x00' + iinf + box(b'iloc', iloc))
+
+    mdat_offset = len(ftyp) + len(meta(0)) + 8
+    return ftyp + meta(mdat_offset) + box(b'mdat', image + exif_item)
+
+
+class TestMatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tiff = exif_tiff()
+
+    def test_match(self):
+        self.assertTrue(is_tiff(self.tiff))
+        self.assertTrue(is_png(build_png(self.tiff)))
+        self.assertTrue(is_webp(build_webp(self.tiff)))
+        self.assertTrue(is_heif(build_heif(self.tiff)))
+        self.assertTrue(is_heif(build_heif(self.tiff, brand=b'avif')))
+
+    def test_no_match(self):
+        with open(EXIF_JPG, 'rb') as f:
+            head = f.read(4096)
+        for match in (is_tiff, is_png, is_webp, is_heif):
+            self.assertFalse(match(head))
+            self.assertFalse(match(b''))
+        self.assertFalse(is_heif(struct.pack('>L', 16) + FTYP + b'isom\x00\x00\x00\x00'))
+
+    def test_find_format(self):
+        self.assertEqual('tiff', find_format(self.tiff).name)
+        self.assertEqual('png', find_format(build_png(self.tiff)).name)
+        self.assertEqual('webp', find_format(build_webp(self.tiff)).name)
+        self.assertEqual('heif', find_format(build_heif(self.tiff)).name)
+        self.assertIsNone(find_format(b'not an image'))
+
+
+class TestFind(unittest.TestCase):
+
+    def setUp(self):
+        self.tiff = exif_tiff()
+
+    def assertFinds(self, find, data):
+        start, end = find(data)
+        self.assertEqual(self.tiff, data[start:end])
+
+    def test_find_tiff(self):
+        self.assertFinds(find_tiff, self.tiff)
+
+    def test_find_png_exif(self):
+        self.assertFinds(find_png_exif, build_png(self.tiff))
+        self.assertFinds(find_png_exif, build_png(b'Exif\x00\x00' + self.tiff))
+
+    def test_find_webp_exif(self):
+        self.assertFinds(find_webp_exif, build_webp(self.tiff))
+        self.assertFinds(find_webp_exif, build_webp(b'Exif\x00\x00' + self.tiff))
+
+    def test_find_heif_exif(self):
+        self.assertFinds(find_heif_exif, build_heif(self.tiff))
+
+    def test_not_found(self):
+        png = build_png(self.tiff).replace(b'eXIf', b'tEXt')
+        self.assertIsNone(find_png_exif(png))
+        webp = build_webp(self.tiff).replace(b'EXIF', b'XMP ')
+        self.assertIsNone(find_webp_exif(webp))
+        heif = build_heif(self.tiff).replace(EXIF_ITEM_TYPE, b'mime')
+        self.assertIsNone(find_heif_exif(heif))
+
+    def test_truncated(self):
+        self.assertIsNone(find_png_exif(build_png(self.tiff)[:20]))
+        self.assertIsNone(find_webp_exif(build_webp(self.tiff)[:20]))
+        self.assertIsNone(find_heif_exif(build_heif(self.tiff)[:60]))
+
+
+class TestReadFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.tiff = exif_tiff()
+        self.expected = read_exif(EXIF_JPG, properties=['make', 'altitude'])
+        self.directory = tempfile.mkdtemp()
+        self.images = {
+            'EXIF.tiff': self.tiff,
+            'EXIF.png': build_png(self.tiff),
+            'EXIF.webp': build_webp(self.tiff),
+            'EXIF.heic': build_heif(self.tiff),
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_read_exif(self):
+        expected_coord, expected_props, _, _ = self.expected
+        expected_thumb_b = bytes(read_exif(EXIF_JPG, get_thumbnail=True)[3])
+        for filename, image_b in self.images.items():
+            filepath = os.path.join(self.directory, filename)
+            with open(filepath, 'wb') as f:
+                f.write(image_b)
+            with self.subTest(filename=filename):
+                coord, props, image_b, thumb_b = read_exif(filepath, get_thumbnail=True,
+                                                           properties=['make', 'altitude'], drop_cache=True)
+                self.assertEqual(expected_coord, coord)
+                self.assertEqual(expected_props, props)
+                self.assertIsNone(image_b)
+                self.assertIsInstance(thumb_b, memoryview)
+                self.assertEqual(expected_thumb_b, bytes(thumb_b))
+
+    def test_read_exif_bytes_and_stream(self):
+        expected = self.expected[:2]
+        for filename, image_b in self.images.items():
+            with self.subTest(filename=filename):
+                self.assertEqual(expected, read_exif_bytes(image_b, properties=['make', 'altitude'])[:2])
+                self.assertEqual(expected, read_exif_bytes(memoryview(image_b), properties=['make', 'altitude'])[:2])
+                self.assertEqual(expected, read_exif_stream(io.BytesIO(image_b), properties=['make', 'altitude'])[:2])
+
+    def test_get_image_raises_exception(self):
+        for filename, image_b in self.images.items():
+            filepath = os.path.join(self.directory, filename)
+            with open(filepath, 'wb') as f:
+                f.write(image_b)
+            with self.subTest(filename=filename):
+                with self.assertRaises(ValueError) as e:
+                    read_exif(filepath, get_image=True)
+                name = find_format(image_b).name
+                self.assertEqual(f'ValueError: Cannot save {name} images stripped of metadata, Expecting JPEG', str(e.exception))
+                with self.assertRaises(ValueError):
+                    read_exif_bytes(image_b, get_image=True)
+
+    def test_stream_read_up_to_metadata(self):
+        class Stream(io.RawIOBase):
+            # A stream that cannot be mapped or told, counting the bytes read
+            def __init__(self, data):
+                self._data = io.BytesIO(data)
+                self.read_count = 0
+            def readable(self):
+                return True
+            def read(self, size=-1):
+                chunk = self._data.read(size)
+                self.read_count += len(chunk)
+                return chunk
+        stream = Stream(build_png(self.tiff, b'\x00' * 1024 * 1024))
+        self.assertEqual(self.expected[:2], read_exif_stream(stream, properties=['make', 'altitude'], read_size=4096)[:2])
+        self.assertLess(stream.read_count, 64 * 1024)
+
+    def test_file_stream_mapped(self):
+        filepath = os.path.join(self.directory, 'EXIF.png')
+        with open(filepath, 'wb') as f:
+            f.write(build_png(self.tiff, b'\x00' * 1024 * 1024))
+        with open(filepath, 'rb') as f:
+            data = _read_image_bytes(f)
+            self.assertIsInstance(data, mmap.mmap)
+            data.close()
+            f.seek(0)
+            self.assertEqual(self.expected[:2], read_exif_stream(f, properties=['make', 'altitude'])[:2])
+
+    def test_no_metadata_raises_exception(self):
+        png = build_png(self.tiff).replace(b'eXIf', b'tEXt')
+        with self.assertRaises(NoExifError) as e:
+            read_exif_bytes(png)
+        self.assertEqual("'KeyError: No metadata.'", str(e.exception))
+
+    def test_no_gps_raises_exception(self):
+        with self.assertRaises(NoGPSError) as e:
+            read_exif_bytes(build_heif(build_tiff([])))
+        self.assertEqual('AttributeError: image does not have attribute gps_latitude', str(e.exception))
+
+    def test_no_datetime_raises_exception(self):
+        gps = [(0x0001, 2, 2, b'S\x00'), (0x0002, 5, 3, struct.pack('<6L', 8, 1, 37, 1, 0, 1)),
+               (0x0003, 2, 2, b'E\x00'), (0x0004, 5, 3, struct.pack('<6L', 115, 1, 5, 1, 0, 1))]
+        with self.assertRaises(AttributeError) as e:
+            read_exif_bytes(build_webp(build_tiff([], gps=gps)))
+        self.assertEqual('AttributeError: image does not have attribute datetime_original', str(e.exception))
+
+    def test_malformed_metadata_raises_exception(self):
+        with self.assertRaises(ValueError):
+            read_exif_bytes(build_png(self.tiff[:16]))
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
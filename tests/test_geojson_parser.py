@@ -20,7 +20,7 @@ class TestGeoJSONParser(unittest.TestCase):
             collection_title = test_title, lat=0, long=0, properties={}
         )
         self.assertTrue(test_title in geojson_parser._collections_dict)
-        self.assertEqual(1, len(geojson_parser._collections_dict[test_title]['features']))
+        self.assertEqual(1, len(geojson_parser.feature_collection(test_title)['features']))
 
     def test_feature_properties(self):
         geojson_parser = GeoJSONParser()
@@ -30,7 +30,7 @@ class TestGeoJSONParser(unittest.TestCase):
             collection_title = test_title, lat=0, long=0, properties={ 'filename': test_filename }
         )
         self.assertTrue(test_title in geojson_parser._collections_dict)
-        feature = geojson_parser._collections_dict[test_title]['features'][0]
+        feature = geojson_parser.feature_collection(test_title)['features'][0]
         properties = feature['properties']
         self.assertEqual(test_filename, properties['filename'])
 
@@ -42,11 +42,20 @@ class TestGeoJSONParser(unittest.TestCase):
         geojson_parser.add_feature(
             collection_title = test_title, lat=test_lat, long=test_long, properties={}
         )
-        feature = geojson_parser._collections_dict[test_title]['features'][0]
+        feature = geojson_parser.feature_collection(test_title)['features'][0]
         geometry = feature['geometry']
         coords = geometry['coordinates']
         self.assertEqual([test_long, test_lat], coords)
 
+    def test_contains_collection(self):
+        geojson_parser = GeoJSONParser()
+        test_title = 'Test_Title'
+        self.assertFalse(test_title in geojson_parser)
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=0, long=0, properties={}
+        )
+        self.assertTrue(test_title in geojson_parser)
+
     def test_add_second_feature(self):
         geojson_parser = GeoJSONParser()
         test_title = 'Test_Title'
@@ -56,7 +65,7 @@ class TestGeoJSONParser(unittest.TestCase):
         geojson_parser.add_feature(
             collection_title = test_title, lat=0, long=0, properties={}
         )
-        self.assertEqual(2, len(geojson_parser._collections_dict[test_title]['features']))
+        self.assertEqual(2, len(geojson_parser.feature_collection(test_title)['features']))
 
     def test_add_second_collection(self):
         geojson_parser = GeoJSONParser()
@@ -68,8 +77,8 @@ class TestGeoJSONParser(unittest.TestCase):
         geojson_parser.add_feature(
             collection_title = test_title2, lat=0, long=0, properties={}
         )
-        self.assertEqual(1, len(geojson_parser._collections_dict[test_title1]['features']))
-        self.assertEqual(1, len(geojson_parser._collections_dict[test_title2]['features']))
+        self.assertEqual(1, len(geojson_parser.feature_collection(test_title1)['features']))
+        self.assertEqual(1, len(geojson_parser.feature_collection(test_title2)['features']))
 
     def test_collection_properties(self):
         geojson_parser = GeoJSONParser()
@@ -79,7 +88,7 @@ class TestGeoJSONParser(unittest.TestCase):
             collection_title = test_title, lat=0, long=0, properties={ }, collection_parent = test_parent_folder,
         )
         self.assertTrue(test_title in geojson_parser._collections_dict)
-        properties = geojson_parser._collections_dict[test_title]['properties']
+        properties = geojson_parser.feature_collection(test_title)['properties']
         self.assertEqual(test_parent_folder, properties['parent'])
         
     def test_geojson_parser_iterator(self):
@@ -101,7 +110,8 @@ class TestGeoJSONParser(unittest.TestCase):
         test_feature = geojson.Feature(geometry=test_point, properties={})
         test_feature_collection = geojson.FeatureCollection(
             features=[test_feature],
-            title=test_title1
+            title=test_title1,
+            bbox=[test_long, test_lat, test_long, test_lat]
             )
         
         # iterator
@@ -113,5 +123,226 @@ class TestGeoJSONParser(unittest.TestCase):
             next(it)
 
 
+class TestGeoJSONParserColumns(unittest.TestCase):
+
+    def test_features_round_trip(self):
+        geojson_parser = GeoJSONParser()
+        test_title = 'Test_Title'
+        test_features = [
+            (-8.631053, 115.095269, { 'datetime': '2023-05-05 06:19:24', 'filename': 'EXIF.jpg' }),
+            (-8.5, 115.5, { 'filename': 'ÉXIF.jpg', 'datetime': '2023-05-05 06:19:25' }),
+            (-8.4, 115.4, { 'filename': 'NO_DATETIME.jpg' }),
+            (-8.3, 115.3, { 'filename': 'ALTITUDE.jpg', 'altitude': 12.5, 'datetime': None }),
+            (-8.2, 115.2, {}),
+        ]
+        for lat, long, properties in test_features:
+            geojson_parser.add_feature(
+                collection_title = test_title, lat=lat, long=long, properties=properties
+            )
+        self.assertEqual(len(test_features), geojson_parser.feature_count(test_title))
+        features = geojson_parser.feature_collection(test_title)['features']
+        for feature, (lat, long, properties) in zip(features, test_features):
+            self.assertEqual([long, lat], feature['geometry']['coordinates'])
+            self.assertEqual(properties, feature['properties'])
+            self.assertEqual(list(properties), list(feature['properties']))
+
+    def test_features_are_materialised_on_each_call(self):
+        geojson_parser = GeoJSONParser()
+        test_title = 'Test_Title'
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=0, long=0, properties={ 'filename': 'EXIF.jpg' }
+        )
+        feature_collection = geojson_parser.feature_collection(test_title)
+        feature_collection['features'][0]['properties']['filename'] = 'CHANGED.jpg'
+        feature_collection = geojson_parser.feature_collection(test_title)
+        self.assertEqual('EXIF.jpg', feature_collection['features'][0]['properties']['filename'])
+
+
+class TestGeoJSONParserBBox(unittest.TestCase):
+
+    def test_collection_bbox(self):
+        geojson_parser = GeoJSONParser()
+        test_title = 'Test_Title'
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=-8, long=115, properties={}
+        )
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=-9, long=116, properties={}
+        )
+        bbox = geojson_parser.feature_collection(test_title)['bbox']
+        self.assertEqual([115, -9, 116, -8], bbox)
+        self.assertEqual([115, -9, 116, -8], geojson_parser.bbox(test_title))
+
+
+class TestGeoJSONParserRollup(unittest.TestCase):
+
+    def test_titles(self):
+        parser = GeoJSONParser()
+        parser.add_feature('b', 1.0, 2.0)
+        parser.add_feature('a', 1.0, 2.0)
+        self.assertEqual(['b', 'a'], parser.titles)
+
+    def test_rollup_collection(self):
+        parser = GeoJSONParser()
+        parser.add_feature('trip/day1', -8.6, 115.1, {'filename': 'a.jpg'}, 'trip')
+        parser.add_feature('trip/day2', -8.7, 115.3, {'filename': 'b.jpg'}, 'trip')
+        parser.add_feature('trip/day2', -8.5, 115.2, {'filename': 'c.jpg'}, 'trip')
+        rollup = parser.rollup_collection('trip', ['trip/day1', 'trip/day2'], 'archive')
+        self.assertEqual('trip', rollup['title'])
+        self.assertEqual({'parent': 'archive'}, rollup['properties'])
+        self.assertEqual(['a.jpg', 'b.jpg', 'c.jpg'], [feature['properties']['filename'] for feature in rollup['features']])
+        self.assertEqual([115.1, -8.7, 115.3, -8.5], rollup['bbox'])
+        self.assertNotIn('properties', parser.rollup_collection('trip', ['trip/day1']))
+
+
+class TestGeoJSONParserKeyedFeatures(unittest.TestCase):
+
+    def test_add_feature_with_key_replaces_feature(self):
+        parser = GeoJSONParser()
+        parser.add_feature('a', -8, 115, {'filename': 'a.jpg'}, key='a.jpg')
+        parser.add_feature('a', -9, 116, {'filename': 'b.jpg'}, key='b.jpg')
+        parser.add_feature('a', -7, 114, {'filename': 'a.jpg', 'rating': 5}, key='a.jpg')
+        features = parser.feature_collection('a')['features']
+        self.assertEqual(['b.jpg', 'a.jpg'], [feature['properties']['filename'] for feature in features])
+        self.assertEqual(5, features[1]['properties']['rating'])
+        self.assertEqual(2, parser.feature_count('a'))
+        self.assertEqual([114, -9, 116, -7], parser.bbox('a'))
+
+    def test_remove_feature(self):
+        parser = GeoJSONParser()
+        parser.add_feature('a', -8, 115, {'filename': 'a.jpg'}, key='a.jpg')
+        parser.add_feature('a', -9, 116, {'filename': 'b.jpg'}, key='b.jpg')
+        self.assertTrue(parser.remove_feature('a', 'b.jpg'))
+        self.assertFalse(parser.remove_feature('a', 'b.jpg'))
+        self.assertFalse(parser.remove_feature('b', 'a.jpg'))
+        self.assertEqual(['a.jpg'], [feature['properties']['filename'] for feature in parser.feature_collection('a')['features']])
+        self.assertEqual([115, -8, 115, -8], parser.bbox('a'))
+
+    def test_remove_last_feature_removes_collection(self):
+        parser = GeoJSONParser(tile_zoom=1, cluster_zooms=[0])
+        parser.add_feature('a', -8, 115, {}, key='a.jpg')
+        self.assertTrue(parser.remove_feature('a', 'a.jpg'))
+        self.assertNotIn('a', parser)
+        self.assertEqual({}, parser._tile_index_dict)
+        self.assertEqual({}, parser._cluster_index_dict)
+
+    def test_removed_rows_are_compacted(self):
+        parser = GeoJSONParser(tile_zoom=1)
+        for i in range(4):
+            parser.add_feature('a', i, i, {'filename': f'{i}.jpg'}, key=i)
+        parser.remove_feature('a', 0)
+        parser.remove_feature('a', 1)
+        self.assertEqual(2, parser._collections_dict['a'].removed_count)
+        parser.remove_feature('a', 2)
+        self.assertEqual(0, parser._collections_dict['a'].removed_count)
+        self.assertEqual(1, len(parser._collections_dict['a'].lats))
+        parser.add_feature('a', 3, 3, {'filename': '3.jpg', 'rating': 1}, key=3)
+        features = parser.feature_collection('a')['features']
+        self.assertEqual([{'filename': '3.jpg', 'rating': 1}], [feature['properties'] for feature in features])
+        self.assertEqual([[1]], [list(rows) for tile, rows in parser._tile_index_dict['a']])
+
+    def test_tiles_and_clusters_follow_removals(self):
+        parser = GeoJSONParser(tile_zoom=1, cluster_zooms=[0])
+        parser.add_feature('a', 10, 10, {'datetime': '2023-05-05 06:19:24'}, key='a.jpg')
+        parser.add_feature('a', -10, -10, {'datetime': '2023-05-06 06:19:24'}, key='b.jpg')
+        parser.add_feature('a', 20, 20, {'datetime': '2023-05-07 06:19:24'}, key='c.jpg')
+        parser.remove_feature('a', 'b.jpg')
+        parser.add_feature('a', 15, 15, {'datetime': '2023-05-04 06:19:24'}, key='c.jpg')
+
+        self.assertEqual([(1, 1, 0)], [tile for tile, feature_collection in parser.iter_tiles('a')])
+        zoom, feature_collection = next(parser.iter_clusters('a'))
+        properties = feature_collection['features'][0]['properties']
+        self.assertEqual(2, properties['point_count'])
+        self.assertEqual('2023-05-04 06:19:24', properties['datetime_start'])
+        self.assertEqual('2023-05-05 06:19:24', properties['datetime_end'])
+        self.assertEqual([10, 10, 15, 15], feature_collection['bbox'])
+
+
+class TestGeoJSONParserTiles(unittest.TestCase):
+
+    def test_invalid_zoom_raises_exception(self):
+        with self.assertRaises(ValueError):
+            GeoJSONParser(tile_zoom=30)
+        with self.assertRaises(ValueError):
+            GeoJSONParser(cluster_zooms=[5, 25])
+
+    def test_iter_tiles_without_tile_zoom_raises_exception(self):
+        geojson_parser = GeoJSONParser()
+        test_title = 'Test_Title'
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=0, long=0, properties={}
+        )
+        with self.assertRaises(RuntimeError):
+            list(geojson_parser.iter_tiles(test_title))
+
+    def test_iter_tiles(self):
+        geojson_parser = GeoJSONParser(tile_zoom=1)
+        test_title = 'Test_Title'
+        test_parent_folder = 'Test_Parent_Folder'
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=10, long=10, properties={}, collection_parent = test_parent_folder,
+        )
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=-10, long=-10, properties={}
+        )
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=20, long=20, properties={}
+        )
+        tiles = list(geojson_parser.iter_tiles(test_title))
+        self.assertEqual([(1, 0, 1), (1, 1, 0)], [tile for tile, feature_collection in tiles])
+
+        tile, feature_collection = tiles[1]
+        self.assertEqual(test_title, feature_collection['title'])
+        self.assertEqual(2, len(feature_collection['features']))
+        self.assertEqual([10, 10, 20, 20], feature_collection['bbox'])
+        self.assertEqual([1, 1, 0], feature_collection['tile'])
+        self.assertEqual(test_parent_folder, feature_collection['properties']['parent'])
+
+
+class TestGeoJSONParserClusters(unittest.TestCase):
+
+    def test_iter_clusters_without_cluster_zooms_raises_exception(self):
+        geojson_parser = GeoJSONParser()
+        test_title = 'Test_Title'
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=0, long=0, properties={}
+        )
+        with self.assertRaises(RuntimeError):
+            list(geojson_parser.iter_clusters(test_title))
+
+    def test_iter_clusters(self):
+        geojson_parser = GeoJSONParser(cluster_zooms=[1, 0])
+        test_title = 'Test_Title'
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=10, long=10, properties={ 'datetime': '2023-05-05 06:19:24' }
+        )
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=-10, long=-10, properties={ 'datetime': '2023-05-06 06:19:24' }
+        )
+        clusters = list(geojson_parser.iter_clusters(test_title))
+        self.assertEqual([0, 1], [zoom for zoom, feature_collection in clusters])
+
+        zoom, feature_collection = clusters[0]
+        self.assertEqual(test_title, feature_collection['title'])
+        self.assertEqual(0, feature_collection['zoom'])
+        self.assertEqual([-10, -10, 10, 10], feature_collection['bbox'])
+        self.assertEqual(1, len(feature_collection['features']))
+        properties = feature_collection['features'][0]['properties']
+        self.assertEqual(2, properties['point_count'])
+        self.assertEqual('2023-05-05 06:19:24', properties['datetime_start'])
+        self.assertEqual('2023-05-06 06:19:24', properties['datetime_end'])
+
+        zoom, feature_collection = clusters[1]
+        self.assertEqual(2, len(feature_collection['features']))
+
+    def test_clusters_do_not_change_features(self):
+        geojson_parser = GeoJSONParser(cluster_zooms=[0])
+        test_title = 'Test_Title'
+        geojson_parser.add_feature(
+            collection_title = test_title, lat=10, long=10, properties={}
+        )
+        self.assertEqual(1, len(geojson_parser.feature_collection(test_title)['features']))
+
+
 if __name__ == '__main__':
     unittest.main()             # pragma: no cover
\ No newline at end of file
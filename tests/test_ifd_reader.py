@@ -0,0 +1,200 @@
+"""
+Tests for ifd_reader
+"""
+
+import unittest
+import struct
+
+from im2geojson.ifd_reader import *
+
+
+def build_tiff(ifd0, gps=None, endian='<'):
+    """
+    bytes: Return TIFF metadata with IFD0 entries `ifd0` and GPS IFD entries
+    `gps`, each a list of (tag, type, count, value bytes).
+    """
+    ifd0 = list(ifd0)
+    if gps is not None:
+        ifd0.append((GPS_IFD_POINTER, LONG, 1, None))
+    ifd0_size = 2 + ENTRY_SIZE * len(ifd0) + 4
+    gps_offset = 8 + ifd0_size
+    data_offset = gps_offset + (2 + ENTRY_SIZE * len(gps) + 4 if gps is not None else 0)
+    data = bytearray()
+
+    def ifd_bytes(entries, next_offset=0):
+        table = struct.pack(endian + 'H', len(entries))
+        for tag, field_type, count, value in entries:
+            if value is None:
+                value = struct.pack(endian + 'L', gps_offset)
+            if len(value) <= 4:
+                table += struct.pack(endian + 'HHL', tag, field_type, count) + value.ljust(4, b'\x00')
+            else:
+                table += struct.pack(endian + 'HHLL', tag, field_type, count, data_offset + len(data))
+                data.extend(value)
+        return table + struct.pack(endian + 'L', next_offset)
+
+    body = ifd_bytes(ifd0) + (ifd_bytes(gps) if gps is not None else b'')
+    header = (b'II' if endian == '<' else b'MM') + struct.pack(endian + 'HL', 42, 8)
+    return header + body + bytes(data)
+
+def build_jpeg(tiff, preceding=b''):
+    """bytes: Return a JPEG prefix with `preceding` segments and an EXIF APP1 segment holding `tiff`."""
+    app1 = EXIF_HEADER + tiff
+    return JPEG_SOI + preceding + JPEG_APP1 + struct.pack('>H', len(app1) + 2) + app1 + JPEG_SOS
+
+
+class TestIterSegments(unittest.TestCase):
+
+    def test_iter_segments(self):
+        jpeg = JPEG_SOI + b'\xff\xe0\x00\x04JF' + b'\xff\xff\xdb\x00\x03X' + JPEG_SOS + b'\x00\x0c'
+        self.assertEqual([(b'\xff\xe0', 2, 4), (b'\xff\xdb', 9, 3), (JPEG_SOS, 14, 12)], list(iter_segments(jpeg)))
+
+    def test_iter_segments_not_jpeg(self):
+        self.assertEqual([], list(iter_segments(b'not a jpeg')))
+
+
+class TestFindExifSegment(unittest.TestCase):
+
+    def test_find_exif_segment(self):
+        tiff = build_tiff([])
+        jpeg = build_jpeg(tiff)
+        start, end = find_exif_segment(jpeg)
+        self.assertEqual(tiff, jpeg[start:end])
+
+    def test_find_exif_segment_after_other_segments(self):
+        xmp = b'http://ns.adobe.com/xap/1.0/\x00'
+        preceding = b'\xff\xe0\x00\x04JF' + JPEG_APP1 + struct.pack('>H', len(xmp) + 2) + xmp
+        tiff = build_tiff([])
+        jpeg = build_jpeg(tiff, preceding)
+        start, end = find_exif_segment(jpeg)
+        self.assertEqual(tiff, jpeg[start:end])
+
+    def test_no_exif_segment(self):
+        self.assertIsNone(find_exif_segment(b'not a jpeg'))
+        self.assertIsNone(find_exif_segment(JPEG_SOI + JPEG_SOS))
+        self.assertIsNone(find_exif_segment(JPEG_SOI + b'\xff\xe0\x00'))
+
+    def test_find_exif_segment_in_test_image(self):
+        with open('tests/test_files/test_images/test_exif/test_folder/EXIF.jpg', 'rb') as f:
+            image_b = f.read(20000)
+        start, end = find_exif_segment(image_b)
+        self.assertEqual(b'MM', image_b[start:start + 2])
+        # APP1 length 10980, less the length field and EXIF header
+        self.assertEqual(10980 - 2 - len(EXIF_HEADER), end - start)
+
+
+def build_thumbnail_tiff(thumbnail, offset_type=LONG, length=None):
+    """bytes: Return TIFF metadata with an empty IFD0 and an IFD1 locating the JPEG `thumbnail` after it."""
+    size = TYPE_SIZES[offset_type]
+    offset = 8 + 6 + 2 + 2 * ENTRY_SIZE + 4
+    length = len(thumbnail) if length is None else length
+    ifd1 = struct.pack('<H', 2)
+    ifd1 += struct.pack('<HHL', JPEG_INTERCHANGE_FORMAT, offset_type, 1) + struct.pack('<L', offset)[:size].ljust(4, b'\x00')
+    ifd1 += struct.pack('<HHLL', JPEG_INTERCHANGE_FORMAT_LENGTH, LONG, 1, length) + struct.pack('<L', 0)
+    return b'II' + struct.pack('<HL', 42, 8) + struct.pack('<HL', 0, 14) + ifd1 + thumbnail
+
+
+class TestFindThumbnail(unittest.TestCase):
+
+    def test_find_thumbnail(self):
+        thumbnail = JPEG_SOI + b'thumbnail'
+        tiff = build_thumbnail_tiff(thumbnail)
+        start, end = find_thumbnail(tiff)
+        self.assertEqual(thumbnail, tiff[start:end])
+        jpeg = build_jpeg(tiff)
+        start, end = find_thumbnail(jpeg, *find_exif_segment(jpeg))
+        self.assertEqual(thumbnail, jpeg[start:end])
+
+    def test_find_thumbnail_in_test_image(self):
+        with open('tests/test_files/test_images/test_exif/test_folder/EXIF.jpg', 'rb') as f:
+            image_b = f.read(20000)
+        start, end = find_thumbnail(image_b, *find_exif_segment(image_b))
+        self.assertEqual(8484, end - start)
+        self.assertEqual(JPEG_SOI, image_b[start:start + 2])
+
+    def test_no_thumbnail(self):
+        self.assertIsNone(find_thumbnail(build_tiff([])))
+        self.assertIsNone(find_thumbnail(b'not a tiff'))
+
+    def test_invalid_thumbnail(self):
+        thumbnail = JPEG_SOI + b'thumbnail'
+        for tiff in [build_thumbnail_tiff(thumbnail, length=len(thumbnail) + 1),
+                     build_thumbnail_tiff(thumbnail, length=0),
+                     build_thumbnail_tiff(thumbnail, offset_type=UNDEFINED),
+                     build_thumbnail_tiff(thumbnail)[:30]]:
+            self.assertIsNone(find_thumbnail(tiff))
+
+
+class TestTiffReader(unittest.TestCase):
+
+    def entries(self):
+        return [
+            (0x010F, ASCII, 6, b'Apple\x00'),
+            (0x0112, SHORT, 1, struct.pack('<H', 6)),
+            (0x920A, RATIONAL, 1, struct.pack('<LL', 399, 100)),
+            (0x9000, UNDEFINED, 4, b'0232'),
+            (0x9201, SRATIONAL, 2, struct.pack('<llll', -1, 2, 3, 4)),
+        ]
+
+    def test_entries_finds_only_requested_tags(self):
+        reader = TiffReader(build_tiff(self.entries()))
+        found = reader.entries(reader.ifd0_offset, {0x010F, 0x920A, 0xFFFF})
+        self.assertEqual({0x010F, 0x920A}, set(found))
+
+    def test_values(self):
+        for endian in '<>':
+            entries = [(tag, field_type, count, self.repack(value, field_type, endian))
+                       for tag, field_type, count, value in self.entries()]
+            reader = TiffReader(build_tiff(entries, endian=endian))
+            found = reader.entries(reader.ifd0_offset, {tag for tag, *_ in entries})
+            self.assertEqual('Apple', reader.value(found[0x010F]))
+            self.assertEqual((6,), reader.value(found[0x0112]))
+            self.assertEqual(((399, 100),), reader.value(found[0x920A]))
+            self.assertEqual(b'0232', reader.value(found[0x9000]))
+            self.assertEqual(((-1, 2), (3, 4)), reader.value(found[0x9201]))
+
+    def repack(self, value, field_type, endian):
+        if field_type in (ASCII, UNDEFINED) or endian == '<':
+            return value
+        fmt = TYPE_FORMATS[field_type] * (len(value) // TYPE_SIZES[field_type])
+        return struct.pack('>' + fmt.replace('LL', 'L' * 2), *struct.unpack('<' + fmt, value))
+
+    def test_ifd1_offset(self):
+        reader = TiffReader(build_tiff(self.entries()))
+        self.assertEqual(0, reader.ifd1_offset())
+
+    def test_slice(self):
+        tiff = build_tiff(self.entries())
+        reader = TiffReader(tiff)
+        self.assertEqual(tiff[8:12], bytes(reader.slice(8, 4)))
+        with self.assertRaises(IFDError):
+            reader.slice(len(tiff) - 2, 4)
+
+    def test_invalid_header_raises_exception(self):
+        for tiff in [b'XX*\x00\x08\x00\x00\x00', b'II\x2b\x00\x08\x00\x00\x00', b'II']:
+            with self.assertRaises(IFDError):
+                TiffReader(tiff)
+
+    def test_truncated_ifd_raises_exception(self):
+        tiff = build_tiff(self.entries())
+        reader = TiffReader(tiff[:20])
+        with self.assertRaises(IFDError):
+            reader.entries(reader.ifd0_offset, {0x010F})
+
+    def test_value_past_end_raises_exception(self):
+        tiff = build_tiff(self.entries())
+        reader = TiffReader(tiff[:-4])
+        found = reader.entries(reader.ifd0_offset, {0x9201})
+        with self.assertRaises(IFDError):
+            reader.value(found[0x9201])
+
+    def test_unsupported_type_raises_exception(self):
+        reader = TiffReader(build_tiff([(0x010F, 13, 1, b'\x00' * 4)]))
+        found = reader.entries(reader.ifd0_offset, {0x010F})
+        with self.assertRaises(IFDError):
+            reader.value(found[0x010F])
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
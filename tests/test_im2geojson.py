@@ -6,9 +6,17 @@ import unittest
 import os
 import shutil
 import io
+import json
+import sqlite3
+import threading
+import time
+from unittest import mock
 from contextlib import redirect_stdout
 
 from im2geojson.im2geojson import *
+from im2geojson.sync import MANIFEST_FILENAME, file_digest
+from tests.test_formats import exif_tiff, build_heif, build_png, build_webp
+from tests.test_xmp_reader import build_xmp_jpeg, XMP_ELEMENTS
 
 
 class TestBaseClass(unittest.TestCase):
@@ -214,6 +222,818 @@ class TestImageToGeoJSONStart(TestBaseClass):
             jsn = json.load(f)
             self.assertIsNotNone(jsn['features'][0]['properties']['filename'])
 
+    def test_im2geojson_start_geojson_bbox(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory)
+        im2geojson.start()
+
+        geojson_path = os.path.join(self.geojson_dir_path, self.test_geojson_file_name)
+        with open(geojson_path, 'r') as f:
+            jsn = json.load(f)
+            self.assertEqual([115.095269, -8.631053, 115.095269, -8.631053], jsn['bbox'])
+
+    def test_im2geojson_start_creates_tiles(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory, 
+                            tile_zoom=12)
+        im2geojson.start()
+
+        tiles_path = os.path.join(self.output_directory, TILES_DIR, 'test_folder')
+        with open(os.path.join(tiles_path, TILE_INDEX_FILENAME), 'r') as f:
+            index = json.load(f)
+            self.assertEqual('test_folder', index['title'])
+            self.assertEqual(12, index['zoom'])
+            self.assertEqual(1, index['count'])
+            self.assertEqual(1, len(index['tiles']))
+            self.assertEqual([12, 3357, 2146], index['tiles'][0]['tile'])
+            self.assertEqual(1, index['tiles'][0]['count'])
+
+        with open(os.path.join(tiles_path, index['tiles'][0]['path']), 'r') as f:
+            jsn = json.load(f)
+            self.assertEqual('EXIF.jpg', jsn['features'][0]['properties']['filename'])
+            self.assertEqual([12, 3357, 2146], jsn['tile'])
+
+    def test_save_collection_deletes_tiles_left_empty(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory, 
+                            tile_zoom=10)
+        im2geojson.start()
+        tiles_path = os.path.join(self.output_directory, TILES_DIR, 'test_folder')
+        im2geojson._geojson_parser.add_feature('test_folder', 10.0, 10.0, {'filename': 'MOVED.jpg'}, key='MOVED.jpg')
+        im2geojson._save_collection('test_folder')
+        moved_tile_path = os.path.join(tiles_path, '10', '540', '483.geojson')
+        self.assertTrue(os.path.exists(moved_tile_path))
+
+        im2geojson._geojson_parser.remove_feature('test_folder', 'MOVED.jpg')
+        im2geojson._save_collection('test_folder')
+        self.assertFalse(os.path.exists(moved_tile_path))
+        self.assertFalse(os.path.exists(os.path.dirname(moved_tile_path)))
+        with open(os.path.join(tiles_path, TILE_INDEX_FILENAME), 'r') as f:
+            index = json.load(f)
+        self.assertEqual(1, len(index['tiles']))
+        self.assertTrue(os.path.exists(os.path.join(tiles_path, index['tiles'][0]['path'])))
+
+    def test_im2geojson_start_no_tiles_by_default(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory)
+        im2geojson.start()
+        self.assertFalse(os.path.isdir(os.path.join(self.output_directory, TILES_DIR)))
+
+    def test_im2geojson_start_creates_clusters(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory, 
+                            cluster_zooms=[4, 12])
+        im2geojson.start()
+
+        clusters_path = os.path.join(self.output_directory, CLUSTERS_DIR, 'test_folder')
+        self.assertEqual(['12.geojson', '4.geojson'], sorted(os.listdir(clusters_path)))
+        with open(os.path.join(clusters_path, '12.geojson'), 'r') as f:
+            jsn = json.load(f)
+            self.assertEqual(12, jsn['zoom'])
+            properties = jsn['features'][0]['properties']
+            self.assertEqual(1, properties['point_count'])
+            self.assertEqual('2023-05-05 06:19:24', properties['datetime_start'])
+
+    def test_im2geojson_start_json_backend(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory, 
+                            json_backend='json')
+        im2geojson.start()
+
+        geojson_path = os.path.join(self.geojson_dir_path, self.test_geojson_file_name)
+        with open(geojson_path, 'r') as f:
+            jsn = json.load(f)
+            self.assertEqual('EXIF.jpg', jsn['features'][0]['properties']['filename'])
+
+    def test_im2geojson_start_properties(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory, 
+                            properties=['make', 'direction'])
+        im2geojson.start()
+
+        geojson_path = os.path.join(self.geojson_dir_path, self.test_geojson_file_name)
+        with open(geojson_path, 'r') as f:
+            properties = json.load(f)['features'][0]['properties']
+            self.assertEqual('Apple', properties['make'])
+            self.assertEqual(171.042938, properties['direction'])
+
+    def test_invalid_property_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ImageToGeoJSON(input_directory = self.input_directory, 
+                           output_directory = self.output_directory, 
+                           properties=['shoe_size'])
+
+    def test_invalid_json_backend_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ImageToGeoJSON(input_directory = self.input_directory, 
+                           output_directory = self.output_directory, 
+                           json_backend='pickle')
+
+    def test_im2geojson_start_exports_geopackage(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory, 
+                            export_formats=['gpkg'])
+        im2geojson.start()
+
+        connection = sqlite3.connect(os.path.join(self.output_directory, 'features.gpkg'))
+        rows = connection.execute('SELECT collection, filename FROM features').fetchall()
+        connection.close()
+        self.assertEqual([('test_folder', 'EXIF.jpg')], rows)
+
+    def test_invalid_tile_zoom_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ImageToGeoJSON(input_directory = self.input_directory, 
+                           output_directory = self.output_directory, 
+                           tile_zoom=30)
+        self.assertFalse(os.path.isdir(self.output_directory))
+
+    def test_invalid_export_format_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ImageToGeoJSON(input_directory = self.input_directory, 
+                           output_directory = self.output_directory, 
+                           export_formats=['shp'])
+
+
+class TestAllImagesBaseClass(TestBaseClass):
+
+    def setUp(self):
+        super().setUp()
+        # All test images in one folder
+        self.input_directory = 'tests/assets_input/'
+        folder_path = os.path.join(self.input_directory, 'test_folder')
+        os.makedirs(folder_path)
+        for image_dir in os.listdir('tests/test_files/test_images/'):
+            image_folder_path = os.path.join('tests/test_files/test_images/', image_dir, 'test_folder')
+            for filename in os.listdir(image_folder_path):
+                shutil.copy(os.path.join(image_folder_path, filename), folder_path)
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.input_directory)
+
+    def run_im2geojson(self, output_directory, **kwargs):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory,
+                                    output_directory = output_directory,
+                                    **kwargs)
+        im2geojson.start()
+        geojson_dir_path = os.path.join(output_directory, GEOJSON_DIR)
+        collections = {}
+        for filename in sorted(os.listdir(geojson_dir_path)):
+            with open(os.path.join(geojson_dir_path, filename), 'r') as f:
+                collection = json.load(f)
+            # Features are added in the order images complete
+            collection['features'].sort(key=lambda feature: feature['properties']['filename'])
+            collections[filename] = collection
+        return im2geojson, collections
+
+
+class TestImageToGeoJSONConcurrency(TestAllImagesBaseClass):
+
+    def test_auto_concurrency_matches_default(self):
+        expected, expected_collections = self.run_im2geojson(self.output_directory)
+        with self.assertLogs('im2geojson', level='INFO') as captured:
+            im2geojson, collections = self.run_im2geojson(os.path.join(self.output_directory, 'auto'),
+                                                          concurrency='auto')
+        self.assertEqual(expected.summary, im2geojson.summary)
+        self.assertEqual(expected.error_dictionary, im2geojson.error_dictionary)
+        self.assertEqual(expected_collections, collections)
+        self.assertTrue(any('Autotuned concurrency' in message for message in captured.output))
+
+    def test_locality_schedule_matches_default(self):
+        expected, expected_collections = self.run_im2geojson(self.output_directory)
+        im2geojson, collections = self.run_im2geojson(os.path.join(self.output_directory, 'locality'),
+                                                      schedule='locality')
+        self.assertEqual(expected.summary, im2geojson.summary)
+        self.assertEqual(expected.error_dictionary, im2geojson.error_dictionary)
+        self.assertEqual(expected_collections, collections)
+
+    def test_locality_schedule_batches_folders(self):
+        with mock.patch.object(ImageToGeoJSON, '_process_batch', autospec=True,
+                               side_effect=ImageToGeoJSON._process_batch) as process_batch:
+            im2geojson, collections = self.run_im2geojson(self.output_directory, schedule='locality')
+        process_batch.assert_called_once()
+        self.assertEqual(8, len(process_batch.call_args[0][1]))
+        self.assertEqual('3 out of 8 images processed successfully', im2geojson.summary)
+
+    def test_chunk_size_matches_default(self):
+        expected, expected_collections = self.run_im2geojson(self.output_directory)
+        for chunk_size in [1, 3, 100]:
+            output_directory = os.path.join(self.output_directory, f'chunk_{chunk_size}')
+            im2geojson, collections = self.run_im2geojson(output_directory, chunk_size=chunk_size)
+            self.assertEqual(expected.summary, im2geojson.summary)
+            self.assertEqual(expected.error_dictionary, im2geojson.error_dictionary)
+            self.assertEqual(expected_collections, collections)
+
+    def test_chunk_size_returns_batch_results(self):
+        with mock.patch.object(ImageToGeoJSON, '_process_batch', autospec=True,
+                               side_effect=ImageToGeoJSON._process_batch) as process_batch:
+            im2geojson, collections = self.run_im2geojson(self.output_directory, chunk_size=3,
+                                                          schedule='locality')
+        self.assertEqual([3, 3, 2], [len(call[0][1]) for call in process_batch.call_args_list])
+
+    def test_process_batch(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory,
+                                    output_directory = self.output_directory)
+        folder_path = os.path.join(self.input_directory, 'test_folder')
+        batch = [(os.path.join(folder_path, filename), None) for filename in ['EXIF.jpg', 'NO_EXIF.jpg']]
+        batch_result = im2geojson._process_batch(batch)
+        self.assertEqual([batch[0][0]], batch_result.filepaths)
+        self.assertEqual([-8.631053, 115.095269], [round(value, 6) for value in batch_result.coords])
+        self.assertEqual('EXIF.jpg', batch_result.props[0]['filename'])
+        self.assertEqual([batch[1][0]], [filepath for filepath, _ in batch_result.errors])
+        self.assertIsInstance(batch_result.errors[0][1], KeyError)
+
+    def test_prefetch_matches_default(self):
+        expected, expected_collections = self.run_im2geojson(self.output_directory)
+        for schedule in ['listing', 'locality']:
+            with mock.patch('im2geojson.exif_reader.advise_willneed') as advise:
+                im2geojson, collections = self.run_im2geojson(os.path.join(self.output_directory, schedule),
+                                                              prefetch=2, read_size=4096, schedule=schedule)
+            self.assertEqual(expected.error_dictionary, im2geojson.error_dictionary)
+            self.assertEqual(expected_collections, collections)
+            self.assertEqual(8, advise.call_count)
+            self.assertEqual(4096, advise.call_args[0][1])
+        self.assertIsNone(im2geojson._prefetcher)
+
+    def test_invalid_read_size_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ImageToGeoJSON(input_directory = self.input_directory,
+                           output_directory = self.output_directory,
+                           read_size=0)
+
+    def test_invalid_chunk_size_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ImageToGeoJSON(input_directory = self.input_directory,
+                           output_directory = self.output_directory,
+                           chunk_size=0)
+
+    def test_invalid_schedule_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ImageToGeoJSON(input_directory = self.input_directory,
+                           output_directory = self.output_directory,
+                           schedule='random')
+
+    def test_auto_concurrency_saves_images(self):
+        im2geojson, collections = self.run_im2geojson(self.output_directory, concurrency='auto',
+                                                      save_images=True, save_thumbnails=True)
+        self.assertEqual('2 out of 8 images processed successfully', im2geojson.summary)
+        self.assertEqual('image does not contain thumbnail', im2geojson.error_dictionary['test_folder/SMALL_IMAGE.jpg'])
+        self.assertTrue(os.path.exists(os.path.join(self.image_dir_path, 'EXIF.jpg')))
+        self.assertTrue(os.path.exists(os.path.join(self.image_dir_path, 'EXIF_thumb.jpg')))
+
+    def test_auto_concurrency_reads_ahead_of_parsers(self):
+        with open(os.path.join(self.input_directory, 'test_folder', 'EXIF.jpg'), 'rb') as f:
+            image_b = f.read()
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory,
+                                    output_directory = self.output_directory,
+                                    concurrency='auto')
+        reads = []
+        waits = []
+        read_ahead = threading.Event()
+        _read_image, _parse_image = ImageToGeoJSON._read_image, ImageToGeoJSON._parse_image
+        def read_image(self, filepath, source=None):
+            reads.append(filepath)
+            if len(reads) >= 10:
+                read_ahead.set()
+            return _read_image(self, filepath, source)
+        def parse_image(self, filepath, image_b):
+            waits.append(read_ahead.wait(2))
+            return _parse_image(self, filepath, image_b)
+        with mock.patch.object(ImageToGeoJSON, '_read_image', autospec=True, side_effect=read_image), \
+             mock.patch.object(ImageToGeoJSON, '_parse_image', autospec=True, side_effect=parse_image):
+            im2geojson.start_images([(f'test_folder/IMG_{i}.jpg', image_b) for i in range(16)])
+        # Reads are bounded by the reader limit, not the 2 parsers in flight
+        self.assertTrue(all(waits))
+        self.assertEqual('16 out of 16 images processed successfully', im2geojson.summary)
+
+    def test_auto_concurrency_missing_file(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory,
+                                    output_directory = self.output_directory,
+                                    concurrency='auto')
+        im2geojson.start_images([('test_folder/NO_EXIST.jpg', None)])
+        self.assertIn('No such file or directory', im2geojson.error_dictionary['test_folder/NO_EXIST.jpg'])
+
+    def test_fixed_concurrency(self):
+        im2geojson, collections = self.run_im2geojson(self.output_directory, concurrency=1)
+        self.assertEqual('3 out of 8 images processed successfully', im2geojson.summary)
+
+    def test_invalid_concurrency_raises_exception(self):
+        for concurrency in [0, -1, 'fast', 1.5]:
+            with self.assertRaises(ValueError):
+                ImageToGeoJSON(input_directory = self.input_directory,
+                               output_directory = self.output_directory,
+                               concurrency=concurrency)
+
+
+class TestImageToGeoJSONTimeouts(TestAllImagesBaseClass):
+
+    def setUp(self):
+        super().setUp()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        super().tearDown()
+
+    def hang_on(self, method, filename):
+        """Patch `method` of ImageToGeoJSON to hang on `filename` until tearDown."""
+        original = getattr(ImageToGeoJSON, method)
+        release = self.release
+
+        def hanging(im2geojson, filepath, *args):
+            if os.path.basename(filepath) == filename:
+                release.wait(10)
+            return original(im2geojson, filepath, *args)
+        return mock.patch.object(ImageToGeoJSON, method, hanging)
+
+    def test_file_timeout(self):
+        start = time.monotonic()
+        with self.hang_on('_process_image_file', 'NO_EXIF.jpg'):
+            im2geojson, collections = self.run_im2geojson(self.output_directory, file_timeout=0.2)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual('3 out of 8 images processed successfully', im2geojson.summary)
+        self.assertEqual([os.path.join(self.input_directory, 'test_folder', 'NO_EXIF.jpg')], im2geojson.quarantined)
+        self.assertEqual('TimeoutError: Not processed within 0.2 seconds',
+                         im2geojson.error_dictionary['test_folder/NO_EXIF.jpg'])
+        self.assertEqual(1, im2geojson.error_counts['DeadlineExceeded'])
+
+    def test_file_timeout_replaces_stuck_worker(self):
+        with self.hang_on('_process_image_file', 'CORRUPTED_DATETIME.jpg'):
+            im2geojson, collections = self.run_im2geojson(self.output_directory, file_timeout=0.2, concurrency=1)
+        self.assertEqual('3 out of 8 images processed successfully', im2geojson.summary)
+        self.assertEqual(1, len(im2geojson.quarantined))
+        self.assertEqual(3, len(collections['test_folder.geojson']['features']))
+
+    def test_run_timeout(self):
+        with self.hang_on('_process_image_file', 'NO_EXIF.jpg'):
+            im2geojson, collections = self.run_im2geojson(self.output_directory, run_timeout=0.3)
+        self.assertEqual('3 out of 8 images processed successfully', im2geojson.summary)
+        self.assertEqual('TimeoutError: Run not completed within 0.3 seconds',
+                         im2geojson.error_dictionary['test_folder/NO_EXIF.jpg'])
+
+    def test_auto_concurrency_file_timeout(self):
+        with self.hang_on('_read_image', 'NO_EXIF.jpg'):
+            im2geojson, collections = self.run_im2geojson(self.output_directory, file_timeout=0.2,
+                                                          concurrency='auto')
+        self.assertEqual('3 out of 8 images processed successfully', im2geojson.summary)
+        self.assertEqual(1, len(im2geojson.quarantined))
+
+    def test_timeouts_match_default(self):
+        expected, expected_collections = self.run_im2geojson(self.output_directory)
+        im2geojson, collections = self.run_im2geojson(os.path.join(self.output_directory, 'timeouts'),
+                                                      file_timeout=30, run_timeout=60)
+        self.assertEqual(expected.error_dictionary, im2geojson.error_dictionary)
+        self.assertEqual(expected_collections, collections)
+        self.assertEqual([], im2geojson.quarantined)
+
+    def test_invalid_timeout_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ImageToGeoJSON(input_directory = self.input_directory,
+                           output_directory = self.output_directory,
+                           file_timeout=0)
+
+
+class TestImageToGeoJSONStartImages(TestBaseClass):
+
+    def setUp(self):
+        super().setUp()
+        self.image_path = os.path.join(self.input_directory, 'test_folder/EXIF.jpg')
+        self.no_exif_path = 'tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg'
+        self.im2geojson = ImageToGeoJSON(input_directory = self.input_directory,
+                                         output_directory = self.output_directory,
+                                         save_thumbnails=True)
+
+    def load_geojson(self, title):
+        with open(os.path.join(self.geojson_dir_path, f'{title}.geojson'), 'r') as f:
+            return json.load(f)
+
+    def test_start_images_bytes_and_streams(self):
+        with open(self.image_path, 'rb') as f:
+            image_b = f.read()
+        with open(self.image_path, 'rb') as f:
+            self.im2geojson.start_images([
+                ('upload/A.jpg', image_b),
+                ('upload/B.jpg', memoryview(image_b)),
+                ('stream/C.jpg', f),
+            ])
+        self.assertEqual('3 out of 3 images processed successfully', self.im2geojson.summary)
+        self.assertEqual(['A.jpg', 'B.jpg'],
+                         sorted(feature['properties']['filename'] for feature in self.load_geojson('upload')['features']))
+        feature = self.load_geojson('stream')['features'][0]
+        self.assertEqual([115.095269, -8.631053], feature['geometry']['coordinates'])
+        self.assertTrue(os.path.exists(os.path.join(self.image_dir_path, 'C_thumb.jpg')))
+
+    def test_start_images_errors(self):
+        with open(self.no_exif_path, 'rb') as f:
+            self.im2geojson.start_images([('upload/NO_EXIF.jpg', f.read())])
+        self.assertEqual({'upload/NO_EXIF.jpg': "'KeyError: No metadata.'"}, self.im2geojson.error_dictionary)
+
+    def test_start_other_formats(self):
+        input_directory = os.path.join(self.output_directory, 'input/')
+        os.makedirs(os.path.join(input_directory, 'formats'))
+        tiff = exif_tiff()
+        for filename, image_b in [('A.HEIC', build_heif(tiff)), ('B.png', build_png(tiff)),
+                                  ('C.webp', build_webp(tiff)), ('D.dng', tiff), ('E.txt', tiff)]:
+            with open(os.path.join(input_directory, 'formats', filename), 'wb') as f:
+                f.write(image_b)
+        im2geojson = ImageToGeoJSON(input_directory=input_directory, output_directory=self.output_directory,
+                                    save_thumbnails=True)
+        im2geojson.start()
+        self.assertEqual('4 out of 4 images processed successfully', im2geojson.summary)
+        self.assertEqual(['A.HEIC', 'B.png', 'C.webp', 'D.dng'],
+                         sorted(feature['properties']['filename'] for feature in self.load_geojson('formats')['features']))
+        with open(os.path.join(input_directory, 'formats', 'D.dng'), 'rb') as f:
+            expected = bytes(read_exif_bytes(f.read(), get_thumbnail=True)[3])
+        for thumbnail in ['A_thumb.HEIC.jpg', 'B_thumb.png.jpg', 'C_thumb.webp.jpg', 'D_thumb.dng.jpg']:
+            with open(os.path.join(self.image_dir_path, thumbnail), 'rb') as f:
+                self.assertEqual(expected, f.read())
+
+    def test_save_images_other_formats_errors(self):
+        input_directory = os.path.join(self.output_directory, 'input/')
+        os.makedirs(os.path.join(input_directory, 'formats'))
+        shutil.copy(self.image_path, os.path.join(input_directory, 'formats', 'A.jpg'))
+        with open(os.path.join(input_directory, 'formats', 'B.png'), 'wb') as f:
+            f.write(build_png(exif_tiff()))
+        for concurrency in [None, 'auto']:
+            with self.subTest(concurrency=concurrency):
+                im2geojson = ImageToGeoJSON(input_directory=input_directory, output_directory=self.output_directory,
+                                            concurrency=concurrency, save_images=True)
+                im2geojson.start()
+                self.assertEqual('1 out of 2 images processed successfully', im2geojson.summary)
+                self.assertEqual({'formats/B.png': 'ValueError: Cannot save png images stripped of metadata, Expecting JPEG'},
+                                 im2geojson.error_dictionary)
+                self.assertTrue(os.path.exists(os.path.join(self.image_dir_path, 'A.jpg')))
+
+    def test_start_xmp(self):
+        input_directory = os.path.join(self.output_directory, 'input/')
+        os.makedirs(os.path.join(input_directory, 'xmp'))
+        with open(self.no_exif_path, 'rb') as f:
+            image_b = f.read()
+        with open(os.path.join(input_directory, 'xmp', 'A.jpg'), 'wb') as f:
+            f.write(build_xmp_jpeg(image_b))
+        with open(os.path.join(input_directory, 'xmp', 'B.jpg'), 'wb') as f:
+            f.write(image_b)
+        with open(os.path.join(input_directory, 'xmp', 'B.xmp'), 'wb') as f:
+            f.write(XMP_ELEMENTS)
+        for concurrency in [None, 'auto']:
+            with self.subTest(concurrency=concurrency):
+                im2geojson = ImageToGeoJSON(input_directory=input_directory, output_directory=self.output_directory,
+                                            concurrency=concurrency, xmp=True)
+                im2geojson.start()
+                self.assertEqual('2 out of 2 images processed successfully', im2geojson.summary)
+                features = self.load_geojson('xmp')['features']
+                self.assertEqual([[115.095269, -8.631053]] * 2, [feature['geometry']['coordinates'] for feature in features])
+        im2geojson = ImageToGeoJSON(input_directory=input_directory, output_directory=self.output_directory)
+        im2geojson.start()
+        self.assertEqual('0 out of 2 images processed successfully', im2geojson.summary)
+
+    def test_start_images_xmp(self):
+        with open(self.no_exif_path, 'rb') as f:
+            image_b = build_xmp_jpeg(f.read())
+        for concurrency in [None, 'auto']:
+            with self.subTest(concurrency=concurrency):
+                im2geojson = ImageToGeoJSON(input_directory=self.input_directory, output_directory=self.output_directory,
+                                            concurrency=concurrency, xmp=True)
+                im2geojson.start_images([('upload/A.jpg', image_b)])
+                self.assertEqual('1 out of 1 images processed successfully', im2geojson.summary)
+
+    def test_start_images_raises_exception_on_second_call(self):
+        self.im2geojson.start_images([])
+        with self.assertRaises(RuntimeError):
+            self.im2geojson.start_images([])
+
+
+class TestImageToGeoJSONSync(TestBaseClass):
+
+    def setUp(self):
+        super().setUp()
+        self.sync_input_directory = os.path.join(self.output_directory, 'input/')
+        exif_path = os.path.join(self.input_directory, 'test_folder/EXIF.jpg')
+        no_exif_path = 'tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg'
+        self.sync_output_directory = os.path.join(self.output_directory, 'output')
+        self.sources = {
+            'folder_a/A.jpg': exif_path,
+            'folder_a/NO_EXIF.jpg': no_exif_path,
+            'folder_b/B.jpg': exif_path,
+        }
+        for filename, path in self.sources.items():
+            os.makedirs(os.path.join(self.sync_input_directory, os.path.dirname(filename)), exist_ok=True)
+            shutil.copyfile(path, os.path.join(self.sync_input_directory, filename))
+
+    def run_sync(self, **kwargs):
+        im2geojson = ImageToGeoJSON(input_directory=self.sync_input_directory,
+                                    output_directory=self.sync_output_directory,
+                                    save_images=True, save_thumbnails=True, sync=True, **kwargs)
+        with redirect_stdout(io.StringIO()):
+            im2geojson.start()
+        return im2geojson
+
+    def output_path(self, *parts):
+        return os.path.join(self.sync_output_directory, *parts)
+
+    def mtimes(self):
+        paths = [self.output_path(GEOJSON_DIR, 'folder_a.geojson'), self.output_path(GEOJSON_DIR, 'folder_b.geojson'),
+                 self.output_path(IMAGE_DIR, 'A.jpg'), self.output_path(IMAGE_DIR, 'B_thumb.jpg')]
+        return {path: os.stat(path).st_mtime_ns for path in paths}
+
+    def load_geojson(self, title):
+        with open(self.output_path(GEOJSON_DIR, f'{title}.geojson'), 'r') as f:
+            return json.load(f)
+
+    def test_sync_skips_unchanged(self):
+        im2geojson = self.run_sync()
+        self.assertEqual('2 out of 3 images processed successfully, 0 unchanged, 0 removed', im2geojson.summary)
+        self.assertTrue(os.path.exists(self.output_path(MANIFEST_FILENAME)))
+        expected = self.load_geojson('folder_a'), self.load_geojson('folder_b')
+        mtimes = self.mtimes()
+
+        with mock.patch.object(ImageToGeoJSON, '_process_image_file', autospec=True,
+                               side_effect=ImageToGeoJSON._process_image_file) as process_image_file:
+            im2geojson = self.run_sync()
+        self.assertEqual('0 out of 0 images processed successfully, 3 unchanged, 0 removed', im2geojson.summary)
+        process_image_file.assert_not_called()
+        self.assertEqual({'folder_a/NO_EXIF.jpg': "'KeyError: No metadata.'"}, im2geojson.error_dictionary)
+        self.assertEqual({'NoExifError': 1}, im2geojson.error_counts)
+        self.assertEqual(mtimes, self.mtimes())
+        self.assertEqual(expected, (self.load_geojson('folder_a'), self.load_geojson('folder_b')))
+
+    def test_sync_rewrites_changed_collections(self):
+        self.run_sync()
+        mtimes = self.mtimes()
+        time.sleep(0.01)
+        shutil.copyfile(self.sources['folder_b/B.jpg'], os.path.join(self.sync_input_directory, 'folder_a/C.jpg'))
+        im2geojson = self.run_sync(concurrency='auto')
+        self.assertEqual('1 out of 1 images processed successfully, 3 unchanged, 0 removed', im2geojson.summary)
+        new_mtimes = self.mtimes()
+        self.assertNotEqual(mtimes[self.output_path(GEOJSON_DIR, 'folder_a.geojson')],
+                            new_mtimes[self.output_path(GEOJSON_DIR, 'folder_a.geojson')])
+        self.assertEqual(mtimes[self.output_path(GEOJSON_DIR, 'folder_b.geojson')],
+                         new_mtimes[self.output_path(GEOJSON_DIR, 'folder_b.geojson')])
+        self.assertEqual(['A.jpg', 'C.jpg'],
+                         sorted(feature['properties']['filename'] for feature in self.load_geojson('folder_a')['features']))
+
+    def test_sync_removes_orphans(self):
+        self.run_sync()
+        os.remove(os.path.join(self.sync_input_directory, 'folder_b/B.jpg'))
+        im2geojson = self.run_sync()
+        self.assertEqual('0 out of 0 images processed successfully, 2 unchanged, 1 removed', im2geojson.summary)
+        self.assertFalse(os.path.exists(self.output_path(IMAGE_DIR, 'B.jpg')))
+        self.assertFalse(os.path.exists(self.output_path(IMAGE_DIR, 'B_thumb.jpg')))
+        self.assertFalse(os.path.exists(self.output_path(GEOJSON_DIR, 'folder_b.geojson')))
+        self.assertTrue(os.path.exists(self.output_path(IMAGE_DIR, 'A.jpg')))
+
+    def test_sync_changed_options_reprocess(self):
+        self.run_sync()
+        im2geojson = self.run_sync(properties=['make'])
+        self.assertEqual('2 out of 3 images processed successfully, 0 unchanged, 0 removed', im2geojson.summary)
+        self.assertEqual('Apple', self.load_geojson('folder_b')['features'][0]['properties']['make'])
+
+    def test_sync_hashes_images_as_read(self):
+        for concurrency in [None, 'auto']:
+            with self.subTest(concurrency=concurrency):
+                shutil.rmtree(self.sync_output_directory, ignore_errors=True)
+                with mock.patch('im2geojson.sync.file_digest') as digest:
+                    self.run_sync(concurrency=concurrency)
+                digest.assert_not_called()
+                with open(self.output_path(MANIFEST_FILENAME), 'r') as f:
+                    entries = json.load(f)['entries']
+                filepath = os.path.join(self.sync_input_directory, 'folder_a/A.jpg')
+                self.assertIn(file_digest(filepath), entries[filepath])
+
+                # A touched image with the same contents is unchanged
+                st = os.stat(filepath)
+                os.utime(filepath, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+                im2geojson = self.run_sync(concurrency=concurrency)
+                self.assertEqual('0 out of 0 images processed successfully, 3 unchanged, 0 removed', im2geojson.summary)
+
+    def test_sync_manifest_not_saved_when_unchanged(self):
+        self.run_sync()
+        mtime = os.stat(self.output_path(MANIFEST_FILENAME)).st_mtime_ns
+        time.sleep(0.01)
+        self.run_sync()
+        self.assertEqual(mtime, os.stat(self.output_path(MANIFEST_FILENAME)).st_mtime_ns)
+
+    def test_sync_missing_collection_saved(self):
+        self.run_sync()
+        os.remove(self.output_path(GEOJSON_DIR, 'folder_b.geojson'))
+        self.run_sync()
+        self.assertEqual(1, len(self.load_geojson('folder_b')['features']))
+
+
+class TestImageToGeoJSONLayout(TestBaseClass):
+
+    def setUp(self):
+        super().setUp()
+        self.tree_input_directory = os.path.join(self.output_directory, 'archive/')
+        self.tree_output_directory = os.path.join(self.output_directory, 'output')
+        self.exif_path = os.path.join(self.input_directory, 'test_folder/EXIF.jpg')
+        for filename in ['trip1/day1/A.jpg', 'trip1/day2/C.jpg', 'trip1/B.jpg', 'trip2/day1/A.jpg', 'R.jpg']:
+            os.makedirs(os.path.join(self.tree_input_directory, os.path.dirname(filename)), exist_ok=True)
+            shutil.copyfile(self.exif_path, os.path.join(self.tree_input_directory, filename))
+
+    def run_tree(self, **kwargs):
+        im2geojson = ImageToGeoJSON(input_directory=self.tree_input_directory,
+                                    output_directory=self.tree_output_directory,
+                                    save_thumbnails=True, layout=TREE_LAYOUT, **kwargs)
+        with redirect_stdout(io.StringIO()):
+            im2geojson.start()
+        return im2geojson
+
+    def output_path(self, *parts):
+        return os.path.join(self.tree_output_directory, *parts)
+
+    def load_geojson(self, *parts):
+        with open(self.output_path(GEOJSON_DIR, *parts), 'r') as f:
+            return json.load(f)
+
+    def load_rollup(self, *parts):
+        with open(self.output_path(ROLLUPS_DIR, *parts), 'r') as f:
+            return json.load(f)
+
+    def test_invalid_layout_raises_exception(self):
+        with self.assertRaises(ValueError) as e:
+            ImageToGeoJSON(input_directory=self.input_directory, output_directory=self.output_directory, layout='flat')
+        self.assertEqual('ValueError: Invalid layout flat, Expecting one of folder, tree', str(e.exception))
+
+    def test_rollups_without_tree_layout_raises_exception(self):
+        with self.assertRaises(ValueError) as e:
+            ImageToGeoJSON(input_directory=self.input_directory, output_directory=self.output_directory, rollups=True)
+        self.assertEqual('ValueError: Invalid rollups with layout folder, Expecting layout tree', str(e.exception))
+
+    def test_folder_layout_merges_folders_of_same_name(self):
+        im2geojson = ImageToGeoJSON(input_directory=self.tree_input_directory,
+                                    output_directory=self.tree_output_directory)
+        self.assertEqual(['trip1/B.jpg'], [os.path.relpath(filepath, self.tree_input_directory)
+                                           for filepath in im2geojson.image_filepaths()])
+
+    def test_tree_layout(self):
+        im2geojson = self.run_tree()
+        self.assertEqual('5 out of 5 images processed successfully', im2geojson.summary)
+        day1 = self.load_geojson('trip1', 'day1.geojson')
+        self.assertEqual(os.path.join('trip1', 'day1'), day1['title'])
+        self.assertEqual({'parent': 'trip1'}, day1['properties'])
+        self.assertEqual(os.path.join(IMAGE_DIR, 'trip1', 'day1', 'A_thumb.jpg'),
+                         day1['features'][0]['properties']['rel_thumbnail_path'])
+        self.assertEqual({'parent': 'trip2'}, self.load_geojson('trip2', 'day1.geojson')['properties'])
+        self.assertEqual({'parent': 'archive'}, self.load_geojson('trip1.geojson')['properties'])
+        self.assertEqual('archive', self.load_geojson('archive.geojson')['title'])
+        for thumbnail in [('trip1', 'day1', 'A_thumb.jpg'), ('trip2', 'day1', 'A_thumb.jpg'), ('trip1', 'B_thumb.jpg')]:
+            self.assertTrue(os.path.exists(self.output_path(IMAGE_DIR, *thumbnail)))
+        self.assertFalse(os.path.isdir(self.output_path(ROLLUPS_DIR)))
+
+    def test_tree_layout_errors_keyed_by_path(self):
+        shutil.copyfile('tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg',
+                        os.path.join(self.tree_input_directory, 'trip2/day1/NO_EXIF.jpg'))
+        im2geojson = self.run_tree(concurrency='auto')
+        self.assertEqual({os.path.join('trip2', 'day1', 'NO_EXIF.jpg'): "'KeyError: No metadata.'"},
+                         im2geojson.error_dictionary)
+
+    def test_rollups(self):
+        self.run_tree(rollups=True)
+        trip1 = self.load_rollup('trip1.geojson')
+        self.assertEqual('trip1', trip1['title'])
+        self.assertNotIn('properties', trip1)
+        self.assertEqual(['A.jpg', 'B.jpg', 'C.jpg'],
+                         sorted(feature['properties']['filename'] for feature in trip1['features']))
+        self.assertEqual(self.load_geojson('trip1.geojson')['bbox'], trip1['bbox'])
+        self.assertEqual(1, len(self.load_rollup('trip2.geojson')['features']))
+        self.assertEqual(['trip1.geojson', 'trip2.geojson'], sorted(os.listdir(self.output_path(ROLLUPS_DIR))))
+
+    def test_rollups_sync(self):
+        self.run_tree(rollups=True, sync=True)
+        os.remove(os.path.join(self.tree_input_directory, 'trip1/day2/C.jpg'))
+        os.remove(os.path.join(self.tree_input_directory, 'trip2/day1/A.jpg'))
+        im2geojson = self.run_tree(rollups=True, sync=True)
+        self.assertEqual('0 out of 0 images processed successfully, 3 unchanged, 2 removed', im2geojson.summary)
+        self.assertEqual(2, len(self.load_rollup('trip1.geojson')['features']))
+        self.assertFalse(os.path.exists(self.output_path(ROLLUPS_DIR, 'trip2.geojson')))
+        self.assertFalse(os.path.exists(self.output_path(GEOJSON_DIR, 'trip1', 'day2.geojson')))
+
+    def test_rollups_folder_not_collision(self):
+        for folder in [ROLLUPS_DIR, TILES_DIR, CLUSTERS_DIR]:
+            os.makedirs(os.path.join(self.tree_input_directory, folder, 'trip1'))
+            shutil.copyfile(self.exif_path, os.path.join(self.tree_input_directory, folder, 'trip1', 'D.jpg'))
+        self.run_tree(rollups=True, tile_zoom=12, cluster_zooms=[4])
+        self.assertEqual(3, len(self.load_rollup('trip1.geojson')['features']))
+        self.assertEqual(1, len(self.load_rollup(ROLLUPS_DIR + '.geojson')['features']))
+        for folder in [ROLLUPS_DIR, TILES_DIR, CLUSTERS_DIR]:
+            self.assertEqual(os.path.join(folder, 'trip1'), self.load_geojson(folder, 'trip1.geojson')['title'])
+        with open(self.output_path(TILES_DIR, 'trip1', TILE_INDEX_FILENAME), 'r') as f:
+            self.assertEqual('trip1', json.load(f)['title'])
+
+    def test_removed_collection_keeps_collections_below(self):
+        self.run_tree(sync=True, tile_zoom=12, cluster_zooms=[4])
+        os.remove(os.path.join(self.tree_input_directory, 'trip1/B.jpg'))
+        self.run_tree(sync=True, tile_zoom=12, cluster_zooms=[4])
+        self.assertFalse(os.path.exists(self.output_path(GEOJSON_DIR, 'trip1.geojson')))
+        self.assertFalse(os.path.exists(self.output_path(TILES_DIR, 'trip1', TILE_INDEX_FILENAME)))
+        self.assertFalse(os.path.exists(self.output_path(CLUSTERS_DIR, 'trip1', '4.geojson')))
+        self.assertEqual(['day1', 'day2'], sorted(os.listdir(self.output_path(TILES_DIR, 'trip1'))))
+        self.assertEqual(['day1', 'day2'], sorted(os.listdir(self.output_path(CLUSTERS_DIR, 'trip1'))))
+        self.assertTrue(os.path.exists(self.output_path(TILES_DIR, 'trip1', 'day1', TILE_INDEX_FILENAME)))
+        self.assertTrue(os.path.exists(self.output_path(CLUSTERS_DIR, 'trip1', 'day1', '4.geojson')))
+
+    def test_start_images_tree_layout(self):
+        with open(self.exif_path, 'rb') as f:
+            image_b = f.read()
+        im2geojson = ImageToGeoJSON(input_directory=self.tree_input_directory,
+                                    output_directory=self.tree_output_directory,
+                                    layout=TREE_LAYOUT, rollups=True)
+        im2geojson.start_images([('trip1/day1/a.jpg', image_b), ('trip1/day2/a.jpg', image_b)])
+        self.assertEqual({'parent': 'trip1'}, self.load_geojson('trip1', 'day2.geojson')['properties'])
+        self.assertEqual(2, len(self.load_rollup('trip1.geojson')['features']))
+
+    def test_start_images_tree_layout_names_outside_errors(self):
+        with open(self.exif_path, 'rb') as f:
+            image_b = f.read()
+        names = ['../../escaped/EXIF.jpg', os.path.join(os.path.abspath(self.output_directory), 'abs', 'EXIF.jpg'),
+                 'trip1/../../up/EXIF.jpg', 'trip1/day1/../day2/EXIF.jpg']
+        im2geojson = ImageToGeoJSON(input_directory=self.tree_input_directory,
+                                    output_directory=self.tree_output_directory,
+                                    save_images=True, layout=TREE_LAYOUT, rollups=True)
+        listing = sorted(os.listdir(self.output_directory))
+        im2geojson.start_images([(name, image_b) for name in names])
+        self.assertEqual('1 out of 4 images processed successfully', im2geojson.summary)
+        self.assertEqual(3, len(im2geojson.error_dictionary))
+        for message in im2geojson.error_dictionary.values():
+            self.assertTrue(message.startswith('ValueError: Invalid image name'))
+        self.assertEqual(listing, sorted(os.listdir(self.output_directory)))
+        self.assertEqual(1, len(self.load_geojson('trip1', 'day2.geojson')['features']))
+        self.assertTrue(os.path.exists(self.output_path(IMAGE_DIR, 'trip1', 'day2', 'EXIF.jpg')))
+
+
+class TestImageToGeoJSONSaveCollections(TestBaseClass):
+
+    def setUp(self):
+        super().setUp()
+        self.input_directory = 'tests/assets_input/'
+        small_image_path = 'tests/test_files/test_images/test_small_image/test_folder/SMALL_IMAGE.jpg'
+        no_exif_path = 'tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg'
+        self.folders = ['folder_a', 'folder_b', 'folder_c']
+        for folder in self.folders:
+            os.makedirs(os.path.join(self.input_directory, folder))
+            for i in range(3):
+                shutil.copy(small_image_path, os.path.join(self.input_directory, folder, f'IMAGE_{i}.jpg'))
+        os.makedirs(os.path.join(self.input_directory, 'folder_errors'))
+        shutil.copy(no_exif_path, os.path.join(self.input_directory, 'folder_errors', 'NO_EXIF.jpg'))
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.input_directory)
+
+    def test_saves_each_collection_once(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory)
+        with mock.patch.object(im2geojson, '_save_collection', wraps=im2geojson._save_collection) as save_collection:
+            im2geojson.start()
+        self.assertEqual(sorted(self.folders), sorted(call.args[0] for call in save_collection.call_args_list))
+
+    def test_saves_collections(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory)
+        im2geojson.start()
+        self.assertEqual('9 out of 10 images processed successfully', im2geojson.summary)
+        self.assertEqual(sorted(f'{folder}.geojson' for folder in self.folders), sorted(os.listdir(self.geojson_dir_path)))
+        for folder in self.folders:
+            with open(os.path.join(self.geojson_dir_path, f'{folder}.geojson'), 'r') as f:
+                jsn = json.load(f)
+                self.assertEqual(folder, jsn['title'])
+                self.assertEqual(3, len(jsn['features']))
+
+    def test_is_image_path(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory)
+        self.assertTrue(im2geojson.is_image_path(os.path.join(self.input_directory, 'folder_a', 'NEW.JPG')))
+        self.assertFalse(im2geojson.is_image_path(os.path.join(self.input_directory, 'folder_a', 'notes.txt')))
+        self.assertFalse(im2geojson.is_image_path(os.path.join(self.input_directory, 'folder_a', '.hidden.jpg')))
+        self.assertFalse(im2geojson.is_image_path(os.path.join(self.input_directory, 'folder_a', 'day', 'IMAGE.jpg')))
+        for filepath in im2geojson.image_filepaths():
+            self.assertTrue(im2geojson.is_image_path(filepath))
+
+    def test_update_remove_and_save_collections(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory)
+        filepath = os.path.join(self.input_directory, 'folder_a', 'IMAGE_0.jpg')
+        feature = im2geojson.process_image(filepath)
+        self.assertEqual('folder_a', feature[0])
+        im2geojson.update_feature(filepath, *feature)
+        im2geojson.update_feature(filepath, *feature)
+        im2geojson.save_collections(['folder_a'])
+        with open(os.path.join(self.geojson_dir_path, 'folder_a.geojson'), 'r') as f:
+            self.assertEqual(1, len(json.load(f)['features']))
+
+        self.assertEqual('folder_a', im2geojson.remove_feature(filepath))
+        self.assertIsNone(im2geojson.remove_feature(filepath))
+        im2geojson.save_collections(['folder_a'])
+        self.assertEqual([], os.listdir(self.geojson_dir_path))
+
+    def test_process_image_error(self):
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory, 
+                            output_directory = self.output_directory)
+        self.assertIsNone(im2geojson.process_image(os.path.join(self.input_directory, 'folder_errors', 'NO_EXIF.jpg')))
+        im2geojson.close()
+        self.assertTrue(im2geojson.has_errors)
+
 
 class TestImageToGeoJSONStatus(TestBaseClass):
 
@@ -282,6 +1102,36 @@ class TestImageToGeoJSONErrors(TestBaseClass):
         im2geojson.start()
         self.assertTrue(im2geojson.has_errors)
 
+    def test_errors_written_to_file(self):
+        in_path = 'tests/test_files/test_images/test_no_exif/'
+        im2geojson = ImageToGeoJSON(input_directory = in_path, 
+                            output_directory = self.output_directory)
+        im2geojson.start()
+        self.assertEqual(os.path.join(self.output_directory, ERRORS_FILENAME), im2geojson.errors_path)
+        with open(im2geojson.errors_path, 'r') as f:
+            errors = [json.loads(line) for line in f]
+        self.assertEqual([{'file': 'test_folder/NO_EXIF.jpg', 'class': 'NoExifError', 'error': "'KeyError: No metadata.'"}], errors)
+
+    def test_rerun_without_errors_removes_errors_file(self):
+        im2geojson = ImageToGeoJSON(input_directory = 'tests/test_files/test_images/test_no_exif/', 
+                            output_directory = self.output_directory)
+        im2geojson.start()
+        self.assertTrue(os.path.exists(im2geojson.errors_path))
+        im2geojson = ImageToGeoJSON(input_directory = 'tests/test_files/test_images/test_exif/', 
+                            output_directory = self.output_directory)
+        im2geojson.start()
+        self.assertFalse(im2geojson.has_errors)
+        self.assertFalse(os.path.exists(im2geojson.errors_path))
+
+    def test_error_counts(self):
+        im2geojson = ImageToGeoJSON(input_directory = 'tests/test_files/test_images/', 
+                            output_directory = self.output_directory)
+        im2geojson._add_file_to_errors_with_exception_string('a/test_folder/A.jpg', 'ValueError: a', 'ValueError')
+        im2geojson._add_file_to_errors_with_exception_string('a/test_folder/B.jpg', 'ValueError: b', 'ValueError')
+        im2geojson._add_file_to_errors_with_exception_string('a/test_folder/C.jpg', 'KeyError: c', 'KeyError')
+        self.assertEqual({'ValueError': 2, 'KeyError': 1}, im2geojson.error_counts)
+        self.assertIn('test_folder/A.jpg: ValueError: a', im2geojson.error_summary)
+
     def test_has_no_errors(self):
         in_path = 'tests/test_files/test_images/test_exif/'
         im2geojson = ImageToGeoJSON(input_directory = in_path, 
@@ -339,6 +1189,10 @@ class TestFolderFilesFromPath(unittest.TestCase):
         thumbnail_filename = ImageToGeoJSON._thumbnail_filename(self.test_filename)
         self.assertEqual(self.test_thumb_filename, thumbnail_filename)
 
+    def test_thumbnail_filename_of_other_formats(self):
+        self.assertEqual('IMG.1_thumb.JPEG', ImageToGeoJSON._thumbnail_filename('IMG.1.JPEG'))
+        self.assertEqual('IMG_thumb.heic.jpg', ImageToGeoJSON._thumbnail_filename('IMG.heic'))
+
 
 
 if __name__ == '__main__':
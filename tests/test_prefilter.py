@@ -0,0 +1,80 @@
+"""
+Tests for prefilter
+"""
+
+import unittest
+import struct
+
+from im2geojson.prefilter import *
+from im2geojson.ifd_reader import BYTE, ASCII, RATIONAL, JPEG_SOI, JPEG_SOS
+from tests.test_ifd_reader import build_tiff, build_jpeg
+
+LATITUDE = struct.pack('<6L', 8, 1, 37, 1, 5279, 100)
+GPS = [
+    (0x0001, ASCII, 2, b'S\x00'),
+    (0x0002, RATIONAL, 3, LATITUDE),
+    (0x0003, ASCII, 2, b'E\x00'),
+    (0x0004, RATIONAL, 3, LATITUDE),
+]
+
+
+class TestCheck(unittest.TestCase):
+
+    def test_check_geotagged(self):
+        self.assertIsNone(check(build_jpeg(build_tiff([], GPS))))
+
+    def test_check_no_exif(self):
+        error = check(JPEG_SOI + b'\xff\xe0\x00\x04JF' + JPEG_SOS + b'\x00\x0c')
+        self.assertIsInstance(error, NoExifError)
+        self.assertIsInstance(error, KeyError)
+        self.assertEqual(NO_EXIF, error.reason)
+        self.assertEqual("'KeyError: No metadata.'", str(error))
+
+    def test_check_no_gps_pointer(self):
+        error = check(build_jpeg(build_tiff([(0x0112, BYTE, 1, b'\x01')])))
+        self.assertIsInstance(error, NoGPSError)
+        self.assertIsInstance(error, AttributeError)
+        self.assertEqual(NO_GPS, error.reason)
+        self.assertEqual('AttributeError: image does not have attribute gps_latitude', str(error))
+
+    def test_check_missing_gps_tag(self):
+        error = check(build_jpeg(build_tiff([], GPS[:3])))
+        self.assertEqual('AttributeError: image does not have attribute gps_longitude', str(error))
+
+    def test_check_big_endian(self):
+        error = check(build_jpeg(build_tiff([], [], endian='>')))
+        self.assertIsInstance(error, NoGPSError)
+
+    def test_check_inconclusive(self):
+        jpeg = build_jpeg(build_tiff([], GPS))
+        for data in [b'not a jpeg', b'', JPEG_SOI, jpeg[:30],
+                     build_jpeg(b'II\x2a\x00\xff\xff\x00\x00')]:
+            self.assertIsNone(check(data))
+
+    def test_check_test_images(self):
+        in_path = 'tests/test_files/test_images/'
+        expected = {
+            'test_exif/test_folder/EXIF.jpg': None,
+            'test_missing_datetime/test_folder/MISSING_DATETIME.jpg': None,
+            'test_no_exif/test_folder/NO_EXIF.jpg': NO_EXIF,
+            'test_missing_exif/test_folder/MISSING_EXIF.jpg': NO_GPS,
+        }
+        for file_dir, reason in expected.items():
+            with open(in_path + file_dir, 'rb') as f:
+                error = check(f.read(PREFILTER_SIZE))
+            self.assertEqual(reason, error and error.reason)
+
+
+class TestPrefilter(unittest.TestCase):
+
+    def test_prefilter_raises(self):
+        with self.assertRaises(NoGPSError):
+            prefilter(build_jpeg(build_tiff([])))
+
+    def test_prefilter_passes(self):
+        self.assertIsNone(prefilter(build_jpeg(build_tiff([], GPS))))
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
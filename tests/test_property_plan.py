@@ -0,0 +1,96 @@
+"""
+Tests for property_plan
+"""
+
+import unittest
+from unittest import mock
+import struct
+
+from im2geojson.property_plan import *
+from im2geojson.ifd_reader import ASCII, BYTE, RATIONAL, SHORT, TiffReader
+from tests.test_ifd_reader import build_tiff, build_jpeg
+
+
+class TestExtractionPlan(unittest.TestCase):
+
+    def setUp(self):
+        with open('tests/test_files/test_images/test_exif/test_folder/EXIF.jpg', 'rb') as f:
+            self.image_b = f.read()
+
+    def test_extract_all_properties(self):
+        plan = ExtractionPlan(list(PROPERTIES))
+        self.assertEqual({
+            'altitude': 3.824946,
+            'direction': 171.042938,
+            'make': 'Apple',
+            'model': 'iPhone SE (2nd generation)',
+            'orientation': 1,
+            'focal_length': 3.99,
+            'iso': 640,
+            'lens_model': 'iPhone SE (2nd generation) back camera 3.99mm f/1.8',
+        }, plan.extract(self.image_b))
+
+    def test_extract_reads_only_needed_ifds(self):
+        plan = ExtractionPlan(['make', 'model'])
+        with mock.patch.object(TiffReader, 'entries', autospec=True, side_effect=TiffReader.entries) as entries:
+            self.assertEqual({'make': 'Apple', 'model': 'iPhone SE (2nd generation)'}, plan.extract(self.image_b))
+        entries.assert_called_once()
+        self.assertEqual({0x010F, 0x0110}, entries.call_args[0][2])
+
+    def test_extract_no_properties(self):
+        self.assertEqual({}, ExtractionPlan([]).extract(self.image_b))
+
+    def test_extract_no_exif(self):
+        self.assertEqual({}, ExtractionPlan(['make']).extract(b'not a jpeg'))
+
+    def test_extract_malformed_exif(self):
+        jpeg = build_jpeg(b'II\x2a\x00\xff\xff\x00\x00')
+        self.assertEqual({}, ExtractionPlan(['make']).extract(jpeg))
+
+    def test_extract_gps_timestamp(self):
+        gps = [
+            (0x001D, ASCII, 11, b'2023:05:04\x00'),
+            (0x0007, RATIONAL, 3, struct.pack('<6L', 22, 1, 19, 1, 2450, 100)),
+        ]
+        jpeg = build_jpeg(build_tiff([], gps))
+        self.assertEqual({'gps_timestamp': '2023-05-04T22:19:24.500000+00:00'},
+                         ExtractionPlan(['gps_timestamp']).extract(jpeg))
+
+    def test_extract_altitude_below_sea_level(self):
+        gps = [
+            (0x0005, BYTE, 1, b'\x01'),
+            (0x0006, RATIONAL, 1, struct.pack('<2L', 1250, 100)),
+        ]
+        jpeg = build_jpeg(build_tiff([], gps))
+        self.assertEqual({'altitude': -12.5}, ExtractionPlan(['altitude']).extract(jpeg))
+
+    def test_extract_skips_malformed_values(self):
+        ifd0 = [
+            (0x010F, SHORT, 1, b'\x01\x00'),
+            (0x0110, ASCII, 4, b'SE\x00\x00'),
+        ]
+        gps = [(0x0011, RATIONAL, 1, struct.pack('<2L', 1, 0))]
+        jpeg = build_jpeg(build_tiff(ifd0, gps))
+        self.assertEqual({'model': 'SE'}, ExtractionPlan(['make', 'model', 'direction']).extract(jpeg))
+
+    def test_properties(self):
+        self.assertEqual(('make', 'model'), ExtractionPlan(['make', 'model', 'make']).properties)
+
+    def test_invalid_property_raises_exception(self):
+        with self.assertRaises(ValueError):
+            ExtractionPlan(['shoe_size'])
+
+
+class TestCompilePlan(unittest.TestCase):
+
+    def test_compile_plan_once(self):
+        self.assertIs(compile_plan(['make', 'model']), compile_plan(['make', 'model']))
+
+    def test_compile_plan_returns_plan(self):
+        plan = ExtractionPlan(['make'])
+        self.assertIs(plan, compile_plan(plan))
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
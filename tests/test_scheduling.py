@@ -0,0 +1,70 @@
+"""
+Tests for scheduling
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+
+from im2geojson.scheduling import *
+
+
+class TestLocalityOrder(unittest.TestCase):
+
+    def setUp(self):
+        self.input_directory = tempfile.mkdtemp()
+        self.filepaths = []
+        for folder in ['b_folder', 'a_folder']:
+            os.makedirs(os.path.join(self.input_directory, folder))
+            for filename in ['z.jpg', 'y.jpg', 'x.jpg']:
+                filepath = os.path.join(self.input_directory, folder, filename)
+                with open(filepath, 'wb') as f:
+                    f.write(b'image')
+                self.filepaths.append(filepath)
+
+    def tearDown(self):
+        shutil.rmtree(self.input_directory)
+
+    def test_locality_order(self):
+        images = locality_order([(filepath, None) for filepath in self.filepaths])
+        keys = [(os.path.dirname(filepath), os.stat(filepath).st_ino) for filepath, _ in images]
+        self.assertEqual(sorted(keys), keys)
+        self.assertEqual(['a_folder'] * 3 + ['b_folder'] * 3,
+                         [os.path.basename(os.path.dirname(filepath)) for filepath, _ in images])
+
+    def test_locality_order_in_memory_and_missing(self):
+        folder = os.path.join(self.input_directory, 'a_folder')
+        images = [
+            (self.filepaths[3], None),
+            (os.path.join(folder, 'memory.jpg'), b'image'),
+            (os.path.join(folder, 'missing.jpg'), None),
+        ]
+        ordered = locality_order(images)
+        self.assertEqual(['memory.jpg', 'missing.jpg', 'z.jpg'], [os.path.basename(filepath) for filepath, _ in ordered])
+
+
+class TestChunks(unittest.TestCase):
+
+    def test_chunks(self):
+        images = [(f'a/{i}.jpg', None) for i in range(5)]
+        self.assertEqual([images[:2], images[2:4], images[4:]], chunks(images, 2))
+
+    def test_chunks_empty(self):
+        self.assertEqual([], chunks([], 2))
+
+
+class TestFolderBatches(unittest.TestCase):
+
+    def test_folder_batches(self):
+        images = [('a/1.jpg', None), ('a/2.jpg', None), ('b/1.jpg', b''), ('a/3.jpg', None)]
+        self.assertEqual([[('a/1.jpg', None), ('a/2.jpg', None)], [('b/1.jpg', b'')], [('a/3.jpg', None)]],
+                         folder_batches(images))
+
+    def test_folder_batches_empty(self):
+        self.assertEqual([], folder_batches([]))
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
@@ -0,0 +1,136 @@
+"""
+Tests for serializer
+"""
+
+import unittest
+from unittest import mock
+import os
+import json
+import shutil
+
+import geojson
+
+from im2geojson import serializer
+from im2geojson.serializer import get_serializer, write_atomic, JSONSerializer, ORJSONSerializer
+
+
+def feature_collection():
+    features = [
+        geojson.Feature(
+            geometry=geojson.Point((115.095269, -8.631053)),
+            properties={ 'datetime': '2023-05-05 06:19:24', 'filename': 'ÉXIF.jpg' }
+        ),
+    ]
+    feature_collection = geojson.FeatureCollection(title='test_folder', features=features)
+    feature_collection['properties'] = { 'parent': 'test_exif' }
+    feature_collection['bbox'] = [115.095269, -8.631053, 115.095269, -8.631053]
+    return feature_collection
+
+
+class TestGetSerializer(unittest.TestCase):
+
+    def test_default_backend(self):
+        self.assertEqual('json', get_serializer().name)
+
+    def test_json_backend(self):
+        self.assertIsInstance(get_serializer('json'), JSONSerializer)
+        self.assertEqual('json', get_serializer('json').name)
+
+    def test_invalid_backend_raises_exception(self):
+        with self.assertRaises(ValueError):
+            get_serializer('pickle')
+
+    def test_auto_backend_without_orjson(self):
+        with mock.patch.object(serializer, 'orjson', None):
+            self.assertEqual('json', get_serializer('auto').name)
+
+    def test_orjson_backend_without_orjson_raises_exception(self):
+        with mock.patch.object(serializer, 'orjson', None):
+            with self.assertRaises(ImportError):
+                get_serializer('orjson')
+
+    @unittest.skipIf(serializer.orjson is None, 'orjson is not installed')
+    def test_auto_backend_with_orjson(self):
+        self.assertIsInstance(get_serializer('auto'), ORJSONSerializer)
+
+
+class TestJSONSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.output_directory = 'tests/assets/'
+        os.makedirs(self.output_directory, exist_ok=True)
+        self.file_path = os.path.join(self.output_directory, 'test.geojson')
+
+    def tearDown(self):
+        if os.path.isdir(self.output_directory):
+            shutil.rmtree(self.output_directory)
+
+    def test_dumps_matches_stdlib_json(self):
+        fc = feature_collection()
+        self.assertEqual(json.dumps(fc, indent=4).encode('utf-8'), JSONSerializer().dumps(fc))
+
+    def test_dump_writes_file(self):
+        fc = feature_collection()
+        JSONSerializer().dump(fc, self.file_path)
+        with open(self.file_path, 'r') as f:
+            self.assertEqual(fc, json.load(f))
+
+
+class TestWriteAtomic(unittest.TestCase):
+
+    def setUp(self):
+        self.output_directory = 'tests/assets/'
+        os.makedirs(self.output_directory, exist_ok=True)
+        self.file_path = os.path.join(self.output_directory, 'test.geojson')
+
+    def tearDown(self):
+        if os.path.isdir(self.output_directory):
+            shutil.rmtree(self.output_directory)
+
+    def test_write_atomic_replaces_file(self):
+        write_atomic(self.file_path, b'old')
+        write_atomic(self.file_path, b'new')
+        with open(self.file_path, 'rb') as f:
+            self.assertEqual(b'new', f.read())
+        self.assertEqual(['test.geojson'], os.listdir(self.output_directory))
+
+    def test_write_atomic_file_mode_matches_open(self):
+        write_atomic(self.file_path, b'data')
+        open_file_path = os.path.join(self.output_directory, 'open.geojson')
+        with open(open_file_path, 'wb') as f:
+            f.write(b'data')
+        self.assertEqual(os.stat(open_file_path).st_mode, os.stat(self.file_path).st_mode)
+
+    def test_write_atomic_file_mode_follows_umask(self):
+        umask = os.umask(0o027)
+        try:
+            write_atomic(self.file_path, b'data')
+        finally:
+            os.umask(umask)
+        self.assertEqual(0o640, os.stat(self.file_path).st_mode & 0o777)
+
+    def test_write_atomic_failure_removes_temporary_file(self):
+        with mock.patch('os.replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                write_atomic(self.file_path, b'data')
+        self.assertEqual([], os.listdir(self.output_directory))
+
+
+@unittest.skipIf(serializer.orjson is None, 'orjson is not installed')
+class TestORJSONSerializer(unittest.TestCase):
+
+    def test_dumps_matches_stdlib_json_content_and_order(self):
+        fc = feature_collection()
+        orjson_obj = json.loads(ORJSONSerializer().dumps(fc))
+        json_obj = json.loads(JSONSerializer().dumps(fc))
+        self.assertEqual(json_obj, orjson_obj)
+        self.assertEqual(json.dumps(json_obj), json.dumps(orjson_obj))
+
+    def test_dumps_indent(self):
+        fc = feature_collection()
+        self.assertEqual(json.dumps(fc, indent=2, ensure_ascii=False).encode('utf-8'), ORJSONSerializer().dumps(fc))
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
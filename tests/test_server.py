@@ -0,0 +1,264 @@
+"""
+Tests for server
+"""
+
+import unittest
+from unittest import mock
+import os
+import json
+import time
+import threading
+import http.client
+import socket
+
+from im2geojson.server import *
+from im2geojson.server import _ResultCache
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path):
+        super().__init__('localhost')
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+class TestServerBaseClass(unittest.TestCase):
+
+    socket_path = None
+
+    def setUp(self):
+        self.image_path = 'tests/test_files/test_images/test_exif/test_folder/EXIF.jpg'
+        self.no_exif_path = 'tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg'
+        self.server = create_server(port=0, socket_path=self.socket_path, max_pending=2, timeout=5)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.processor.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def connection(self):
+        if self.socket_path is not None:
+            return UnixHTTPConnection(self.socket_path)
+        return http.client.HTTPConnection(*self.server.server_address)
+
+    def request(self, method, path, body=None):
+        connection = self.connection()
+        try:
+            connection.request(method, path, body=body)
+            response = connection.getresponse()
+            return response.status, response.getheaders(), json.loads(response.read())
+        finally:
+            connection.close()
+
+
+class TestHTTPServer(TestServerBaseClass):
+
+    def test_health(self):
+        status, _, jsn = self.request('GET', '/health')
+        self.assertEqual(200, status)
+        self.assertEqual({'status': 'ok'}, jsn)
+
+    def test_unknown_path(self):
+        status, _, _ = self.request('GET', '/unknown')
+        self.assertEqual(404, status)
+        status, _, _ = self.request('POST', '/unknown', b'{}')
+        self.assertEqual(404, status)
+
+    def test_features(self):
+        body = json.dumps({'paths': [self.image_path, self.no_exif_path]})
+        status, _, jsn = self.request('POST', '/features', body)
+        self.assertEqual(200, status)
+        self.assertEqual(1, len(jsn['features']))
+        feature = jsn['features'][0]
+        self.assertEqual([115.095269, -8.631053], feature['geometry']['coordinates'])
+        self.assertEqual({'datetime': '2023-05-05 06:19:24', 'datetime_iso': '2023-05-05T06:19:24.477000+08:00', 'filename': 'EXIF.jpg'},
+                         feature['properties'])
+        self.assertEqual({self.no_exif_path: "'KeyError: No metadata.'"}, jsn['errors'])
+
+    def test_features_missing_file(self):
+        status, _, jsn = self.request('POST', '/features', json.dumps({'paths': ['NO_EXIST.jpg']}))
+        self.assertEqual(200, status)
+        self.assertIn('No such file or directory', jsn['errors']['NO_EXIST.jpg'])
+
+    def test_features_bad_request(self):
+        for body in [b'not json', b'{}', b'{"paths": [1]}']:
+            status, _, _ = self.request('POST', '/features', body)
+            self.assertEqual(400, status)
+
+    def test_image(self):
+        with open(self.image_path, 'rb') as f:
+            image_b = f.read()
+        status, _, jsn = self.request('POST', '/image?name=UPLOAD.jpg', image_b)
+        self.assertEqual(200, status)
+        self.assertEqual('UPLOAD.jpg', jsn['features'][0]['properties']['filename'])
+        self.assertEqual({}, jsn['errors'])
+
+    def test_body_too_large(self):
+        with mock.patch('im2geojson.server.MAX_BODY_SIZE', 10):
+            status, _, _ = self.request('POST', '/image', b'x' * 11)
+        self.assertEqual(413, status)
+
+    def test_busy(self):
+        self.server.processor.acquire()
+        self.server.processor.acquire()
+        try:
+            status, headers, _ = self.request('POST', '/features', json.dumps({'paths': []}))
+        finally:
+            self.server.processor.release()
+            self.server.processor.release()
+        self.assertEqual(503, status)
+        self.assertIn(('Retry-After', str(RETRY_AFTER_SECONDS)), headers)
+
+    def test_busy_body_not_read(self):
+        self.server.processor.acquire()
+        self.server.processor.acquire()
+        try:
+            with mock.patch.object(RequestHandler, '_send_json', autospec=True,
+                                   side_effect=RequestHandler._send_json) as mock_send_json:
+                status, _, _ = self.request('POST', '/image', b'x' * 1024)
+        finally:
+            self.server.processor.release()
+            self.server.processor.release()
+        self.assertEqual(503, status)
+        handler = mock_send_json.call_args.args[0]
+        self.assertTrue(handler.close_connection)
+
+    def test_invalid_content_length(self):
+        for length, expected in [(None, 411), ('abc', 400), ('-1', 400), ('1_0', 400), ('', 400)]:
+            with self.subTest(length=length):
+                connection = self.connection()
+                try:
+                    connection.putrequest('POST', '/image')
+                    if length is not None:
+                        connection.putheader('Content-Length', length)
+                    connection.endheaders()
+                    response = connection.getresponse()
+                    self.assertEqual(expected, response.status)
+                    self.assertIn('error', json.loads(response.read()))
+                finally:
+                    connection.close()
+        # No request slot is kept
+        self.assertTrue(self.server.processor.acquire())
+        self.assertTrue(self.server.processor.acquire())
+        self.server.processor.release()
+        self.server.processor.release()
+
+    def test_too_many_paths(self):
+        with mock.patch('im2geojson.server.MAX_PATHS', 1):
+            status, _, jsn = self.request('POST', '/features', json.dumps({'paths': [self.image_path] * 2}))
+        self.assertEqual(413, status)
+        self.assertEqual({'error': 'More than 1 paths'}, jsn)
+
+
+@unittest.skipUnless(hasattr(socketserver, 'ThreadingUnixStreamServer'), 'Unix sockets unavailable')
+class TestUnixHTTPServer(TestServerBaseClass):
+
+    socket_path = 'tests/im2geojson_test.sock'
+
+    def test_features(self):
+        status, _, jsn = self.request('POST', '/features', json.dumps({'paths': [self.image_path]}))
+        self.assertEqual(200, status)
+        self.assertEqual(1, len(jsn['features']))
+
+    def test_socket_removed_on_close(self):
+        self.tearDown()
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.setUp()
+
+
+class TestImageProcessor(unittest.TestCase):
+
+    def setUp(self):
+        self.image_path = 'tests/test_files/test_images/test_exif/test_folder/EXIF.jpg'
+        self.no_exif_path = 'tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg'
+
+    def test_results_cached(self):
+        processor = ImageProcessor()
+        with mock.patch('im2geojson.server.read_exif', wraps=read_exif) as mock_read_exif:
+            processor.process_paths([self.image_path])
+            features, errors = processor.process_paths([self.image_path])
+        processor.shutdown()
+        self.assertEqual(1, mock_read_exif.call_count)
+        self.assertEqual(1, len(features))
+
+    def test_read_options(self):
+        processor = ImageProcessor(properties=['make'], xmp=True, read_size=4096)
+        with mock.patch('im2geojson.server.read_exif', wraps=read_exif) as mock_read_exif:
+            features, errors = processor.process_paths([self.image_path])
+        with open(self.image_path, 'rb') as f:
+            bytes_features, errors = processor.process_bytes('UPLOAD.jpg', f.read())
+        processor.shutdown()
+        self.assertEqual('Apple', features[0]['properties']['make'])
+        self.assertEqual('Apple', bytes_features[0]['properties']['make'])
+        kwargs = mock_read_exif.call_args.kwargs
+        self.assertEqual((True, 4096), (kwargs['xmp'], kwargs['read_size']))
+
+    def test_invalid_options_raise_exception(self):
+        with self.assertRaises(ValueError):
+            ImageProcessor(properties=['colour'])
+        with self.assertRaises(ValueError):
+            ImageProcessor(read_size=0)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = _ResultCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+
+    def test_timeout(self):
+        processor = ImageProcessor(timeout=0.01)
+        with mock.patch('im2geojson.server.read_exif', side_effect=lambda *args, **kwargs: time.sleep(0.5)):
+            features, errors = processor.process_paths([self.image_path])
+        processor.shutdown()
+        self.assertEqual([], features)
+        self.assertIn('TimeoutError', errors[self.image_path])
+
+    def test_in_flight_images_bounded(self):
+        processor = ImageProcessor(max_workers=1, max_in_flight=1, timeout=0.1)
+        started = threading.Event()
+        finish = threading.Event()
+        def read(*args, **kwargs):
+            started.set()
+            finish.wait(5)
+            return read_exif(self.image_path)
+        with mock.patch('im2geojson.server.read_exif', side_effect=read) as mock_read_exif:
+            features, errors = processor.process_paths([self.image_path, self.no_exif_path])
+            self.assertTrue(started.is_set())
+            self.assertEqual(1, mock_read_exif.call_count)
+            self.assertIn('TimeoutError', errors[self.image_path])
+            self.assertIn('TimeoutError', errors[self.no_exif_path])
+            self.assertFalse(processor._in_flight.acquire(blocking=False))
+            finish.set()
+        processor.shutdown()
+        self.assertTrue(processor._in_flight.acquire(timeout=5))
+
+
+class TestServerMain(unittest.TestCase):
+
+    def test_parser(self):
+        parser = create_parser()
+        args = parser.parse_args(['--port', '9000', '--max_pending', '4', '--timeout', '1.5', '--max_in_flight', '16'])
+        self.assertEqual({'port': 9000, 'max_pending': 4, 'timeout': 1.5, 'max_in_flight': 16}, vars(args))
+        args = parser.parse_args(['--props', 'make', 'model', '--xmp', '--read_size', '4096'])
+        self.assertEqual({'properties': ['make', 'model'], 'xmp': True, 'read_size': 4096}, vars(args))
+
+    def test_main_stops_on_keyboard_interrupt(self):
+        with mock.patch.object(HTTPServer, 'serve_forever', side_effect=KeyboardInterrupt):
+            with mock.patch('builtins.print') as mock_print:
+                main(['--port', '0'])
+        self.assertIn('Serving on 127.0.0.1:', mock_print.call_args[0][0])
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
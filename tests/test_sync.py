@@ -0,0 +1,220 @@
+"""
+Tests for sync
+"""
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from im2geojson.sync import *
+
+
+class TestFileDigest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_file_digest(self):
+        path = os.path.join(self.directory, 'a.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'image' * 1000)
+        digest = file_digest(path, chunk_size=7)
+        self.assertEqual(digest, file_digest(path))
+        self.assertEqual(32, len(digest))
+        with open(path, 'wb') as f:
+            f.write(b'image' * 999 + b'imagf')
+        self.assertNotEqual(digest, file_digest(path))
+
+    def test_data_digest(self):
+        path = os.path.join(self.directory, 'a.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'image' * 1000)
+        self.assertEqual(file_digest(path), data_digest(b'image' * 1000))
+        self.assertEqual(file_digest(path), data_digest(memoryview(b'image' * 1000)))
+
+    def test_file_digest_missing(self):
+        self.assertIsNone(file_digest(os.path.join(self.directory, 'missing.jpg')))
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.input_directory = tempfile.mkdtemp()
+        self.output_directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.output_directory, MANIFEST_FILENAME)
+        os.makedirs(os.path.join(self.output_directory, 'images'))
+        self.filepaths = [os.path.join(self.input_directory, filename) for filename in ['a.jpg', 'b.jpg']]
+        for filepath in self.filepaths:
+            self.write(filepath, b'image')
+
+    def tearDown(self):
+        shutil.rmtree(self.input_directory)
+        shutil.rmtree(self.output_directory)
+
+    def write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def touch(self, path, offset=10**9):
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + offset))
+
+    def record_all(self, manifest, save_outputs=False, hash_reads=False):
+        manifest.plan(self.filepaths)
+        for filepath in self.filepaths:
+            filename = os.path.basename(filepath)
+            props = {'datetime': '2023-05-05 06:19:24', 'filename': filename}
+            if save_outputs:
+                props['rel_image_path'] = os.path.join('images', filename)
+                self.write(os.path.join(self.output_directory, 'images', filename), b'output')
+            file_hash = None
+            if hash_reads:
+                with open(filepath, 'rb') as f:
+                    file_hash = data_digest(f.read())
+            manifest.record(filepath, 'folder', (1.5, 2.5), props, 'parent', file_hash)
+        manifest.save()
+
+    def test_new_images_changed(self):
+        manifest = Manifest(self.path)
+        self.assertEqual((self.filepaths, []), manifest.plan(self.filepaths))
+
+    def test_unchanged_after_save(self):
+        self.record_all(Manifest(self.path))
+        manifest = Manifest(self.path)
+        self.assertEqual(2, len(manifest))
+        self.assertEqual(([], self.filepaths), manifest.plan(self.filepaths))
+        self.assertEqual(('folder', (1.5, 2.5), {'datetime': '2023-05-05 06:19:24', 'filename': 'a.jpg'}, 'parent'),
+                         manifest.feature(self.filepaths[0]))
+
+    def test_changed_size_and_mtime(self):
+        self.record_all(Manifest(self.path))
+        self.write(self.filepaths[0], b'edited image')
+        self.touch(self.filepaths[1])
+        manifest = Manifest(self.path)
+        self.assertEqual((self.filepaths, []), manifest.plan(self.filepaths))
+
+    def test_touched_with_same_hash_unchanged(self):
+        self.record_all(Manifest(self.path, hash_files=True), hash_reads=True)
+        self.touch(self.filepaths[0])
+        self.touch(self.filepaths[1])
+        self.write(self.filepaths[1], b'imagf')
+        manifest = Manifest(self.path, hash_files=True)
+        self.assertEqual(([self.filepaths[1]], [self.filepaths[0]]), manifest.plan(self.filepaths))
+        manifest.save()
+        # The new modification time is recorded
+        self.assertEqual(([self.filepaths[1]], [self.filepaths[0]]), Manifest(self.path).plan(self.filepaths))
+
+    def test_new_images_not_hashed(self):
+        manifest = Manifest(self.path, hash_files=True)
+        with mock.patch('im2geojson.sync.file_digest') as digest:
+            manifest.plan(self.filepaths)
+        digest.assert_not_called()
+
+    def test_save_skipped_when_unchanged(self):
+        self.record_all(Manifest(self.path))
+        manifest = Manifest(self.path)
+        manifest.plan(self.filepaths)
+        with mock.patch('im2geojson.sync.write_atomic') as write:
+            manifest.save()
+            write.assert_not_called()
+            manifest.remove([self.filepaths[0]])
+            manifest.save()
+            write.assert_called_once()
+            manifest.save()
+            write.assert_called_once()
+
+    def test_missing_manifest_saved(self):
+        manifest = Manifest(self.path)
+        manifest.save()
+        self.assertEqual(0, len(Manifest(self.path)))
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_missing_output_changed(self):
+        self.record_all(Manifest(self.path), save_outputs=True)
+        os.remove(os.path.join(self.output_directory, 'images', 'a.jpg'))
+        manifest = Manifest(self.path)
+        self.assertEqual(([self.filepaths[0]], [self.filepaths[1]]), manifest.plan(self.filepaths))
+
+    def test_other_options_discarded(self):
+        self.record_all(Manifest(self.path, options={'save_images': False}))
+        self.assertEqual(2, len(Manifest(self.path, options={'save_images': False})))
+        self.assertEqual(0, len(Manifest(self.path, options={'save_images': True})))
+
+    def test_invalid_manifest_discarded(self):
+        for data in [b'not json', b'[]', json.dumps({'version': 1, 'options': {}, 'entries': {'a': {}}}).encode()]:
+            self.write(self.path, data)
+            self.assertEqual(0, len(Manifest(self.path)))
+
+    def test_entries_saved_flat(self):
+        self.record_all(Manifest(self.path), save_outputs=True)
+        with open(self.path, 'r') as f:
+            data = f.read()
+        entry = json.loads(data)['entries'][self.filepaths[0]]
+        self.assertEqual(5, len(entry))
+        self.assertEqual(['folder', 1.5, 2.5], entry[3][:3])
+        # Outputs are found from the props, not saved twice
+        self.assertEqual(1, data.count(json.dumps(os.path.join('images', 'a.jpg'))))
+
+    def test_orphans_and_remove(self):
+        manifest = Manifest(self.path)
+        self.record_all(manifest, save_outputs=True)
+        orphans = manifest.orphans(self.filepaths[1:])
+        self.assertEqual([self.filepaths[0]], orphans)
+        self.assertEqual([os.path.join('images', 'a.jpg')], manifest.remove(orphans))
+        self.assertNotIn(self.filepaths[0], manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.output_directory, 'images', 'a.jpg')))
+        self.assertTrue(os.path.exists(os.path.join(self.output_directory, 'images', 'b.jpg')))
+        self.assertEqual([], manifest.remove(orphans))
+
+    def test_remove_keeps_shared_outputs(self):
+        manifest = Manifest(self.path)
+        self.record_all(manifest, save_outputs=True)
+        props = {'rel_image_path': os.path.join('images', 'b.jpg')}
+        manifest.record(self.filepaths[0], 'folder', (1.5, 2.5), props, 'parent')
+        self.assertEqual([], manifest.remove([self.filepaths[0]]))
+        self.assertTrue(os.path.exists(os.path.join(self.output_directory, 'images', 'b.jpg')))
+
+    def test_loaded_entries_keep_shared_outputs(self):
+        manifest = Manifest(self.path)
+        self.record_all(manifest, save_outputs=True)
+        props = {'rel_image_path': os.path.join('images', 'b.jpg')}
+        manifest.record(self.filepaths[0], 'folder', (1.5, 2.5), props, 'parent')
+        manifest.save()
+        manifest = Manifest(self.path)
+        self.assertEqual([], manifest.remove([self.filepaths[0]]))
+        self.assertEqual([os.path.join('images', 'b.jpg')], manifest.remove([self.filepaths[1]]))
+        self.assertFalse(os.path.exists(os.path.join(self.output_directory, 'images', 'b.jpg')))
+
+    def test_record_deletes_dropped_outputs(self):
+        manifest = Manifest(self.path)
+        self.record_all(manifest, save_outputs=True)
+        manifest.record(self.filepaths[0], 'folder', (1.5, 2.5), {}, 'parent')
+        self.assertFalse(os.path.exists(os.path.join(self.output_directory, 'images', 'a.jpg')))
+
+    def test_record_error(self):
+        manifest = Manifest(self.path)
+        manifest.plan(self.filepaths)
+        manifest.record_error(self.filepaths[0], 'NoExifError', "'KeyError: No metadata.'")
+        manifest.save()
+        manifest = Manifest(self.path)
+        self.assertEqual(([self.filepaths[1]], [self.filepaths[0]]), manifest.plan(self.filepaths))
+        self.assertIsNone(manifest.feature(self.filepaths[0]))
+        self.assertEqual(('NoExifError', "'KeyError: No metadata.'"), manifest.error(self.filepaths[0]))
+
+    def test_record_planned_signature(self):
+        manifest = Manifest(self.path)
+        manifest.plan(self.filepaths)
+        # Changed while processed
+        self.write(self.filepaths[0], b'edited image')
+        manifest.record(self.filepaths[0], 'folder', (1.5, 2.5), {}, 'parent')
+        self.assertEqual(([self.filepaths[0]], []), manifest.plan(self.filepaths[:1]))
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
@@ -0,0 +1,98 @@
+"""
+Tests for tiles
+"""
+
+import unittest
+
+from im2geojson.tiles import lat_long_to_tile, tile_bbox, extend_bbox, check_zoom, TileIndex
+
+
+class TestLatLongToTile(unittest.TestCase):
+
+    def test_zoom_zero_is_single_tile(self):
+        self.assertEqual((0, 0), lat_long_to_tile(-8.631053, 115.095269, 0))
+
+    def test_zoom_one_quadrants(self):
+        self.assertEqual((0, 0), lat_long_to_tile(10, -10, 1))
+        self.assertEqual((1, 0), lat_long_to_tile(10, 10, 1))
+        self.assertEqual((0, 1), lat_long_to_tile(-10, -10, 1))
+        self.assertEqual((1, 1), lat_long_to_tile(-10, 10, 1))
+
+    def test_known_tile(self):
+        self.assertEqual((3357, 2146), lat_long_to_tile(-8.631053, 115.095269, 12))
+
+    def test_clamps_to_world_bounds(self):
+        self.assertEqual((3, 0), lat_long_to_tile(90, 180, 2))
+        self.assertEqual((0, 3), lat_long_to_tile(-90, -180, 2))
+
+    def test_tile_bbox_contains_point(self):
+        lat, long = -8.631053, 115.095269
+        x, y = lat_long_to_tile(lat, long, 12)
+        west, south, east, north = tile_bbox(12, x, y)
+        self.assertTrue(west <= long < east)
+        self.assertTrue(south <= lat < north)
+
+    def test_tile_bbox_zoom_zero(self):
+        west, south, east, north = tile_bbox(0, 0, 0)
+        self.assertEqual(-180, west)
+        self.assertEqual(180, east)
+        self.assertAlmostEqual(85.05112878, north)
+        self.assertAlmostEqual(-85.05112878, south)
+
+
+class TestExtendBBox(unittest.TestCase):
+
+    def test_extend_empty_bbox(self):
+        self.assertEqual([115, -8, 115, -8], extend_bbox(None, -8, 115))
+
+    def test_extend_bbox(self):
+        bbox = extend_bbox(None, -8, 115)
+        bbox = extend_bbox(bbox, -9, 116)
+        bbox = extend_bbox(bbox, -7, 114)
+        self.assertEqual([114, -9, 116, -7], bbox)
+
+
+class TestCheckZoom(unittest.TestCase):
+
+    def test_check_zoom(self):
+        for zoom in [0, 12, 24]:
+            check_zoom(zoom)
+        for zoom in [-1, 25, 1.5, '12', True]:
+            with self.assertRaises(ValueError):
+                check_zoom(zoom)
+
+
+class TestTileIndex(unittest.TestCase):
+
+    def test_invalid_zoom_raises_exception(self):
+        with self.assertRaises(ValueError):
+            TileIndex(25)
+
+    def test_add_returns_tile(self):
+        tile_index = TileIndex(1)
+        self.assertEqual((1, 1, 1), tile_index.add(-10, 10, 0))
+
+    def test_buckets_items_by_tile(self):
+        tile_index = TileIndex(1)
+        tile_index.add(10, 10, 0)
+        tile_index.add(-10, -10, 1)
+        tile_index.add(20, 20, 2)
+        self.assertEqual(2, len(tile_index))
+        tiles = [(tile, list(items)) for tile, items in tile_index]
+        self.assertEqual([((1, 0, 1), [1]), ((1, 1, 0), [0, 2])], tiles)
+
+    def test_remove(self):
+        tile_index = TileIndex(1)
+        tile_index.add(10, 10, 0)
+        tile_index.add(-10, -10, 1)
+        tile_index.add(20, 20, 2)
+        tile_index.remove(10, 10, 0)
+        tile_index.remove(-10, -10, 1)
+        self.assertEqual([((1, 1, 0), [2])], [(tile, list(items)) for tile, items in tile_index])
+        with self.assertRaises(ValueError):
+            tile_index.remove(-10, -10, 1)
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
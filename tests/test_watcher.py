@@ -0,0 +1,316 @@
+"""
+Tests for watcher
+"""
+
+import unittest
+from unittest import mock
+import os
+import sys
+import json
+import shutil
+
+from im2geojson.im2geojson import ImageToGeoJSON, GEOJSON_DIR
+from im2geojson.watcher import Watcher, _InotifyWaiter, _SleepWaiter
+
+
+class TestWatcherBaseClass(unittest.TestCase):
+
+    def setUp(self):
+        self.input_directory = 'tests/assets_input/'
+        self.output_directory = 'tests/assets/'
+        self.geojson_dir_path = os.path.join(self.output_directory, GEOJSON_DIR)
+        self.folder_path = os.path.join(self.input_directory, 'test_folder')
+        self.geojson_path = os.path.join(self.geojson_dir_path, 'test_folder.geojson')
+        self.image_path = 'tests/test_files/test_images/test_small_image/test_folder/SMALL_IMAGE.jpg'
+        self.no_exif_path = 'tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg'
+        os.makedirs(self.folder_path)
+        self.im2geojson = ImageToGeoJSON(input_directory = self.input_directory,
+                                         output_directory = self.output_directory)
+
+    def tearDown(self):
+        for path in [self.input_directory, self.output_directory]:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+
+    def copy_image(self, filename, image_path=None):
+        filepath = os.path.join(self.folder_path, filename)
+        shutil.copy(image_path or self.image_path, filepath)
+        return filepath
+
+    def load_geojson(self):
+        with open(self.geojson_path, 'r') as f:
+            return json.load(f)
+
+
+class TestWatcherPoll(TestWatcherBaseClass):
+
+    def test_new_image_processed_once_settled(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        filepath = self.copy_image('IMAGE_1.jpg')
+        self.assertEqual([], watcher.poll())
+        self.assertEqual([filepath], watcher.poll())
+        self.assertEqual([], watcher.poll())
+        jsn = self.load_geojson()
+        self.assertEqual(['IMAGE_1.jpg'], [f['properties']['filename'] for f in jsn['features']])
+        self.assertEqual('1 out of 1 images processed successfully', watcher.summary)
+
+    def test_partially_written_image_not_processed(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        filepath = os.path.join(self.folder_path, 'IMAGE_1.jpg')
+        with open(self.image_path, 'rb') as f:
+            image_b = f.read()
+        with open(filepath, 'wb') as f:
+            f.write(image_b[:1000])
+        watcher.poll()
+        with open(filepath, 'wb') as f:
+            f.write(image_b)
+        self.assertEqual([], watcher.poll())
+        self.assertEqual([filepath], watcher.poll())
+
+    def test_image_not_processed_before_settle_time(self):
+        watcher = Watcher(self.im2geojson, settle_time=60)
+        self.copy_image('IMAGE_1.jpg')
+        watcher.poll()
+        self.assertEqual([], watcher.poll())
+        self.assertFalse(os.path.exists(self.geojson_path))
+
+    def test_new_images_appended_to_collection(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        self.copy_image('IMAGE_1.jpg')
+        watcher.poll()
+        watcher.poll()
+        self.copy_image('IMAGE_2.jpg')
+        watcher.poll()
+        watcher.poll()
+        jsn = self.load_geojson()
+        self.assertEqual(['IMAGE_1.jpg', 'IMAGE_2.jpg'], [f['properties']['filename'] for f in jsn['features']])
+
+    def test_changed_image_updated_in_place(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        filepath = self.copy_image('IMAGE_1.jpg')
+        watcher.poll()
+        watcher.poll()
+        with open(filepath, 'ab') as f:
+            f.write(b'\0')
+        watcher.poll()
+        self.assertEqual([filepath], watcher.poll())
+        self.assertEqual(1, len(self.load_geojson()['features']))
+
+    def test_deleted_image_removed_from_collection(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        self.copy_image('IMAGE_1.jpg')
+        filepath = self.copy_image('IMAGE_2.jpg')
+        watcher.poll()
+        watcher.poll()
+        os.remove(filepath)
+        watcher.poll()
+        self.assertEqual(['IMAGE_1.jpg'], [f['properties']['filename'] for f in self.load_geojson()['features']])
+
+    def test_last_deleted_image_removes_collection(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        filepath = self.copy_image('IMAGE_1.jpg')
+        watcher.poll()
+        watcher.poll()
+        os.remove(filepath)
+        watcher.poll()
+        self.assertFalse(os.path.exists(self.geojson_path))
+
+    def test_changed_image_with_error_removed_from_collection(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        self.copy_image('IMAGE_1.jpg')
+        filepath = self.copy_image('IMAGE_2.jpg')
+        watcher.poll()
+        watcher.poll()
+        self.copy_image('IMAGE_2.jpg', self.no_exif_path)
+        os.utime(filepath, ns=(0, 0))
+        watcher.poll()
+        watcher.poll()
+        self.assertEqual(['IMAGE_1.jpg'], [f['properties']['filename'] for f in self.load_geojson()['features']])
+        self.assertEqual(1, self.im2geojson._geojson_parser.feature_count('test_folder'))
+
+    def test_image_errors(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        self.copy_image('NO_EXIF.jpg', self.no_exif_path)
+        watcher.poll()
+        watcher.poll()
+        self.assertEqual('0 out of 1 images processed successfully', watcher.summary)
+        self.assertIn('test_folder/NO_EXIF.jpg', self.im2geojson.error_dictionary)
+        self.assertFalse(os.path.exists(self.geojson_path))
+
+    def test_ndjson(self):
+        ndjson_path = os.path.join(self.output_directory, 'features.ndjson')
+        watcher = Watcher(self.im2geojson, settle_time=0, ndjson_path=ndjson_path)
+        self.copy_image('IMAGE_1.jpg')
+        watcher.poll()
+        watcher.poll()
+        self.copy_image('IMAGE_2.jpg')
+        watcher.poll()
+        watcher.poll()
+        with open(ndjson_path, 'r') as f:
+            features = [json.loads(line) for line in f]
+        self.assertEqual(['IMAGE_1.jpg', 'IMAGE_2.jpg'], [f['properties']['filename'] for f in features])
+        self.assertEqual('test_folder', features[0]['collection'])
+        self.assertEqual([115.095269, -8.631053], features[0]['geometry']['coordinates'])
+        self.assertFalse(os.path.exists(self.geojson_path))
+
+    def test_poll_filepaths_checks_only_those(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        filepath_1 = self.copy_image('IMAGE_1.jpg')
+        filepath_2 = self.copy_image('IMAGE_2.jpg')
+        with mock.patch.object(self.im2geojson, 'image_filepaths') as image_filepaths:
+            watcher.poll([filepath_1])
+            # Images waiting to settle are checked again without being named
+            self.assertEqual([filepath_1], watcher.poll([]))
+            image_filepaths.assert_not_called()
+        self.assertEqual(['IMAGE_1.jpg'], [f['properties']['filename'] for f in self.load_geojson()['features']])
+        watcher.poll()
+        self.assertEqual([filepath_2], watcher.poll())
+
+    def test_poll_filepaths_deleted(self):
+        watcher = Watcher(self.im2geojson, settle_time=0)
+        self.copy_image('IMAGE_1.jpg')
+        filepath = self.copy_image('IMAGE_2.jpg')
+        watcher.poll()
+        watcher.poll()
+        os.remove(filepath)
+        watcher.poll([filepath])
+        self.assertEqual(['IMAGE_1.jpg'], [f['properties']['filename'] for f in self.load_geojson()['features']])
+
+
+class FakeWaiter(object):
+
+    # Returns each of `changes` in turn from `wait`, after calling `on_wait` the first time
+    def __init__(self, changes, on_wait=None):
+        self.changes = list(changes)
+        self.on_wait = on_wait
+        self.watched = []
+
+    def watch(self, directories):
+        self.watched.extend(directories)
+
+    def wait(self, timeout):
+        if self.on_wait is not None:
+            self.on_wait()
+            self.on_wait = None
+        return self.changes.pop(0) if self.changes else []
+
+    def close(self):
+        pass
+
+
+class TestWatcherRun(TestWatcherBaseClass):
+
+    def test_run_max_polls(self):
+        watcher = Watcher(self.im2geojson, interval=0.01, settle_time=0)
+        self.copy_image('IMAGE_1.jpg')
+        watcher.run(max_polls=2)
+        self.assertEqual(1, len(self.load_geojson()['features']))
+
+    def test_run_stops_on_keyboard_interrupt(self):
+        watcher = Watcher(self.im2geojson, interval=0.01, settle_time=0)
+        with mock.patch.object(watcher, 'poll', side_effect=KeyboardInterrupt):
+            watcher.run()
+
+    def test_run_checks_changed_paths_between_rescans(self):
+        watcher = Watcher(self.im2geojson, interval=0.01, settle_time=0)
+        filepath = os.path.join(self.folder_path, 'IMAGE_1.jpg')
+        waiter = FakeWaiter([[(filepath, False)], []], lambda: self.copy_image('IMAGE_1.jpg'))
+
+        with mock.patch('im2geojson.watcher._make_waiter', return_value=waiter), \
+             mock.patch.object(self.im2geojson, 'image_filepaths', wraps=self.im2geojson.image_filepaths) as image_filepaths:
+            watcher.run(max_polls=3)
+        image_filepaths.assert_called_once()
+        self.assertEqual(1, len(self.load_geojson()['features']))
+
+    def test_run_rescans_when_changes_unknown(self):
+        watcher = Watcher(self.im2geojson, interval=0.01, settle_time=0)
+        self.copy_image('IMAGE_1.jpg')
+        with mock.patch('im2geojson.watcher._make_waiter', return_value=FakeWaiter([None, None])), \
+             mock.patch.object(self.im2geojson, 'image_filepaths', wraps=self.im2geojson.image_filepaths) as image_filepaths:
+            watcher.run(max_polls=2)
+        self.assertEqual(2, image_filepaths.call_count)
+        self.assertEqual(1, len(self.load_geojson()['features']))
+
+    def test_run_new_folder_watched_and_read(self):
+        watcher = Watcher(self.im2geojson, interval=0.01, settle_time=0)
+        new_path = os.path.join(self.input_directory, 'new_folder')
+
+        def create_folder():
+            os.makedirs(new_path)
+            shutil.copy(self.image_path, os.path.join(new_path, 'IMAGE_1.jpg'))
+        waiter = FakeWaiter([[(new_path, True)], []], create_folder)
+
+        with mock.patch('im2geojson.watcher._make_waiter', return_value=waiter):
+            watcher.run(max_polls=3)
+        self.assertIn(new_path, waiter.watched)
+        self.assertTrue(os.path.exists(os.path.join(self.geojson_dir_path, 'new_folder.geojson')))
+
+    def test_run_polling_fallback(self):
+        watcher = Watcher(self.im2geojson, interval=0.01, settle_time=0)
+        self.copy_image('IMAGE_1.jpg')
+        with mock.patch('im2geojson.watcher._make_waiter', return_value=_SleepWaiter()):
+            watcher.run(max_polls=2)
+        self.assertEqual(1, len(self.load_geojson()['features']))
+
+
+class TestWatcherDirectories(TestWatcherBaseClass):
+
+    def test_watch_folders(self):
+        os.makedirs(os.path.join(self.folder_path, 'nested'))
+        directories = [os.path.normpath(path) for path in Watcher(self.im2geojson)._watch_directories()]
+        self.assertEqual([os.path.normpath(self.input_directory), os.path.normpath(self.folder_path)], directories)
+
+    def test_watch_tree_layout(self):
+        nested_path = os.path.join(self.folder_path, 'nested')
+        os.makedirs(nested_path)
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory,
+                                    output_directory = self.output_directory,
+                                    layout = 'tree')
+        watcher = Watcher(im2geojson)
+        directories = [os.path.normpath(path) for path in watcher._watch_directories()]
+        self.assertEqual(sorted(map(os.path.normpath, [self.input_directory, self.folder_path, nested_path])), sorted(directories))
+
+        new_path = os.path.join(nested_path, 'new')
+        os.makedirs(new_path)
+        self.assertIn(os.path.normpath(new_path), [os.path.normpath(path) for path in watcher._watch_directories()])
+
+    def test_tree_layout_nested_image(self):
+        nested_path = os.path.join(self.folder_path, 'nested')
+        os.makedirs(nested_path)
+        im2geojson = ImageToGeoJSON(input_directory = self.input_directory,
+                                    output_directory = self.output_directory,
+                                    layout = 'tree')
+        watcher = Watcher(im2geojson, settle_time=0)
+        shutil.copy(self.image_path, os.path.join(nested_path, 'IMAGE_1.jpg'))
+        watcher.poll()
+        watcher.poll()
+        self.assertTrue(os.path.exists(os.path.join(self.geojson_dir_path, 'test_folder', 'nested.geojson')))
+
+    def test_missing_input_directory(self):
+        shutil.rmtree(self.input_directory)
+        self.assertEqual([], Watcher(self.im2geojson)._watch_directories())
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'inotify requires Linux')
+class TestInotifyWaiter(TestWatcherBaseClass):
+
+    def test_wait_times_out_without_events(self):
+        waiter = _InotifyWaiter()
+        waiter.watch([self.folder_path])
+        self.assertEqual([], waiter.wait(0.01))
+        waiter.close()
+
+    def test_wait_returns_changed_paths(self):
+        waiter = _InotifyWaiter()
+        waiter.watch([self.input_directory, self.folder_path])
+        filepath = self.copy_image('IMAGE_1.jpg')
+        nested_path = os.path.join(self.input_directory, 'nested')
+        os.makedirs(nested_path)
+        self.assertEqual([(filepath, False), (nested_path, True)], waiter.wait(5))
+        self.assertEqual([], waiter.wait(0.01))
+        waiter.close()
+
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover
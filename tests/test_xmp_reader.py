@@ -0,0 +1,165 @@
+"""
+Tests for xmp_reader
+"""
+
+import unittest
+import io
+import os
+import shutil
+import struct
+import tempfile
+
+from im2geojson.xmp_reader import *
+from im2geojson.ifd_reader import JPEG_SOI, JPEG_APP1
+
+NO_EXIF_JPG = 'tests/test_files/test_images/test_no_exif/test_folder/NO_EXIF.jpg'
+MISSING_EXIF_JPG = 'tests/test_files/test_images/test_missing_exif/test_folder/MISSING_EXIF.jpg'
+
+XMP_ATTRIBUTES = b'''<?xpacket begin="\xef\xbb\xbf" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about=""
+    xmlns:exif="http://ns.adobe.com/exif/1.0/"
+   exif:GPSLatitude="8,37.86318S"
+   exif:GPSLongitude="115,5,42.97E"
+   exif:DateTimeOriginal="2023-05-05T06:19:24.512+08:00"/>
+ </rdf:RDF>
+</x:xmpmeta>
+<?xpacket end="w"?>'''
+
+XMP_ELEMENTS = b'''<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about=""
+    xmlns:exif="http://ns.adobe.com/exif/1.0/"
+    xmlns:photoshop="http://ns.adobe.com/photoshop/1.0/">
+   <exif:GPSLatitude>8,37.86318S</exif:GPSLatitude>
+   <exif:GPSLongitude>115,5,42.97E</exif:GPSLongitude>
+   <photoshop:DateCreated>2023-05-05T06:19:24</photoshop:DateCreated>
+  </rdf:Description>
+ </rdf:RDF>
+</x:xmpmeta>'''
+
+
+def build_xmp_jpeg(image_b, packet=XMP_ATTRIBUTES):
+    """bytes: Return the JPEG `image_b` with an XMP APP1 segment holding `packet` after its SOI marker."""
+    segment = XMP_HEADER + packet
+    return JPEG_SOI + JPEG_APP1 + struct.pack('>H', len(segment) + 2) + segment + image_b[2:]
+
+
+class TestFindXMP(unittest.TestCase):
+
+    def setUp(self):
+        with open(NO_EXIF_JPG, 'rb') as f:
+            self.image_b = f.read()
+
+    def test_find_xmp_segment(self):
+        jpeg = build_xmp_jpeg(self.image_b)
+        start, end = find_xmp_segment(jpeg)
+        self.assertEqual(XMP_ATTRIBUTES, jpeg[start:end])
+
+    def test_no_xmp_segment(self):
+        self.assertIsNone(find_xmp_segment(self.image_b))
+        self.assertIsNone(find_xmp_segment(b'not a jpeg'))
+
+    def test_read_jpeg_xmp(self):
+        with open(MISSING_EXIF_JPG, 'rb') as f:
+            jpeg = build_xmp_jpeg(f.read())
+        self.assertEqual(XMP_ATTRIBUTES, read_jpeg_xmp(io.BytesIO(jpeg)))
+
+    def test_read_jpeg_xmp_after_other_segments(self):
+        preceding = b'\xff\xe0\x00\x04JF' + b'\xff\xff\xe2\x00\x04AB'
+        jpeg = build_xmp_jpeg(self.image_b)
+        jpeg = JPEG_SOI + preceding + jpeg[2:]
+        self.assertEqual(XMP_ATTRIBUTES, read_jpeg_xmp(io.BytesIO(jpeg)))
+
+    def test_read_jpeg_xmp_none(self):
+        self.assertIsNone(read_jpeg_xmp(io.BytesIO(self.image_b)))
+        self.assertIsNone(read_jpeg_xmp(io.BytesIO(b'not a jpeg')))
+        self.assertIsNone(read_jpeg_xmp(io.BytesIO(JPEG_SOI + b'\xff\xe0\x00')))
+
+
+class TestSidecar(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_sidecar_paths(self):
+        self.assertEqual(['folder/IMG.xmp', 'folder/IMG.XMP', 'folder/IMG.jpg.xmp'], sidecar_paths('folder/IMG.jpg'))
+
+    def test_iter_file_chunks(self):
+        path = os.path.join(self.directory, 'IMG.xmp')
+        with open(path, 'wb') as f:
+            f.write(XMP_ELEMENTS)
+        chunks = list(iter_file_chunks(path, chunk_size=100))
+        self.assertEqual(XMP_ELEMENTS, b''.join(chunks))
+        self.assertEqual(100, len(chunks[0]))
+
+
+class TestParseXMP(unittest.TestCase):
+
+    def test_parse_attributes(self):
+        self.assertEqual({
+            GPS_LATITUDE: '8,37.86318S',
+            GPS_LONGITUDE: '115,5,42.97E',
+            DATETIME_ORIGINAL: '2023-05-05T06:19:24.512+08:00',
+        }, parse_xmp([XMP_ATTRIBUTES]))
+
+    def test_parse_elements_in_chunks(self):
+        chunks = [XMP_ELEMENTS[index:index + 7] for index in range(0, len(XMP_ELEMENTS), 7)]
+        self.assertEqual({
+            GPS_LATITUDE: '8,37.86318S',
+            GPS_LONGITUDE: '115,5,42.97E',
+            DATE_CREATED: '2023-05-05T06:19:24',
+        }, parse_xmp(chunks))
+
+    def test_parse_stops_once_final(self):
+        chunks = [XMP_ATTRIBUTES[index:index + 64] for index in range(0, len(XMP_ATTRIBUTES), 64)]
+        fed = []
+        def iter_chunks():
+            for chunk in chunks:
+                fed.append(chunk)
+                yield chunk
+        self.assertEqual(3, len(parse_xmp(iter_chunks())))
+        self.assertLess(len(fed), len(chunks))
+
+    def test_parse_reads_on_for_preferred_datetime(self):
+        packet = XMP_ELEMENTS.replace(b'</rdf:Description>',
+                                      b'<exif:DateTimeOriginal>2023-05-06T06:19:24</exif:DateTimeOriginal></rdf:Description>')
+        values = parse_xmp([packet[index:index + 16] for index in range(0, len(packet), 16)])
+        self.assertEqual('2023-05-06T06:19:24', values[DATETIME_ORIGINAL])
+        self.assertEqual('2023-05-05T06:19:24', values[DATE_CREATED])
+
+    def test_parse_malformed(self):
+        self.assertEqual({}, parse_xmp([b'<x:xmpmeta></rdf:RDF>']))
+        self.assertEqual({}, parse_xmp([b'']))
+
+
+class TestConversions(unittest.TestCase):
+
+    def test_xmp_coordinate(self):
+        self.assertEqual((115.0, 5.0, 42.97, 'E'), xmp_coordinate('115,5,42.97E'))
+        deg, minutes, seconds, ref = xmp_coordinate('8,37.5s')
+        self.assertEqual((8.0, 37.0, 30.0, 'S'), (deg, minutes, round(seconds, 6), ref))
+
+    def test_invalid_xmp_coordinate(self):
+        for value in ['', '8S', '8,x,1S', '1,2,3,4N']:
+            with self.assertRaises(ValueError) as e:
+                xmp_coordinate(value)
+            self.assertEqual(f'ValueError: Invalid XMP GPS coordinate {value}', str(e.exception))
+
+    def test_xmp_datetime(self):
+        self.assertEqual(('2023:05:05 06:19:24', '512', '+08:00'), xmp_datetime('2023-05-05T06:19:24.512+08:00'))
+        self.assertEqual(('2023:05:05 06:19:00', None, '+00:00'), xmp_datetime('2023-05-05T06:19Z'))
+        self.assertEqual(('2023:05:05 00:00:00', None, None), xmp_datetime('2023-05-05'))
+
+    def test_invalid_xmp_datetime(self):
+        with self.assertRaises(ValueError) as e:
+            xmp_datetime('2023:05:05 06:19:24')
+        self.assertEqual('ValueError: Invalid XMP datetime 2023:05:05 06:19:24', str(e.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()             # pragma: no cover